@@ -1,10 +1,19 @@
-from typing import Dict, Any, Optional, List
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Any, Optional, List, Set
+from .history import ChatHistoryStore
 from .openai import OpenAI
+from settings import CHAT_HISTORY_TOKEN_BUDGET, CHAT_SUMMARY_MAX_CHARS
+
+logger = logging.getLogger(__name__)
 
 class ChatAgent(OpenAI):
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.chat_history = []
+        self.history = ChatHistoryStore()
+        # Sessions with a summary being written, and the tasks writing them
+        self._summarizing: Set[str] = set()
+        self._summary_tasks: Set[asyncio.Task] = set()
         self.default_lore = """
         You are an AI assistant specialized in cryptocurrency research and analysis.
         You can help users understand crypto projects, analyze market data, and provide 
@@ -12,12 +21,68 @@ class ChatAgent(OpenAI):
         about a specific token, you should suggest using the DYOR (Do Your Own Research) agent.
         """
 
-    async def chat_response(self, user_message: str, attachments: Optional[List[str]] = None, lore: Optional[str] = None) -> Dict[str, Any]:
+    def _prompt_history(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Recent turns of the session trimmed to the token budget, preceded by the rolling
+        summary of older turns, so prompt size stays flat as the conversation grows
+        """
+        summary, recent = self.history.get_context(session_id, CHAT_HISTORY_TOKEN_BUDGET)
+        if summary:
+            return [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}, *recent]
+        return recent
+
+    def _schedule_summary(self, session_id: str) -> None:
+        """
+        Summarize the session's compacted turns in the background, so the reply isn't held up
+        by a second LLM call. Until the summary is written, prompts use the truncated lines.
+        """
+        if session_id in self._summarizing or not self.history.get_evicted(session_id)[1]:
+            return
+        self._summarizing.add(session_id)
+        task = asyncio.create_task(self._summarize_session(session_id))
+        self._summary_tasks.add(task)
+        task.add_done_callback(self._summary_tasks.discard)
+
+    async def _summarize_session(self, session_id: str) -> None:
+        try:
+            # Turns compacted while a summary was being written are folded in by the next pass
+            while await self._summarize_history(session_id):
+                pass
+        except Exception as e:
+            logger.error(f"Summarizing chat session {session_id} failed: {e}")
+        finally:
+            self._summarizing.discard(session_id)
+
+    async def _summarize_history(self, session_id: str) -> bool:
+        """
+        Fold the turns compacted out of the session's ring buffer into its summary with one
+        LLM call. On failure the truncated lines of those turns stay as the summary.
+
+        Returns:
+            bool: Whether a summary was written
+        """
+        summary, evicted = self.history.get_evicted(session_id)
+        if not evicted:
+            return False
+        lore = (f"You maintain a running summary of a conversation between a user and a crypto research assistant. "
+                f"Merge the new messages into the summary. Keep tokens, addresses, numbers, decisions and open "
+                f"questions; drop pleasantries. Answer with the summary only, at most {CHAT_SUMMARY_MAX_CHARS} characters.")
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in evicted)
+        prompt = f"Current summary:\n{summary or '(empty)'}\n\nNew messages:\n{transcript}"
+        result = await self.generate_response(prompt, lore, use_cache=False)
+        if not (result["success"] and result["response"]):
+            return False
+        self.history.set_summary(session_id, result["response"].strip(), evicted)
+        return True
+
+    async def chat_response(self, user_message: str, attachments: Optional[List[str]] = None, lore: Optional[str] = None,
+                            session_id: str = "default") -> Dict[str, Any]:
         """
         Process user message and generate appropriate response
         """
+        history = self._prompt_history(session_id)
         # Add user message to chat history
-        self.chat_history.append({"role": "user", "content": user_message})
+        self.history.append(session_id, "user", user_message)
         
         # Use custom lore if provided, otherwise use default
         chat_lore = lore if lore else self.default_lore
@@ -26,17 +91,44 @@ class ChatAgent(OpenAI):
         if self._is_dyor_request(user_message):
             response = self._suggest_dyor_agent(user_message)
         else:
-            response = self.chat(user_message, chat_lore)
+            response = await self.chat(user_message, chat_lore, use_cache=False, history=history)
         
         # Add response to chat history
-        self.chat_history.append({"role": "assistant", "content": response})
+        self.history.append(session_id, "assistant", response)
+        self._schedule_summary(session_id)
         
         return {
             "success": True,
             "response": response,
-            "requires_dyor": self._is_dyor_request(user_message)
+            "requires_dyor": self._is_dyor_request(user_message),
+            "session_id": session_id
         }
 
+    async def stream_response(self, user_message: str, lore: Optional[str] = None,
+                              session_id: str = "default") -> AsyncIterator[str]:
+        """
+        Streaming variant of chat_response that yields the reply text as it is generated.
+        The assembled reply is added to chat history once the stream completes.
+        """
+        history = self._prompt_history(session_id)
+        self.history.append(session_id, "user", user_message)
+        chat_lore = lore if lore else self.default_lore
+
+        if self._is_dyor_request(user_message):
+            response = self._suggest_dyor_agent(user_message)
+            self.history.append(session_id, "assistant", response)
+            yield response
+            return
+
+        parts = []
+        async for delta in self.stream_chat(user_message, chat_lore, history=history):
+            parts.append(delta)
+            yield delta
+        # A failed or cancelled stream leaves no partial reply in the history
+        if parts:
+            self.history.append(session_id, "assistant", "".join(parts))
+            self._schedule_summary(session_id)
+
     def _is_dyor_request(self, message: str) -> bool:
         """
         Check if user message indicates need for detailed token research
@@ -53,8 +145,8 @@ class ChatAgent(OpenAI):
                 "I recommend using our specialized DYOR agent for in-depth analysis. "
                 "Would you like me to initiate a DYOR report for this token?")
 
-    def clear_history(self) -> None:
+    def clear_history(self, session_id: str) -> None:
         """
-        Clear chat history
+        Clear chat history of a session
         """
-        self.chat_history = []
+        self.history.clear(session_id)
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from docx import Document
+
+from settings import DOCX_PARSE_WORKERS, DOCX_PARSE_TIMEOUT_SECONDS, DOCX_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+
+def extract_document_text(file_path: str) -> str:
+    """
+    Parse a DOCX document into text with hyperlinks formatted as HyperText.
+    Links are only processed within their original paragraphs.
+
+    Module level so worker processes can run it.
+
+    Args:
+        file_path (str): Path to the DOCX file
+
+    Returns:
+        str: Document text with hyperlinks formatted as text(url)
+    """
+    doc = Document(file_path)
+    processed_paragraphs = []
+    logger.debug(f"Processing {len(doc.paragraphs)} paragraphs")
+    for paragraph in doc.paragraphs:
+        text = paragraph.text
+        if len(paragraph.hyperlinks) > 0:
+            logger.debug(f"Found {len(paragraph.hyperlinks)} hyperlinks")
+            for hyperlink in paragraph.hyperlinks:
+                link_text = hyperlink.text
+                url = hyperlink.url
+                if link_text in text:
+                    start = text.find(link_text)
+                    if start >= 0:
+                        before = text[:start]
+                        after = text[start + len(link_text):]
+                        text = before + f"{link_text}({url})" + after
+                else:
+                    text = text + f"{link_text}({url})"
+            processed_paragraphs.append(text)
+
+    return "\n".join(processed_paragraphs)
+
+
+def _warm_up() -> int:
+    # python-docx and lxml are imported with this module, so a warmed worker parses at once
+    return os.getpid()
+
+
+class DocumentPool:
+    """
+    Extracts DOCX text in worker processes, so a large document doesn't block the event loop.
+
+    At most `workers` documents parse at once. A file over `max_bytes` is rejected before it
+    reaches a worker. A document still parsing after `timeout` seconds fails with TimeoutError
+    and its pool is replaced; documents that were parsing in the replaced pool are retried once
+    in the new one. Until start() is called, e.g. in scripts outside the app, documents parse in
+    a worker thread under the same limits.
+    """
+
+    def __init__(self, workers: int = DOCX_PARSE_WORKERS, timeout: float = DOCX_PARSE_TIMEOUT_SECONDS,
+                 max_bytes: int = DOCX_MAX_BYTES):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.stats = {"parsed": 0, "failed": 0, "too_large": 0, "timeouts": 0, "restarts": 0}
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Forking a process that runs the event loop, motor and httpx threads is unsafe
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def start(self) -> None:
+        self._executor = self._new_executor()
+        loop = asyncio.get_running_loop()
+        # Spawn every worker now instead of on the first uploads
+        pids = await asyncio.gather(*[loop.run_in_executor(self._executor, _warm_up) for _ in range(self.workers)])
+        logger.info(f"Document pool started with {len(set(pids))} workers")
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        if self._executor is not executor:
+            return
+        self._executor = self._new_executor()
+        self.stats["restarts"] += 1
+        # shutdown() waits for running work, so a worker stuck on a document would keep its
+        # process and CPU until the parse ends. The executor has no public way to stop a busy
+        # worker before Python 3.14 (terminate_workers), so terminate its processes directly;
+        # without the private mapping the stuck worker is left to finish on its own.
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _extract(self, executor: Optional[ProcessPoolExecutor], file_path: str) -> str:
+        if executor is None:
+            return await asyncio.wait_for(asyncio.to_thread(extract_document_text, file_path), self.timeout)
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(executor, extract_document_text, file_path), self.timeout)
+
+    async def extract(self, file_path: str) -> str:
+        """Text of a DOCX document, see extract_document_text"""
+        size = os.path.getsize(file_path)
+        if size > self.max_bytes:
+            self.stats["too_large"] += 1
+            raise DocumentTooLarge(f"Document is {size} bytes, the limit is {self.max_bytes}")
+
+        self.in_flight += 1
+        try:
+            for attempt in range(2):
+                executor = self._executor
+                try:
+                    text = await self._extract(executor, file_path)
+                    self.stats["parsed"] += 1
+                    return text
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    if executor is not None:
+                        self._restart(executor)
+                    raise TimeoutError(f"Parsing {os.path.basename(file_path)} took over {self.timeout}s")
+                except BrokenProcessPool:
+                    if executor is self._executor:
+                        # A worker died on this document, the pool takes no more work
+                        self._restart(executor)
+                        raise
+                    # Stopped along with a document that timed out
+                    if attempt:
+                        raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "running": self._executor is not None,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+        }
+
+
+document_pool = DocumentPool()
@@ -1,9 +1,8 @@
-import requests
 from typing import Dict, Any, Optional
-from docx import Document
 import logging
 import re
 import json
+from agents.document_pool import document_pool, extract_document_text
 from agents.openai import OpenAI
 
 
@@ -90,6 +89,13 @@ DYOR_JSON_STRUCTURE = {
 }
 
 
+def _is_json_object(text: str) -> bool:
+    try:
+        return isinstance(json.loads(text), dict)
+    except (TypeError, ValueError):
+        return False
+
+
 class DYORParser(OpenAI):
     DEFAULT_LORE = f"""You are a DYOR (Do Your Own Research) report parser.
                     Your task is to extract structured information from cryptocurrency project research reports.
@@ -110,42 +116,23 @@ class DYORParser(OpenAI):
     def parse_document(self, file_path: str) -> str:
         """
         Parse a DOCX document into text with hyperlinks formatted as HyperText.
-        Links are only processed within their original paragraphs.
-        
+        Blocks the calling thread; async code goes through document_pool.
+
         Args:
             file_path (str): Path to the DOCX file
-            
+
         Returns:
             str: Document text with hyperlinks formatted as text(url)
         """
-        doc = Document(file_path)
-        processed_paragraphs = []
-        logger.error(f"Processing {len(doc.paragraphs)} paragraphs")
-        for paragraph in doc.paragraphs:
-            text = paragraph.text
-            if len(paragraph.hyperlinks) > 0:
-              logger.error(f"Found {len(paragraph.hyperlinks)} hyperlinks")
-              for hyperlink in paragraph.hyperlinks:
-                  link_text = hyperlink.text
-                  url = hyperlink.url
-                  if link_text in text:
-                      start = text.find(link_text)
-                      if start >= 0:
-                          before = text[:start]
-                          after = text[start + len(link_text):]
-                          text = before + f"{link_text}({url})" + after
-                  else:
-                      text = text + f"{link_text}({url})"
-              processed_paragraphs.append(text)
-                  
-        return "\n".join(processed_paragraphs)
+        return extract_document_text(file_path)
 
-    def parse_document_with_openai(self, file_path: str) -> str:
+    async def parse_document_with_openai(self, file_path: str) -> str:
         from pprint import pprint
-        parsed_text = self.parse_document(file_path)
+        parsed_text = await document_pool.extract(file_path)
         prompt = (f"Parse the following DOCX document and return only the requested JSON structure with relevant URLs and data. "
                   f"If a field is not found, use null instead of leaving it empty.\n\n{parsed_text}")
-        res = self.chat(prompt)
+        # A reply that is not a JSON object would be replayed from the cache on every retry
+        res = await self.chat(prompt, validate=_is_json_object)
         
         pprint(res)
         json_res = json.loads(res)
@@ -1,8 +1,25 @@
-import requests
+import httpx
 from typing import Dict, Any, Optional
 
+from agents.llm_cache import llm_cache
+from connectors.http_client import HTTPClient
+from connectors.rate_limiter import RateLimitExceeded, rate_limiter
+
 
 class GrokAI:
+    DEFAULT_LORE = """
+                         You are a ethereum trader.
+                         You are professional psychologist.
+                         You are analyze community of crypto token and provide details about the community.
+                         You are analyze the toppest account that shilling that token. Do the doing it always for a lot of coins or only for that one.
+                         Your response should contain psyhological analysis of the community.
+                         Your response always should contain at the end return confident in procents about community will they rug token always in such format "Confidence in rugging token: your exepctection of rugging token in % ".
+                         Your response should check if posts from community about this token is only shilling or they believe in this token.
+                         Your response should analyze if community believe in this token.
+                         Your task not to write steps what to check but provide analysis."""
+    MODEL = "grok-2-1212"
+    REQUEST_TIMEOUT = 120.0
+
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.base_url = "https://api.x.ai/v1"  # Example API endpoint
@@ -11,36 +28,28 @@ class GrokAI:
             "Content-Type": "application/json"
         }
 
-    def _make_request(self, prompt: str) -> Dict[str, Any]:
+    async def _make_request(self, prompt: str, timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Make API request to Grok AI
         """
         print(f"Making request to {self.base_url}/chat/completions")
         try:
-            response = requests.post(
+            response = await rate_limiter.request("grok", lambda: HTTPClient.get_client().post(
                 f"{self.base_url}/chat/completions",
                 headers=self.headers,
                 json={
                     "messages": [
                         {"role": "system", 
-                         "content": """
-                         You are a ethereum trader.
-                         You are professional psychologist.
-                         You are analyze community of crypto token and provide details about the community.
-                         You are analyze the toppest account that shilling that token. Do the doing it always for a lot of coins or only for that one.
-                         Your response should contain psyhological analysis of the community.
-                         Your response always should contain at the end return confident in procents about community will they rug token always in such format "Confidence in rugging token: your exepctection of rugging token in % ".
-                         Your response should check if posts from community about this token is only shilling or they believe in this token.
-                         Your response should analyze if community believe in this token.
-                         Your task not to write steps what to check but provide analysis."""},
+                         "content": self.DEFAULT_LORE},
                         {"role": "user", "content": prompt}
                     ],
-                    "model": "grok-2-1212"
-                }
-            )
+                    "model": self.MODEL
+                },
+                timeout=timeout or self.REQUEST_TIMEOUT
+            ))
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, RateLimitExceeded) as e:
             return {
                 "error": str(e),
                 "success": False,
@@ -75,18 +84,29 @@ class GrokAI:
                 "raw_response": response
             }
 
-    def generate_response(self, prompt: str) -> Dict[str, Any]:
+    async def generate_response(self, prompt: str, timeout: Optional[float] = None, use_cache: bool = True) -> Dict[str, Any]:
         """
-        Generate response from Grok AI with standardized output format
+        Generate response from Grok AI with standardized output format.
+        Identical prompts are served from llm_cache unless use_cache is False.
         """
-        raw_response = self._make_request(prompt)
-        return self.process_response(raw_response)
+        if not use_cache:
+            llm_cache.bypass()
+            return self.process_response(await self._make_request(prompt, timeout))
+
+        key = llm_cache.make_key(self.MODEL, self.DEFAULT_LORE, prompt, None)
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self.process_response(await self._make_request(prompt, timeout))
+        if result["success"]:
+            await llm_cache.set(key, self.MODEL, result)
+        return result
 
-    def chat(self, prompt: str) -> str:
+    async def chat(self, prompt: str, timeout: Optional[float] = None, use_cache: bool = True) -> str:
         """
         Simple chat interface that returns just the response text
         """
-        result = self.generate_response(prompt)
+        result = await self.generate_response(prompt, timeout, use_cache)
         if result["success"]:
             return result["response"]
         else:
@@ -0,0 +1,155 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Tuple
+
+from settings import (
+    CHAT_HISTORY_MAX_TURNS,
+    CHAT_HISTORY_MAX_CHARS,
+    CHAT_SESSION_IDLE_SECONDS,
+    CHAT_SUMMARY_MAX_CHARS,
+)
+
+# Rough size of a token for budgeting prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+# How much of a compacted turn survives in the summary until it is summarized
+SUMMARY_LINE_CHARS = 200
+
+
+def _summary_line(turn: Dict[str, str]) -> str:
+    return f"{turn['role']}: {turn['content'][:SUMMARY_LINE_CHARS]}"
+
+
+class ChatSession:
+    def __init__(self):
+        self.turns: Deque[Dict[str, str]] = deque()
+        # Written summary of the turns folded in so far
+        self.summary = ""
+        # Turns compacted since, shown as truncated lines until they are folded in
+        self.evicted: Deque[Dict[str, str]] = deque()
+        self.chars = 0
+        self.last_access = time.monotonic()
+
+    def summary_text(self) -> str:
+        return "\n".join([self.summary, *map(_summary_line, self.evicted)] if self.summary
+                         else map(_summary_line, self.evicted))
+
+    def compact_oldest(self, summary_max_chars: int) -> None:
+        """Move the oldest turn out of the ring buffer, dropping the oldest unsummarized turns to stay in bounds"""
+        turn = self.turns.popleft()
+        self.chars -= len(turn["content"])
+        self.evicted.append(turn)
+        self.chars += len(_summary_line(turn))
+        while self.evicted and sum(len(_summary_line(turn)) for turn in self.evicted) > summary_max_chars:
+            self.chars -= len(_summary_line(self.evicted.popleft()))
+
+    def fold_in(self, summary: str, summarized: List[Dict[str, str]], summary_max_chars: int) -> None:
+        """Replace the written summary with one that covers the summarized turns"""
+        self.chars -= len(self.summary)
+        self.summary = summary[:summary_max_chars]
+        self.chars += len(self.summary)
+        done = {id(turn) for turn in summarized}
+        for turn in [turn for turn in self.evicted if id(turn) in done]:
+            self.evicted.remove(turn)
+            self.chars -= len(_summary_line(turn))
+
+
+class ChatHistoryStore:
+    """
+    Chat history per session id.
+
+    Each session keeps a ring buffer of its most recent turns; older turns are compacted
+    into a rolling summary. A compacted turn is kept as a truncated line until ChatAgent
+    folds it into the written summary with an LLM call (get_evicted and set_summary); if
+    that call fails the truncated lines stay and are folded in next time. Sessions idle for longer than idle_seconds are dropped,
+    and when the store as a whole exceeds max_total_chars the least recently used
+    sessions are evicted first.
+    """
+
+    def __init__(self, max_turns: int = CHAT_HISTORY_MAX_TURNS, idle_seconds: int = CHAT_SESSION_IDLE_SECONDS,
+                 max_total_chars: int = CHAT_HISTORY_MAX_CHARS, summary_max_chars: int = CHAT_SUMMARY_MAX_CHARS):
+        self.max_turns = max_turns
+        self.idle_seconds = idle_seconds
+        self.max_total_chars = max_total_chars
+        self.summary_max_chars = summary_max_chars
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._total_chars = 0
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access < self.idle_seconds:
+                break
+            self._drop(session_id)
+
+    def _drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._total_chars -= session.chars
+
+    def _get(self, session_id: str) -> ChatSession:
+        self._evict_idle()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = ChatSession()
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        session = self._get(session_id)
+        before = session.chars
+        session.turns.append({"role": role, "content": content})
+        session.chars += len(content)
+        while len(session.turns) > self.max_turns:
+            session.compact_oldest(self.summary_max_chars)
+        self._total_chars += session.chars - before
+
+        # Over the global cap: evict other sessions oldest first, then compact this one
+        while self._total_chars > self.max_total_chars and len(self._sessions) > 1:
+            self._drop(next(iter(self._sessions)))
+        while self._total_chars > self.max_total_chars and len(session.turns) > 1:
+            before = session.chars
+            session.compact_oldest(self.summary_max_chars)
+            self._total_chars += session.chars - before
+
+    def get_evicted(self, session_id: str) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Returns:
+            tuple: (written summary, turns compacted since it was written, oldest first)
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            return "", []
+        return session.summary, list(session.evicted)
+
+    def set_summary(self, session_id: str, summary: str, summarized: List[Dict[str, str]]) -> None:
+        """Store a written summary that covers the previous one plus the summarized turns from get_evicted"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        before = session.chars
+        session.fold_in(summary, summarized, self.summary_max_chars)
+        self._total_chars += session.chars - before
+
+    def get_context(self, session_id: str, token_budget: int) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Returns:
+            tuple: (rolling summary, most recent turns that fit in token_budget, oldest first)
+        """
+        session = self._get(session_id)
+        summary = session.summary_text()
+        budget = token_budget * CHARS_PER_TOKEN - len(summary)
+        recent = []
+        for turn in reversed(session.turns):
+            budget -= len(turn["content"])
+            if budget < 0:
+                break
+            recent.append(turn)
+        return summary, list(reversed(recent))
+
+    def clear(self, session_id: str) -> None:
+        self._drop(session_id)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"sessions": len(self._sessions), "total_chars": self._total_chars}
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+from connectors.mongodb import MongoDBConnector
+from settings import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Two-tier cache of LLM completions keyed by a hash of the request.
+
+    The memory tier is a bounded LRU local to the process. The persistent
+    tier is the `llm_cache` collection, expired by a TTL index on
+    `created_at`, so identical prompts are answered across restarts too.
+    Only successful completions are stored.
+    """
+    collection_name = "llm_cache"
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl_seconds: int = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._entries: "OrderedDict[str, Tuple[datetime, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypassed": 0,
+            "rejected": 0
+        }
+
+    @staticmethod
+    def make_key(model: str, lore: str, prompt: str, temperature: Optional[float]) -> str:
+        payload = json.dumps([model, lore, prompt, temperature], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _get_collection(self):
+        # The TTL index on created_at is part of DatabaseManager.INDEXES
+        if MongoDBConnector.client is None:
+            return None
+        return await MongoDBConnector.get_collection(self.collection_name)
+
+    def _remember(self, key: str, created_at: datetime, result: Dict[str, Any]) -> None:
+        self._entries[key] = (created_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            created_at, result = entry
+            if datetime.utcnow() - created_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return result
+            del self._entries[key]
+
+        try:
+            coll = await self._get_collection()
+            doc = await coll.find_one({"_id": key}) if coll is not None else None
+        except PyMongoError as e:
+            logger.error(f"LLM cache lookup failed: {e}")
+            doc = None
+        # The TTL monitor only runs once a minute, so check expiry here as well
+        if doc and datetime.utcnow() - doc["created_at"] < self.ttl:
+            self._remember(key, doc["created_at"], doc["result"])
+            self.stats["db_hits"] += 1
+            return doc["result"]
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, model: str, result: Dict[str, Any]) -> None:
+        created_at = datetime.utcnow()
+        self._remember(key, created_at, result)
+        self.stats["stores"] += 1
+        try:
+            coll = await self._get_collection()
+            if coll is not None:
+                await coll.update_one(
+                    {"_id": key},
+                    {"$set": {"model": model, "result": result, "created_at": created_at}},
+                    upsert=True
+                )
+        except PyMongoError as e:
+            logger.error(f"LLM cache store failed: {e}")
+
+    def bypass(self) -> None:
+        self.stats["bypassed"] += 1
+
+    def reject(self) -> None:
+        """Count a completion the caller's validator refused to cache or serve"""
+        self.stats["rejected"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["db_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_entries": len(self._entries),
+            "hit_rate": round(hits / lookups, 4) if lookups else None
+        }
+
+
+llm_cache = LLMCache()
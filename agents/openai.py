@@ -1,9 +1,22 @@
-import requests
-from typing import Dict, Any, Optional
+import json
+import logging
+
+import httpx
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional
+
+from agents.llm_cache import llm_cache
+from connectors.http_client import HTTPClient
+from connectors.rate_limiter import RateLimitExceeded, rate_limiter
+
+logger = logging.getLogger(__name__)
 
 
 class OpenAI:
     DEFAULT_LORE = "You are a helpful assistant."
+    MODEL = "gpt-4o-mini"
+    TEMPERATURE = 0.7
+    MAX_TOKENS = 8000
+    REQUEST_TIMEOUT = 120.0
 
     def __init__(self, api_key: str):
         self.api_key = api_key
@@ -13,7 +26,25 @@ class OpenAI:
             "Content-Type": "application/json"
         }
 
-    def _make_request(self, prompt: str, lore: Optional[str] = None) -> Dict[str, Any]:
+    def _build_payload(self, prompt: str, lore: str, stream: bool = False,
+                       history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        payload = {
+            "messages": [
+                {"role": "system", 
+                 "content": lore},
+                *(history or []),
+                {"role": "user", "content": prompt}
+            ],
+            "model": self.MODEL,
+            "temperature": self.TEMPERATURE,
+            "max_tokens": self.MAX_TOKENS
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def _make_request(self, prompt: str, lore: Optional[str] = None, timeout: Optional[float] = None,
+                            history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """
         Make API request to OpenAI
         """
@@ -21,23 +52,15 @@ class OpenAI:
             lore = self.DEFAULT_LORE
         print(f"Making request to {self.base_url}/chat/completions")
         try:
-            response = requests.post(
+            response = await rate_limiter.request("openai", lambda: HTTPClient.get_client().post(
                 f"{self.base_url}/chat/completions",
                 headers=self.headers,
-                json={
-                    "messages": [
-                        {"role": "system", 
-                         "content": lore},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "model": "gpt-4o-mini",
-                    "temperature": 0.7,
-                    "max_tokens": 8000
-                }
-            )
+                json=self._build_payload(prompt, lore, history=history),
+                timeout=timeout or self.REQUEST_TIMEOUT
+            ))
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, RateLimitExceeded) as e:
             return {
                 "error": str(e),
                 "success": False,
@@ -72,19 +95,75 @@ class OpenAI:
                 "raw_response": response
             }
 
-    def generate_response(self, prompt: str, lore: Optional[str] = None) -> Dict[str, Any]:
+    async def generate_response(self, prompt: str, lore: Optional[str] = None, timeout: Optional[float] = None,
+                                use_cache: bool = True, history: Optional[List[Dict[str, str]]] = None,
+                                validate: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
         """
-        Generate response from OpenAI with standardized output format
+        Generate response from OpenAI with standardized output format.
+        Identical (model, lore, prompt, temperature) requests are served from llm_cache unless use_cache is False.
+        With validate, only response texts it accepts are cached or served from the cache.
         """
-        raw_response = self._make_request(prompt, lore)
-        return self.process_response(raw_response)
+        if not use_cache:
+            llm_cache.bypass()
+            return self.process_response(await self._make_request(prompt, lore, timeout, history))
+
+        cache_prompt = json.dumps([*history, prompt]) if history else prompt
+        key = llm_cache.make_key(self.MODEL, lore or self.DEFAULT_LORE, cache_prompt, self.TEMPERATURE)
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            if validate is None or validate(cached["response"]):
+                return cached
+            llm_cache.reject()
+        result = self.process_response(await self._make_request(prompt, lore, timeout, history))
+        if result["success"]:
+            if validate is None or validate(result["response"]):
+                await llm_cache.set(key, self.MODEL, result)
+            else:
+                llm_cache.reject()
+        return result
 
-    def chat(self, prompt: str, lore: Optional[str] = None) -> str:
+    async def chat(self, prompt: str, lore: Optional[str] = None, timeout: Optional[float] = None,
+                   use_cache: bool = True, history: Optional[List[Dict[str, str]]] = None,
+                   validate: Optional[Callable[[str], bool]] = None) -> str:
         """
         Simple chat interface that returns just the response text
         """
-        result = self.generate_response(prompt, lore)
+        result = await self.generate_response(prompt, lore, timeout, use_cache, history, validate)
         if result["success"]:
             return result["response"]
         else:
             return f"Error: {result['error']}"
+
+    async def stream_chat(self, prompt: str, lore: Optional[str] = None, timeout: Optional[float] = None,
+                          history: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[str]:
+        """
+        Stream the completion with `stream: true`, yielding text deltas as they arrive.
+        Errors are raised as httpx.HTTPError or RateLimitExceeded.
+        """
+        if lore is None:
+            lore = self.DEFAULT_LORE
+        # A stream is not retried on 429, but its headers still pace the requests after it
+        await rate_limiter.acquire("openai")
+        async with HTTPClient.get_client().stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            headers=self.headers,
+            json=self._build_payload(prompt, lore, stream=True, history=history),
+            timeout=timeout or self.REQUEST_TIMEOUT
+        ) as response:
+            rate_limiter.observe("openai", response)
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                try:
+                    choices = json.loads(data).get("choices") or []
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed stream event: {data[:200]!r}")
+                    continue
+                content = choices[0].get("delta", {}).get("content") if choices else None
+                if content:
+                    yield content
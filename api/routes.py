@@ -1,13 +1,29 @@
 from fastapi import APIRouter, UploadFile, File
-from fastapi import FastAPI, Query, HTTPException, File, UploadFile
-from utils.utils import get_ticker_decision, parse_dyor_report, update_dyor_report, chat_with_agent
+from fastapi import FastAPI, Query, HTTPException, File, UploadFile, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+import httpx
+from bson import ObjectId
+import json
+import uuid
+from utils.utils import get_ticker_decision, parse_dyor_report, update_dyor_report, chat_with_agent, stream_chat_with_agent, chat_agent, DYOR_REPORT_PIPELINE
 from connectors.mongodb import MongoDBConnector,TokenAnalysis, DatabaseManager, Token, TokenResearchInput
 from typing import List
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from datetime import datetime
 from utils.storage import LocalStorage
-from connectors.mongodb import Attachment, DatabaseManager
+from agents.llm_cache import llm_cache
+from utils.jobs import job_queue
+from utils.response_cache import response_cache
+from utils.scheduler import research_scheduler
+from utils.singleflight import singleflight
+from connectors.rate_limiter import RateLimitExceeded, rate_limiter
+from connectors.http_cache import http_cache
+from connectors.http_client import HTTPClient
+from connectors.market_cache import market_cache
+from agents.document_pool import document_pool
+from connectors.mongodb import Attachment, DatabaseManager, encode_cursor
 import os
 from typing import Optional
 
@@ -42,16 +58,22 @@ async def upload_file(file: UploadFile = File(...)):
 async def get_token_analyses(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    token: str = Query(None, description="Token address to filter by")
+    token: str = Query(None, description="Token address to filter by"),
+    cursor: str = Query(None, description="next_cursor of the previous page; takes precedence over page")
 ):
-    skip = (page - 1) * per_page
+    skip = 0 if cursor else (page - 1) * per_page
     db_manager  = DatabaseManager()
-    total_count = await db_manager.get_total_count("analysis")
-    analyses = await db_manager.get_researches(
-        token_address=token,
-        skip=skip, 
-        limit=per_page
-    )
+    total_count = await db_manager.get_total_count("analysis", {"token_address": token} if token else None)
+    try:
+        analyses = await db_manager.get_researches(
+            token_address=token,
+            skip=skip, 
+            limit=per_page,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = encode_cursor(analyses[-1], "research_time") if len(analyses) == per_page else None
     
     # Convert MongoDB documents to dict and handle ObjectId serialization
     serialized_analyses = []
@@ -69,16 +91,29 @@ async def get_token_analyses(
             "total": total_count,
             "page": page,
             "per_page": per_page,
-            "total_pages": (total_count + per_page - 1) // per_page
+            "total_pages": (total_count + per_page - 1) // per_page,
+            "next_cursor": next_cursor
         }
     }
+def _serialize(payload) -> bytes:
+    return json.dumps(jsonable_encoder(payload, custom_encoder={ObjectId: str})).encode()
+
+
 @router.get("/token/{chain}/{token_address}")
-async def get_token(chain: str, token_address: str, include_research: bool = True):
-    db_manager = DatabaseManager()
-    analysis = await db_manager.get_token(token_address=token_address, chain=chain, include_research=include_research)
-    if not analysis:
-        raise HTTPException(status_code=404, detail="Token analysis not found")
-    return {"status": "success", "data": analysis}
+async def get_token(request: Request, chain: str, token_address: str, include_research: bool = True):
+    cache_key = ("token", chain, token_address, include_research)
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        db_manager = DatabaseManager()
+        analysis = await db_manager.get_token(token_address=token_address, chain=chain, include_research=include_research)
+        if not analysis:
+            raise HTTPException(status_code=404, detail="Token analysis not found")
+        cached = response_cache.set(
+            cache_key,
+            _serialize({"status": "success", "data": analysis}),
+            response_cache.token_tags(analysis["_id"], analysis.get("token_name"), analysis.get("token_address"))
+        )
+    return response_cache.respond(request, cached)
 
 
 @router.get("/token-analysis/{chain}/{token_address}")
@@ -95,6 +130,11 @@ async def get_token_analysis(chain: str, token_address: str):
 
 @router.get("/token-decision/{chain}/{token_address}")
 async def get_decision(chain: str, token_address: str):
+    # Concurrent requests for the same token share one decision run
+    key = ("token-decision", chain.lower(), token_address.lower())
+    return await singleflight.do(key, lambda: _make_decision(chain, token_address))
+
+async def _make_decision(chain: str, token_address: str):
     try:
         db_manager = DatabaseManager()
         
@@ -104,7 +144,7 @@ async def get_decision(chain: str, token_address: str):
             existing_analysis = existing_analysis[0]  # Get first analysis since it's sorted by latest
         
         # Get new decision
-        decision = get_ticker_decision(token_address=token_address, chain=chain)
+        decision = await get_ticker_decision(token_address=token_address, chain=chain)
         decision_lines = decision.split("\n")
         parsed_decision = {}
         for line in decision_lines:
@@ -166,49 +206,59 @@ async def analyze_dyor(file: UploadFile = File(...)):
         #Verify file extension
         if not file.filename.endswith('.docx'):
             return {"status": "error", "message": "Invalid file format. Please upload a .docx file"}
+        if file.size is not None and file.size > document_pool.max_bytes:
+            return {"status": "error", "message": f"File too large. The limit is {document_pool.max_bytes} bytes"}
 
-        # Save uploaded file temporarily
-        temp_file_path = f"temp_{file.filename}"
-        with open(temp_file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Keep the upload in storage until the job has parsed it, so a restarted worker can retry
+        file_path = storage.save_file(file, file.filename)
+        job_id = await job_queue.enqueue("parse_dyor_report", {"file_path": file_path})
 
-        result = await parse_dyor_report(temp_file_path)
-        # Clean up temp file
-        os.remove(temp_file_path)
-        
-        return result
+        return {"status": "queued", "job_id": job_id}
 
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
 @router.get("/token-by-name/{token_name}")
-async def get_token_by_name(token_name: str,
+async def get_token_by_name(request: Request, token_name: str,
     chain: str = Query(None, description="Chain to filter by"),
     include_researches: bool = Query(True, description="Include research in response")
 ):
-    db_manager = DatabaseManager()
-    token = await db_manager.get_token_by_name(token_name=token_name, chain=chain)
-    if not token:
-        raise HTTPException(status_code=404, detail="Token not found")
-    return {"status": "success", "data": Token(**token)}
+    cache_key = ("token-by-name", token_name, chain)
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        db_manager = DatabaseManager()
+        token = await db_manager.get_token_by_name(token_name=token_name, chain=chain)
+        if not token:
+            raise HTTPException(status_code=404, detail="Token not found")
+        cached = response_cache.set(
+            cache_key,
+            _serialize({"status": "success", "data": Token(**token)}),
+            response_cache.token_tags(token["_id"], token.get("token_name"), token.get("token_address"))
+        )
+    return response_cache.respond(request, cached)
 
 @router.get("/tokens")
 async def get_tokens(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    token_name: str = Query(None, description="Token name to filter by")
+    token_name: str = Query(None, description="Token name to filter by"),
+    cursor: str = Query(None, description="next_cursor of the previous page; takes precedence over page")
 ):
-    skip = (page - 1) * per_page
+    skip = 0 if cursor else (page - 1) * per_page
     db_manager = DatabaseManager()
     total_count = await db_manager.get_total_count("tokens")
     
-    analyses = await db_manager.get_tokens(
-        skip=skip, 
-        limit=per_page,
-        include_research=True
-    )
+    try:
+        analyses = await db_manager.get_tokens(
+            skip=skip, 
+            limit=per_page,
+            include_research=True,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = encode_cursor(analyses[-1], "last_research_time") if len(analyses) == per_page else None
     
     # Convert MongoDB documents to dict and handle ObjectId serialization
     serialized_analyses = []
@@ -222,15 +272,15 @@ async def get_tokens(
         else:
             analysis['latest_data'] = {}
             
-        # Extract the latest research if available
-        if analysis.get('researches') and len(analysis['researches']) > 0:
-            analysis['latest_research'] = analysis['researches'][0]
+        # Extract the latest AI report if available
+        if analysis.get('ai_reports') and len(analysis['ai_reports']) > 0:
+            analysis['latest_research'] = analysis['ai_reports'][0]
         else:
             analysis['latest_research'] = {}
             
-        # Remove the full lists since we only need the latest entries
+        # Remove the single-entry lists now that the latest entries are extracted
         analysis.pop('research_inputs', None)
-        analysis.pop('researches', None)
+        analysis.pop('ai_reports', None)
         
         serialized_analyses.append(analysis)
     
@@ -241,7 +291,8 @@ async def get_tokens(
             "total": total_count,
             "page": page,
             "per_page": per_page,
-            "total_pages": (total_count + per_page - 1) // per_page
+            "total_pages": (total_count + per_page - 1) // per_page,
+            "next_cursor": next_cursor
         }
     }
 
@@ -250,52 +301,93 @@ async def update_report_by_name(
     token_name: str,
     chain: str = Query(None, description="Chain to filter by")
 ):
-    try:
-        db_manager = DatabaseManager()
-        
-        # Get token and research inputs
-        token_data = await db_manager.get_token_by_name(token_name=token_name, chain=chain)
-        if not token_data:
-            raise HTTPException(status_code=404, detail="Token not found")
-            
-        # Convert to Token model
-        token = Token(**token_data)
-        # Check if there are any research inputs
-        if not token.research_inputs or len(token.research_inputs) == 0:
-            raise HTTPException(status_code=404, detail="No research input data found for this token")
-        
-        # Get the latest research input and convert to TokenResearchInput model
-        if token.ai_reports and len(token.ai_reports) > 0:
-            last_ai_report = token.ai_reports[-1].get('data', None)
-        else:
-            last_ai_report = None
-            
-        data = await update_dyor_report(dyor_report=token.research_inputs[-1].get('data'), 
-                                      token_address=token.token_address, 
-                                      token_chain=token.token_chain, 
-                                      last_ai_report=last_ai_report)
-        
-        # Update last_research_time
-        tokens_coll = await MongoDBConnector.get_collection("tokens")
-        await tokens_coll.update_one(
-            {"_id": token_data["_id"]},
-            {"$set": {"last_research_time": datetime.utcnow()}}
-        )
-        
-        return {
-            "status": "success", 
-            "data": data
+    db_manager = DatabaseManager()
+    
+    # Validate up front so the client gets a 404 instead of a failed job
+    token_data = await db_manager.get_token_by_name(token_name=token_name, chain=chain)
+    if not token_data:
+        raise HTTPException(status_code=404, detail="Token not found")
+    if not token_data.get('research_inputs'):
+        raise HTTPException(status_code=404, detail="No research input data found for this token")
+
+    # Requests for a token whose update is already queued or running join that job
+    job_id = await job_queue.enqueue(
+        "update_report",
+        {"token_name": token_name, "chain": chain},
+        dedupe_key=f"update_report:{token_data['_id']}"
+    )
+    return {"status": "queued", "job_id": job_id}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "status": "success",
+        "data": {
+            "job_id": job["_id"],
+            "type": job["type"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "attempts": job["attempts"],
+            "result": job["result"],
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"]
         }
-        
-    except HTTPException as he:
-        raise he
+    }
 
 
 from pydantic import BaseModel
 class MessageModel(BaseModel):
     message: str
     attachment_ids: Optional[List[str]] = None
+    session_id: Optional[str] = None
 @router.post("/chat")
 async def chat(message: MessageModel):
-    response = await chat_with_agent(message.message, message.attachment_ids)
-    return response
\ No newline at end of file
+    # Clients keep the returned session_id and send it back to continue the conversation
+    session_id = message.session_id or uuid.uuid4().hex
+    response = await chat_with_agent(message.message, message.attachment_ids, session_id)
+    return response
+
+
+@router.post("/chat/stream")
+async def chat_stream(message: MessageModel):
+    """
+    Server-sent events: a `data: {"delta": ...}` event per chunk of the reply as the model
+    generates it, then a `done` event, or an `error` event if the upstream call fails.
+    """
+    session_id = message.session_id or uuid.uuid4().hex
+
+    async def events():
+        try:
+            async for delta in stream_chat_with_agent(message.message, session_id):
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        except (httpx.HTTPError, RateLimitExceeded) as e:
+            yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+            return
+        done = {'requires_dyor': chat_agent._is_dyor_request(message.message), 'session_id': session_id}
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/metrics")
+async def metrics():
+    return {
+        "llm_cache": llm_cache.get_stats(),
+        "response_cache": response_cache.get_stats(),
+        "chat_history": chat_agent.history.get_stats(),
+        "singleflight": singleflight.get_stats(),
+        "jobs": job_queue.get_stats(),
+        "research_scheduler": research_scheduler.get_stats(),
+        "document_pool": document_pool.get_stats(),
+        "report_stages": DYOR_REPORT_PIPELINE.get_stats(),
+        "rate_limits": rate_limiter.get_stats(),
+        "http_cache": http_cache.get_stats(),
+        "market_cache": market_cache.get_stats(),
+        "http_pools": HTTPClient.get_stats()
+    }
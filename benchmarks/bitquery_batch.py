@@ -0,0 +1,85 @@
+"""
+Holder counts and all-time highs of many tokens from a fixture Bitquery endpoint:
+one combined request per token vs the batched query with `batch_size` tokens per request.
+
+Pacing is disabled so the wall time shows round trips only; the projected time under
+the Bitquery quota is printed next to it.
+
+    python -m benchmarks.bitquery_batch --tokens 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from connectors import bitquery_connector
+from connectors.bitquery_connector import BitqueryConnector
+from connectors.http_client import HTTPClient
+from connectors.market_cache import market_cache
+from connectors.rate_limiter import RateLimiter
+from settings import RATE_LIMITS
+
+# Simulated round trip of one Bitquery request, in seconds, plus a little per token in it
+LATENCY = 0.3
+PER_TOKEN = 0.005
+
+
+class FixtureServer:
+    def __init__(self):
+        self.requests = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        variables = json.loads(request.content)["variables"]
+        tokens = [value for name, value in variables.items() if name.startswith("token_")]
+        await asyncio.sleep(LATENCY + PER_TOKEN * len(tokens))
+        data = {}
+        for i, token in enumerate(tokens):
+            data[f"holders_{i}"] = {"TokenHolders": [{"uniq": str(int(token[-4:], 16))}]}
+            data[f"max_price_{i}"] = {"DEXTradeByTokens": [
+                {"Trade": {"high": 1.5}, "Block": {"Timefield": "2025-01-01T00:00:00Z"}}
+            ]}
+        return httpx.Response(200, json={"data": data})
+
+
+async def run(token_count: int):
+    server = FixtureServer()
+    HTTPClient.client = httpx.AsyncClient(transport=httpx.MockTransport(server.handle))
+    bitquery_connector.rate_limiter = RateLimiter({"bitquery": (1e6, 1e6)})
+    connector = BitqueryConnector("fixture")
+    tokens = [(f"0x{i:040x}", "eth") for i in range(token_count)]
+    quota_rate = RATE_LIMITS["bitquery"][0]
+
+    results = {}
+    for name, fetch in (
+        ("per token", lambda: asyncio.gather(*[
+            connector.get_token_stats(address, network, "2025-01-01", "2025-01-02") for address, network in tokens
+        ])),
+        ("batched", lambda: connector.get_tokens_stats(tokens, "2025-01-01", "2025-01-02")),
+    ):
+        market_cache.clear()
+        server.requests = 0
+        start = time.perf_counter()
+        results[name] = await fetch()
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<10}: {server.requests:>4} requests, {elapsed:6.2f}s, "
+              f"~{server.requests / quota_rate:6.1f}s at {quota_rate} req/s quota")
+
+    per_token = [stats.holders_count for stats in results["per token"]]
+    batched = [results["batched"][(address, network)].holders_count for address, network in tokens]
+    assert per_token == batched, "batched results differ from per-token results"
+    await HTTPClient.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=500)
+    args = parser.parse_args()
+    print(f"{args.tokens} tokens, batch size {BitqueryConnector('').batch_size}")
+    asyncio.run(run(args.tokens))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+N concurrent /chat calls against a local stub of the OpenAI completions API.
+
+Compares the old blocking agent (requests.post on the event loop thread)
+with the async agent on the shared HTTPClient pool.
+
+    python -m benchmarks.chat_concurrency --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import requests
+import uvicorn
+from fastapi import FastAPI
+
+from agents.openai import OpenAI
+from connectors.http_client import HTTPClient
+from main import app
+from utils.utils import chat_agent
+
+
+def build_stub(latency: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/v1/chat/completions")
+    async def completions(body: Dict[str, Any]):
+        await asyncio.sleep(latency)
+        return {"choices": [{"message": {"role": "assistant", "content": "stub reply"}}]}
+
+    return stub
+
+
+def start_stub(latency: float, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(build_stub(latency), port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def blocking_make_request(self, prompt: str, lore: Optional[str] = None, timeout: Optional[float] = None,
+                                history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    # The pre-async transport, kept here only as the baseline. It sends the same payload
+    # as OpenAI._make_request, chat history included, so only the transport differs.
+    response = requests.post(
+        f"{self.base_url}/chat/completions",
+        headers=self.headers,
+        json=self._build_payload(prompt, lore or self.DEFAULT_LORE, history=history)
+    )
+    return response.json()
+
+
+async def run_round(n: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/chat", json={"message": f"hello {i}"}) for i in range(n)
+        ])
+        elapsed = time.perf_counter() - start
+    await HTTPClient.close()
+    assert all(r.status_code == 200 for r in responses)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = start_stub(args.latency, args.port)
+    chat_agent.base_url = f"http://127.0.0.1:{args.port}/v1"
+
+    async_make_request = OpenAI._make_request
+    OpenAI._make_request = blocking_make_request
+    blocking = asyncio.run(run_round(args.requests))
+    OpenAI._make_request = async_make_request
+    pooled = asyncio.run(run_round(args.requests))
+
+    server.should_exit = True
+    print(f"{args.requests} concurrent /chat calls, {args.latency:.2f}s upstream latency")
+    print(f"  blocking requests.post : {blocking:.2f}s")
+    print(f"  async pooled client    : {pooled:.2f}s ({blocking / pooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+N concurrent DOCX uploads parsed on the event loop thread, as DYORParser.parse_document
+did, vs through the document pool. Reports throughput and how long the loop stalled,
+measured by a heartbeat that should wake every 10ms.
+
+    python -m benchmarks.docx_pool --uploads 8 --paragraphs 3000 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import docx
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from agents.document_pool import DocumentPool, extract_document_text
+from benchmarks.harness import percentile
+
+HEARTBEAT = 0.01
+
+
+def add_hyperlink(paragraph, text: str, url: str) -> None:
+    r_id = paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+    hyperlink = OxmlElement("w:hyperlink")
+    hyperlink.set(qn("r:id"), r_id)
+    run = OxmlElement("w:r")
+    run_text = OxmlElement("w:t")
+    run_text.text = text
+    run.append(run_text)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+def build_document(path: str, paragraphs: int) -> None:
+    document = docx.Document()
+    for i in range(paragraphs):
+        paragraph = document.add_paragraph(f"Section {i}: the team shipped the roadmap milestone, see ")
+        for j in range(3):
+            add_hyperlink(paragraph, f"source {j}", f"https://example.com/{i}/{j}")
+    document.save(path)
+
+
+async def heartbeat(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - start - HEARTBEAT)
+
+
+async def measure(parse, paths: list):
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.ensure_future(heartbeat(lags, stop))
+    start = time.perf_counter()
+    texts = await asyncio.gather(*[parse(path) for path in paths])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return texts, elapsed, lags
+
+
+async def run(args, paths: list):
+    async def on_loop(path):
+        return extract_document_text(path)
+
+    pool = DocumentPool(workers=args.workers)
+    start = time.perf_counter()
+    await pool.start()
+    print(f"  pool warm-up: {time.perf_counter() - start:.2f}s for {args.workers} workers")
+
+    results = {}
+    for name, parse in (("event loop", on_loop), ("pool", pool.extract)):
+        texts, elapsed, lags = await measure(parse, paths)
+        results[name] = texts
+        print(f"  {name:<10}: {elapsed:6.2f}s, {len(paths) / elapsed:5.2f} docs/s, "
+              f"loop stall p50 {percentile(lags, 50) * 1000:7.1f}ms, max {max(lags) * 1000:7.1f}ms")
+    await pool.stop()
+    assert results["event loop"] == results["pool"], "pool output differs from the event loop parse"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--paragraphs", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "report.docx")
+        build_document(path, args.paragraphs)
+        print(f"{args.uploads} concurrent uploads of a {os.path.getsize(path) // 1024}KB document "
+              f"({args.paragraphs} paragraphs), {os.cpu_count()} CPUs")
+        asyncio.run(run(args, [path] * args.uploads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+GitHubConnector.get_github_repos_info against fixture responses for an organisation:
+the per-repo /commits mode vs the pushed_at listing and the batched GraphQL query.
+
+Responses are served from in-memory fixtures shaped like the GitHub REST and GraphQL
+payloads, with a simulated round trip per request. Pacing is disabled so the wall time
+shows round trips only; the projected time under the authenticated GitHub quota is
+printed next to it.
+
+    python -m benchmarks.github_repos --repos 200
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from connectors import github
+from connectors.http_client import HTTPClient
+from connectors.rate_limiter import RateLimiter
+from settings import RATE_LIMITS
+
+ORG = "bench-org"
+# Simulated round trip of one GitHub API request, in seconds
+LATENCY = 0.05
+
+
+def build_fixtures(repo_count: int):
+    start = datetime(2025, 1, 1)
+    repos = []
+    for i in range(repo_count):
+        committed = (start - timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        repos.append({
+            "name": f"repo-{i}",
+            "full_name": f"{ORG}/repo-{i}",
+            "stargazers_count": i * 3,
+            "description": f"Fixture repo {i}",
+            "language": "Python",
+            "fork": False,
+            "archived": i % 10 == 9,
+            "visibility": "public",
+            "default_branch": "main",
+            "pushed_at": committed,
+        })
+    return repos
+
+
+class FixtureServer:
+    def __init__(self, repos):
+        self.repos = repos
+        self.requests = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        time.sleep(LATENCY)
+        path = request.url.path
+        if request.method == "POST" and path == "/graphql":
+            return httpx.Response(200, json=self.graphql(json.loads(request.content)))
+        if path == f"/users/{ORG}":
+            return httpx.Response(200, json={"login": ORG, "type": "Organization"})
+        if path == f"/orgs/{ORG}/repos":
+            page, per_page = int(request.url.params["page"]), int(request.url.params["per_page"])
+            return httpx.Response(200, json=self.repos[(page - 1) * per_page:page * per_page])
+        if path.endswith("/commits"):
+            name = path.split("/")[-2]
+            repo = next(repo for repo in self.repos if repo["name"] == name)
+            return httpx.Response(200, json=[{"commit": {"committer": {"date": repo["pushed_at"]}}}])
+        return httpx.Response(404, json={})
+
+    def graphql(self, body):
+        offset = int(body["variables"]["cursor"] or 0)
+        page = self.repos[offset:offset + 100]
+        nodes = [{
+            "name": repo["name"],
+            "nameWithOwner": repo["full_name"],
+            "description": repo["description"],
+            "stargazerCount": repo["stargazers_count"],
+            "isArchived": repo["archived"],
+            "isFork": repo["fork"],
+            "visibility": repo["visibility"].upper(),
+            "primaryLanguage": {"name": repo["language"]},
+            "defaultBranchRef": {"name": repo["default_branch"], "target": {"committedDate": repo["pushed_at"]}},
+        } for repo in page]
+        has_next = offset + 100 < len(self.repos)
+        return {"data": {"repositoryOwner": {"repositories": {
+            "pageInfo": {"hasNextPage": has_next, "endCursor": str(offset + 100)},
+            "nodes": nodes,
+        }}}}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=200)
+    args = parser.parse_args()
+
+    server = FixtureServer(build_fixtures(args.repos))
+    HTTPClient.sync_client = httpx.Client(transport=httpx.MockTransport(server.handle))
+    github.rate_limiter = RateLimiter({"github": (1e6, 1e6)})
+    quota_rate = RATE_LIMITS["github"][0]
+
+    connector = github.GitHubConnector(token="fixture")
+    print(f"{args.repos} repos, {LATENCY * 1000:.0f}ms per request")
+    results = {}
+    for mode in github.GitHubConnector.MODES:
+        server.requests = 0
+        start = time.perf_counter()
+        results[mode] = connector.get_github_repos_info(ORG, mode=mode)
+        elapsed = time.perf_counter() - start
+        print(f"  {mode:<10}: {server.requests:>4} requests, {elapsed:6.2f}s, "
+              f"~{server.requests / quota_rate:6.1f}s at {quota_rate} req/s quota")
+
+    dates = {mode: [repo["last_commit_date"] for repo in repos] for mode, repos in results.items()}
+    assert dates["pushed_at"] == dates["commits"] == dates["graphql"], "modes disagree on fixture data"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Shared pieces of the offline benchmarks: the in-memory MongoDB stand-in, replaying
+upstream traffic from a cassette, and latency percentiles with a baseline check.
+"""
+import asyncio
+import json
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from agents.llm_cache import llm_cache
+from connectors import rate_limiter as rate_limiter_module
+from connectors.http_client import HTTPClient
+from connectors.market_cache import market_cache
+from connectors.mongodb import MongoDBConnector, count_cache
+from connectors.replay import Cassette, ReplayConfig
+from utils.response_cache import response_cache
+
+
+def use_in_memory_mongo() -> None:
+    """Point MongoDBConnector at mongomock (see benchmarks/requirements.txt)"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    MongoDBConnector.client = AsyncMongoMockClient()
+    MongoDBConnector.db = MongoDBConnector.client[MongoDBConnector.db_name]
+
+
+async def use_cassette(cassette: Cassette, latency: Optional[float] = None, latency_scale: float = 1.0) -> None:
+    """Serve every upstream request from the cassette; must run before the clients are created"""
+    await HTTPClient.close()
+    ReplayConfig.configure("replay", cassette=cassette, latency=latency, latency_scale=latency_scale)
+
+
+async def use_recorder(cassette_path: str) -> None:
+    await HTTPClient.close()
+    ReplayConfig.configure("record", cassette_path=cassette_path)
+
+
+def disable_pacing() -> None:
+    # Measure our own code paths, not the provider quotas
+    for bucket in rate_limiter_module.rate_limiter.buckets.values():
+        bucket.interval = 0.0
+        bucket.tolerance = 0.0
+
+
+async def reset_caches() -> None:
+    """Drop the caches so every run does the full work"""
+    llm_cache._entries.clear()
+    collection = await llm_cache._get_collection()
+    if collection is not None:
+        await collection.delete_many({})
+    response_cache._entries.clear()
+    market_cache.clear()
+    count_cache._totals.clear()
+    count_cache._filtered.clear()
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+async def measure(name: str, fn: Callable[[], Awaitable[Any]], runs: int, concurrency: int = 1,
+                  before_each: Optional[Callable[[], Awaitable[Any]]] = None) -> Dict[str, Any]:
+    """Run fn `runs` times, `concurrency` at a time, and summarise the latencies"""
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            if before_each is not None:
+                await before_each()
+            start = time.perf_counter()
+            try:
+                await fn()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(runs)])
+    wall = time.perf_counter() - start
+    return {
+        "name": name,
+        "runs": runs,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "throughput_rps": round(runs / wall, 2),
+    }
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'benchmark':<28}{'runs':>6}{'conc':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for result in results:
+        print(f"{result['name']:<28}{result['runs']:>6}{result['concurrency']:>6}{result['errors']:>5}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}{result['throughput_rps']:>9}")
+
+
+def check_regressions(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Benchmarks whose p95 grew by more than `tolerance` (0.2 = 20%) over the saved baseline"""
+    with open(baseline_path) as f:
+        baseline = {result["name"]: result for result in json.load(f)}
+    regressions = []
+    for result in results:
+        before = baseline.get(result["name"])
+        if before and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if before and result["errors"] > before["errors"]:
+            regressions.append(f"{result['name']}: errors {before['errors']} -> {result['errors']}")
+    return regressions
@@ -0,0 +1,59 @@
+"""
+get_token_info through the market data cache, with simulated upstream latencies:
+a cold call, calls served fresh from the cache, and calls served stale while the
+cache refreshes in the background.
+
+    python -m benchmarks.market_cache_swr --runs 5
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import token_info_fanout as fakes
+from connectors.market_cache import market_cache
+from utils import utils
+
+
+async def fake_stats_batch(tokens, holders_date, max_price_date):
+    stats = await fakes.fake_onchain_stats(tokens[0][0], tokens[0][1], holders_date, max_price_date)
+    return {tokens[0]: stats}
+
+
+async def timed(runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        await utils.get_token_info(token_address='0xbench', chain='eth')
+    return (time.perf_counter() - start) / runs
+
+
+async def run(runs: int):
+    cold = await timed(1)
+    fresh = await timed(runs)
+    # Every entry is now past its TTL: served at once, refreshed behind the caller
+    for kind in market_cache.ttls:
+        market_cache.ttls[kind] = 0
+    stale = await timed(runs)
+    await asyncio.gather(*market_cache._tasks)
+    return cold, fresh, stale
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    utils.moralis_connector._fetch_token_info = fakes.fake_metadata
+    utils.moralis_connector._fetch_token_top_holders = lambda token_address, chain, limit, order: fakes.fake_top_holders(token_address, chain)
+    utils.moralis_connector._fetch_token_price_info = fakes.fake_price
+    utils.bitquery_connector._fetch_batch = fake_stats_batch
+
+    cold, fresh, stale = asyncio.run(run(args.runs))
+    print(f"simulated latencies: {fakes.LATENCIES}")
+    print(f"  cold  : {cold:.3f}s per call")
+    print(f"  fresh : {fresh:.3f}s per call")
+    print(f"  stale : {stale:.3f}s per call (refreshed in the background)")
+    print(f"  stats : {market_cache.get_stats()['kinds']}")
+
+
+if __name__ == "__main__":
+    main()
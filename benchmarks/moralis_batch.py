@@ -0,0 +1,98 @@
+"""
+Metadata and prices of many tokens from a fixture Moralis endpoint: get_token_info and
+get_token_price_info per token vs the bulk get_tokens_info and get_tokens_price_info.
+
+Pacing is disabled so the wall time shows round trips only; the projected time under
+the Moralis quota is printed next to it.
+
+    python -m benchmarks.moralis_batch --tokens 300
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from connectors import moralis
+from connectors.http_client import HTTPClient
+from connectors.market_cache import market_cache
+from connectors.moralis import MoralisConnector
+from connectors.rate_limiter import RateLimiter
+from settings import RATE_LIMITS
+
+# Simulated round trip of one Moralis request, in seconds
+LATENCY = 0.2
+
+
+def metadata(address: str) -> dict:
+    return {"address": address, "name": f"Token {address[-4:]}", "symbol": "TKN", "decimals": "18",
+            "total_supply_formatted": "1000000", "links": {}}
+
+
+def price(address: str) -> dict:
+    return {"tokenAddress": address, "usdPrice": int(address[-4:], 16) / 1000, "pairTotalLiquidityUsd": "50000"}
+
+
+class FixtureServer:
+    def __init__(self):
+        self.requests = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(LATENCY)
+        path = request.url.path
+        if path.endswith("/erc20/metadata"):
+            return httpx.Response(200, json=[metadata(address) for address in request.url.params.get_list("addresses[]")])
+        if path.endswith("/erc20/prices"):
+            tokens = json.loads(request.content)["tokens"]
+            return httpx.Response(200, json=[price(token["token_address"]) for token in tokens])
+        if path.endswith("/price"):
+            return httpx.Response(200, json=price(path.split("/")[-2]))
+        return httpx.Response(404, json={})
+
+
+async def run(token_count: int):
+    server = FixtureServer()
+    HTTPClient.client = httpx.AsyncClient(transport=httpx.MockTransport(server.handle))
+    moralis.rate_limiter = RateLimiter({"moralis": (1e6, 1e6)})
+    connector = MoralisConnector("fixture")
+    addresses = [f"0x{i:040x}" for i in range(token_count)]
+    quota_rate = RATE_LIMITS["moralis"][0]
+
+    async def per_token():
+        infos = await asyncio.gather(*[connector.get_token_info(address, "eth") for address in addresses])
+        prices = await asyncio.gather(*[connector.get_token_price_info(address, "eth") for address in addresses])
+        return {info["address"]: (info["name"], price["usdPrice"]) for info, price in zip(infos, prices)}
+
+    async def batched():
+        infos, prices = await asyncio.gather(connector.get_tokens_info(addresses, "eth"),
+                                             connector.get_tokens_price_info(addresses, "eth"))
+        return {address: (infos[address]["name"], prices[address]["usdPrice"]) for address in addresses}
+
+    results = {}
+    for name, fetch in (("per token", per_token), ("batched", batched)):
+        market_cache.clear()
+        server.requests = 0
+        start = time.perf_counter()
+        results[name] = await fetch()
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<10}: {server.requests:>4} requests, {elapsed:6.2f}s, "
+              f"~{server.requests / quota_rate:6.1f}s at {quota_rate} req/s quota")
+
+    assert results["per token"] == results["batched"], "batched results differ from per-token results"
+    await HTTPClient.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=300)
+    args = parser.parse_args()
+    connector = MoralisConnector("")
+    print(f"{args.tokens} tokens, {connector.metadata_batch_size} per metadata request, "
+          f"{connector.price_batch_size} per price request")
+    asyncio.run(run(args.tokens))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+End-to-end latency of the research pipelines and the hot API routes with every upstream
+(OpenAI, Grok, Moralis, Bitquery, GitHub, social platforms) replayed from a cassette and
+MongoDB replaced by mongomock, so runs are repeatable and need no keys or network.
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.pipelines --runs 10 --concurrency 2
+    python -m benchmarks.pipelines --json benchmarks/baseline.json
+    python -m benchmarks.pipelines --baseline benchmarks/baseline.json --tolerance 0.2
+
+Without --cassette the synthetic responses from benchmarks/sample_cassette.py are used.
+`--record path.json` runs once against the live providers (keys from .env) and saves a
+cassette to replay later. /tokens is not covered: mongomock does not implement the
+`$lookup` with `let` its aggregation uses.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+from docx import Document
+from dotenv import load_dotenv
+
+# Replayed requests need no real keys, but the connectors cannot build headers from missing ones
+load_dotenv()
+for key in ("OPENAI_API_KEY", "GROK_API_KEY", "MORALIS_API_KEY", "BITQUERY_API_KEY", "TWITTER_API_KEY"):
+    os.environ.setdefault(key, "replay")
+
+from benchmarks import harness
+from benchmarks.sample_cassette import DYOR_REPORT, TOKEN_ADDRESS, TOKEN_CHAIN, TOKEN_NAME, build_sample_cassette
+from connectors.http_client import HTTPClient
+from connectors.mongodb import DatabaseManager
+from connectors.replay import Cassette, ReplayConfig
+
+
+def write_report_docx(directory: str) -> str:
+    """A small DYOR report; its content only matters to the parser prompt"""
+    document = Document()
+    document.add_heading(DYOR_REPORT["document_title"], 0)
+    document.add_paragraph(DYOR_REPORT["summary"])
+    for section in DYOR_REPORT["sections"]:
+        document.add_heading(section["section_title"], 1)
+        document.add_paragraph(section["content"])
+    table = document.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Token address"
+    table.rows[0].cells[1].text = TOKEN_ADDRESS
+    for platform in DYOR_REPORT["social_media"]["platforms"]:
+        document.add_paragraph(f"{platform['name']}: {platform['url']}")
+    path = str(Path(directory) / "pepe_dyor.docx")
+    document.save(path)
+    return path
+
+
+def build_benchmarks(report_path: str, api: httpx.AsyncClient):
+    from utils import utils
+
+    async def token_decision():
+        response = await api.get(f"/token-decision/{TOKEN_CHAIN}/{TOKEN_ADDRESS}")
+        if response.json().get("status") != "success":
+            raise RuntimeError(response.text)
+
+    async def token_by_name():
+        (await api.get(f"/token-by-name/{TOKEN_NAME}")).raise_for_status()
+
+    async def chat():
+        (await api.post("/chat", json={"message": f"What is {TOKEN_NAME}?"})).raise_for_status()
+
+    return [
+        ("parse_dyor_report", lambda: utils.parse_dyor_report(report_path)),
+        ("update_report_by_name", lambda: utils.update_report_by_name(TOKEN_NAME)),
+        ("get_ticker_decision", lambda: utils.get_ticker_decision(TOKEN_ADDRESS, TOKEN_CHAIN)),
+        ("GET /token-decision", token_decision),
+        ("GET /token-by-name", token_by_name),
+        ("POST /chat", chat),
+    ]
+
+
+async def run(args) -> list:
+    harness.use_in_memory_mongo()
+    await DatabaseManager().ensure_indexes()
+    if args.record:
+        await harness.use_recorder(args.record)
+    else:
+        cassette = Cassette(args.cassette) if args.cassette else build_sample_cassette()
+        await harness.use_cassette(cassette, latency=args.latency, latency_scale=args.latency_scale)
+    if not args.pacing:
+        harness.disable_pacing()
+
+    from main import app
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        report_path = write_report_docx(directory)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as api:
+            benchmarks = build_benchmarks(report_path, api)
+            runs = 1 if args.record else args.runs
+            # The first parse creates the token and its research input the other benchmarks read
+            for name, fn in benchmarks:
+                results.append(await harness.measure(name, fn, runs, args.concurrency, harness.reset_caches))
+    await HTTPClient.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cassette", help="replay this cassette instead of the built-in sample")
+    parser.add_argument("--record", metavar="PATH", help="call the live providers once and save a cassette")
+    parser.add_argument("--latency", type=float, help="fixed upstream latency in seconds")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier for recorded latencies")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--pacing", action="store_true", help="keep the provider rate limits")
+    parser.add_argument("--json", metavar="PATH", help="write the results, e.g. as a new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="fail if p95 or errors regressed against this file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Pipeline prints and logs would drown the table
+    logging.disable(logging.CRITICAL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(run(args))
+
+    harness.print_table(results)
+    if ReplayConfig.replay_transport is not None:
+        print(f"replay: {ReplayConfig.replay_transport.stats}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = harness.check_regressions(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
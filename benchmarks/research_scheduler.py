@@ -0,0 +1,94 @@
+"""
+One scan of the research scheduler over N stale tokens, with upstream traffic replayed
+from the sample cassette and MongoDB replaced by mongomock: refresh throughput at the
+configured concurrency, the upstream requests it costs per provider, and a second scan
+under a small OpenAI budget that stops early.
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.research_scheduler --tokens 20 --concurrency 4
+"""
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+# Replayed requests need no real keys, but the connectors cannot build headers from missing ones
+load_dotenv()
+for key in ("OPENAI_API_KEY", "GROK_API_KEY", "MORALIS_API_KEY", "BITQUERY_API_KEY", "TWITTER_API_KEY"):
+    os.environ.setdefault(key, "replay")
+
+from benchmarks import harness
+from benchmarks.sample_cassette import DYOR_REPORT, TOKEN_ADDRESS, TOKEN_CHAIN, build_sample_cassette
+from connectors.mongodb import DatabaseManager, MongoDBConnector, Token, TokenResearchInput
+from utils.scheduler import ResearchScheduler
+
+
+async def seed(count: int) -> None:
+    db_manager = DatabaseManager()
+    tokens = await MongoDBConnector.get_collection(db_manager.tokens_collection)
+    await tokens.delete_many({})
+    for i in range(count):
+        name = f"Pepe {i}"
+        token_id = await db_manager.save_token(Token(token_name=name, token_address=TOKEN_ADDRESS, token_chain=TOKEN_CHAIN))
+        report = copy.deepcopy(DYOR_REPORT)
+        report["general_info"]["project_name"] = name
+        await db_manager.save_research_input(TokenResearchInput(
+            token_id=str(token_id), token_name=name, token_address=TOKEN_ADDRESS, token_chain=TOKEN_CHAIN, data=report
+        ))
+        # Staggered so the scheduler has an order to follow
+        await tokens.update_one({"_id": token_id},
+                                {"$set": {"last_research_time": datetime.utcnow() - timedelta(days=2, hours=i)}})
+
+
+async def scan(scheduler: ResearchScheduler) -> float:
+    await harness.reset_caches()
+    start = time.perf_counter()
+    await scheduler.run_once()
+    return time.perf_counter() - start
+
+
+async def run(args):
+    harness.use_in_memory_mongo()
+    await DatabaseManager().ensure_indexes()
+    await harness.use_cassette(build_sample_cassette(), latency_scale=args.latency_scale)
+    harness.disable_pacing()
+
+    await seed(args.tokens)
+    scheduler = ResearchScheduler(concurrency=args.concurrency)
+    elapsed = await scan(scheduler)
+    stats = scheduler.get_stats()
+
+    await seed(args.tokens)
+    budgeted = ResearchScheduler(concurrency=args.concurrency, budgets={"openai": args.openai_budget})
+    budgeted_elapsed = await scan(budgeted)
+    return (elapsed, stats), (budgeted_elapsed, budgeted.get_stats())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-scale", type=float, default=0.2)
+    parser.add_argument("--openai-budget", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(run(args))
+
+    for label, (elapsed, stats) in zip(("unlimited", f"openai budget {args.openai_budget}"), results):
+        print(f"{label}: {stats['refreshed']} of {args.tokens} refreshed ({stats['failed']} failed) in {elapsed:.2f}s, "
+              f"{stats['refreshed'] / elapsed:.2f} tokens/s at concurrency {args.concurrency}")
+        print(f"  max lag at scan {stats['last_scan']['max_lag_seconds'] / 3600:.1f}h, "
+              f"requests per provider {stats['budget_usage']}")
+
+
+if __name__ == "__main__":
+    main()
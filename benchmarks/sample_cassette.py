@@ -0,0 +1,135 @@
+"""
+A hand-written cassette with one response per upstream endpoint the pipelines call,
+so the benchmark suite runs without API keys. Latencies approximate what the providers
+answer in practice. Record a real cassette with `python -m benchmarks.pipelines --record`
+for numbers closer to production.
+"""
+import json
+
+import httpx
+
+from agents.grok import GrokAI
+from agents.openai import OpenAI
+from connectors.bitquery_connector import BitqueryConnector
+from connectors.discord import DiscordConnector
+from connectors.moralis import MoralisConnector
+from connectors.replay import Cassette
+from connectors.telegram import TelegramConnector
+from connectors.twitter_connector import TwitterConnector
+
+TOKEN_NAME = "Pepe"
+TOKEN_ADDRESS = "0x6982508145454ce325ddbe47a25d4ec3d2311933"
+TOKEN_CHAIN = "eth"
+GITHUB_ACCOUNT = "pepe-bench"
+
+DYOR_REPORT = {
+    "document_title": "Pepe DYOR",
+    "metadata": {"source": None, "date_created": None, "author": None, "version": None},
+    "general_info": {
+        "project_name": TOKEN_NAME,
+        "research_date": "2025-01-01",
+        "token_info": {"token_chain": TOKEN_CHAIN, "token_address": TOKEN_ADDRESS},
+        "github_url": f"https://github.com/{GITHUB_ACCOUNT}",
+    },
+    "summary": "Pepe is a meme token on Ethereum.",
+    "sections": [{"section_title": "Overview", "content": "Community driven meme token.", "subsections": []}],
+    "team": [],
+    "social_media": {"platforms": [
+        {"name": "Twitter", "url": "https://twitter.com/pepebench", "followers": "250k Followers"},
+        {"name": "Telegram", "url": "https://t.me/pepebench", "followers": None},
+        {"name": "Discord", "url": "https://discord.gg/pepebench", "followers": None},
+    ]},
+    "investments": [],
+    "additional_info": {"notes": None, "references": []},
+}
+
+DECISION = "\n".join([
+    f"1. Token name: {TOKEN_NAME}",
+    "2. Token symbol: $PEPE",
+    f"3. Token address: {TOKEN_ADDRESS}",
+    f"4. Token chain: {TOKEN_CHAIN}",
+    "5. Current holders count: 312000",
+    "6. Current price: $0.0000123",
+    "7. Brief technical side analysis: Deep liquidity and a broad holder base.",
+    "8. Brief community side analysis: Large and active community.",
+    "9. Final decision: HIGH RISK",
+    "10. Final confident level: 70%",
+    "11. Explanation: Meme tokens are driven by sentiment.",
+])
+
+# (lore fragment identifying the calling stage, completion text)
+COMPLETIONS = [
+    ("report parser", json.dumps(DYOR_REPORT)),
+    ("professional quant trader", "Holder concentration is moderate and liquidity is deep. The price is far below its high."),
+    ("General Partner of a hedge fund", DECISION),
+    ("analyzing github repos", "Development is active with recent commits across the main repositories."),
+    ("make new Conclusion section", "The project remains a high risk meme token with an active community."),
+    ("specialized in cryptocurrency research", "Pepe is a meme token on Ethereum."),
+]
+
+
+def _interaction(method: str, url: str, payload, elapsed: float, match_body: str = None,
+                 content_type: str = "application/json") -> dict:
+    url = httpx.URL(url)
+    content = payload if isinstance(payload, str) else json.dumps(payload)
+    return {
+        "method": method,
+        "host": url.host,
+        "path": url.path,
+        "query": url.query.decode("ascii"),
+        "match_body": match_body,
+        "status": 200,
+        "headers": {"content-type": content_type},
+        "content": content,
+        "encoding": "text",
+        "elapsed": elapsed,
+    }
+
+
+def _completion(text: str) -> dict:
+    return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+
+def build_sample_cassette() -> Cassette:
+    moralis = MoralisConnector("").base_url
+    openai = f"{OpenAI('').base_url}/chat/completions"
+    interactions = [
+        _interaction("GET", f"{moralis}/erc20/metadata", [{
+            "name": TOKEN_NAME, "symbol": "PEPE", "address": TOKEN_ADDRESS, "decimals": "18",
+            "total_supply_formatted": "420690000000000",
+            "links": {"twitter": "https://twitter.com/pepebench", "telegram": "https://t.me/pepebench", "website": ""},
+        }], 0.25),
+        _interaction("GET", f"{moralis}/erc20/{TOKEN_ADDRESS}/owners", {"result": [
+            {"is_contract": i % 4 == 0, "percentage_relative_to_total_supply": round(6.5 - i * 0.5, 2)}
+            for i in range(11)
+        ]}, 0.35),
+        _interaction("GET", f"{moralis}/erc20/{TOKEN_ADDRESS}/price",
+                     {"usdPrice": 0.0000123, "pairTotalLiquidityUsd": "25000000"}, 0.2),
+        _interaction("POST", f"{moralis}/erc20/prices", [
+            {"tokenAddress": TOKEN_ADDRESS, "usdPrice": 0.0000123, "pairTotalLiquidityUsd": "25000000"}
+        ], 0.3),
+        _interaction("POST", BitqueryConnector.BASE_URL, {"data": {
+            "holders_0": {"TokenHolders": [{"uniq": "312000"}]},
+            "max_price_0": {"DEXTradeByTokens": [
+                {"Trade": {"high": 0.0000284}, "Block": {"Timefield": "2024-12-09T10:00:00Z"}}
+            ]},
+        }}, 1.2, match_body="query TokenStats"),
+        _interaction("POST", f"{GrokAI('').base_url}/chat/completions",
+                     _completion("The community is large, loud and mostly retail."), 2.5),
+        _interaction("GET", f"https://api.github.com/users/{GITHUB_ACCOUNT}", {"login": GITHUB_ACCOUNT, "type": "Organization"}, 0.15),
+        _interaction("GET", f"https://api.github.com/orgs/{GITHUB_ACCOUNT}/repos", [{
+            "name": f"repo-{i}", "full_name": f"{GITHUB_ACCOUNT}/repo-{i}", "stargazers_count": 100 - i,
+            "description": "Fixture repo", "language": "Solidity", "fork": False, "archived": False,
+            "visibility": "public", "default_branch": "main", "pushed_at": f"2024-12-{20 - i:02d}T12:00:00Z",
+        } for i in range(5)], 0.3),
+        _interaction("GET", f"{TelegramConnector().base_url}/pepebench",
+                     '<div class="tgme_page_extra">12 345 members</div>', 0.4, content_type="text/html"),
+        _interaction("GET", f"{DiscordConnector().base_url}/invites/pepebench", {"approximate_member_count": 54321}, 0.2),
+        _interaction("GET", f"{TwitterConnector().base_url}/user", {"result": {"data": {"user": {"result": {
+            "legacy": {"followers_count": 250000}
+        }}}}}, 0.6),
+    ]
+    interactions += [
+        _interaction("POST", openai, _completion(text), 1.5, match_body=fragment) for fragment, text in COMPLETIONS
+    ]
+    return Cassette(interactions=interactions)
@@ -0,0 +1,92 @@
+"""
+get_token_info with simulated upstream latencies: the old sequential order
+of the five market-data calls vs the concurrent fan-out.
+
+    python -m benchmarks.token_info_fanout --runs 5
+"""
+import argparse
+import asyncio
+import time
+
+from connectors.bitquery_connector import TokenMarketStats
+from utils import utils
+
+# Simulated latency of each upstream call, in seconds
+LATENCIES = {
+    'metadata': 0.25,
+    'holders_count': 0.9,
+    'top_holders': 0.3,
+    'price': 0.2,
+    'max_price': 1.2,
+}
+
+
+async def fake_metadata(token_address, chain):
+    await asyncio.sleep(LATENCIES['metadata'])
+    return {'name': 'Bench', 'symbol': 'BNCH', 'address': token_address, 'twitter': '', 'telegram': '',
+            'website': '', 'total_supply_formatted': 1000000}
+
+
+async def fake_holders_count(token_address, date, network):
+    await asyncio.sleep(LATENCIES['holders_count'])
+    return 1234
+
+
+async def fake_top_holders(token_address, chain):
+    await asyncio.sleep(LATENCIES['top_holders'])
+    return [12.5, 3.1, 1.4]
+
+
+async def fake_price(token_address, chain):
+    await asyncio.sleep(LATENCIES['price'])
+    return {'usdPrice': 0.0042, 'pairTotalLiquidityUsd': 250000}
+
+
+async def fake_max_price(token_address, date, network):
+    await asyncio.sleep(LATENCIES['max_price'])
+    return {'Trade': {'high': 0.01}, 'Block': {'Timefield': '2025-01-01T00:00:00Z'}}
+
+
+async def fake_onchain_stats(token_address, network, holders_date, max_price_date):
+    # Holder count and all-time high share one Bitquery request, as slow as its slowest field
+    await asyncio.sleep(max(LATENCIES['holders_count'], LATENCIES['max_price']))
+    return TokenMarketStats(token_address=token_address, network=network, holders_count=1234,
+                            max_price=0.01, max_price_time='2025-01-01T00:00:00Z')
+
+
+async def sequential(token_address: str, chain: str):
+    # The pre-fan-out call order, one upstream round trip after another.
+    token_info = await fake_metadata(token_address, chain)
+    token_info['holders_count'] = await fake_holders_count(token_address, None, chain)
+    token_info['top_holders'] = await fake_top_holders(token_address, chain)
+    token_info['price'] = await fake_price(token_address, chain)
+    token_info['max_price'] = await fake_max_price(token_address, None, chain)
+    return token_info
+
+
+async def timed(fn, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        await fn(token_address='0xbench', chain='eth')
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    utils.moralis_connector.get_token_info = fake_metadata
+    utils.moralis_connector.get_token_top_holders = fake_top_holders
+    utils.moralis_connector.get_token_price_info = fake_price
+    utils.bitquery_connector.get_token_stats = fake_onchain_stats
+
+    before = asyncio.run(timed(sequential, args.runs))
+    after = asyncio.run(timed(utils.get_token_info, args.runs))
+    print(f"simulated latencies: {LATENCIES}")
+    print(f"  sequential : {before:.2f}s per call (sum of latencies {sum(LATENCIES.values()):.2f}s)")
+    print(f"  fan-out    : {after:.2f}s per call (slowest call {max(LATENCIES.values()):.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
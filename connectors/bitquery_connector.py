@@ -1,78 +1,179 @@
-import requests
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from connectors.http_client import HTTPClient
+from connectors.market_cache import market_cache
+from connectors.rate_limiter import rate_limiter
+from settings import BITQUERY_BATCH_SIZE
+from utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Per-token parts of the stats query; {i} is the token's index in the batch
+HOLDERS_FIELD = """
+    holders_{i}: EVM(dataset: archive, network: $network_{i}) {{
+        TokenHolders(date: $holders_date, tokenSmartContract: $token_{i}) {{
+            uniq(of: Holder_Address)
+        }}
+    }}"""
+
+MAX_PRICE_FIELD = """
+    max_price_{i}: EVM(dataset: combined, network: $network_{i}) {{
+        DEXTradeByTokens(
+            orderBy: {{descendingByField: "Trade_high_maximum"}}
+            where: {{
+                Trade: {{
+                    Side: {{Amount: {{gt: "0"}}, AmountInUSD: {{gt: "1000"}}}},
+                    Currency: {{SmartContract: {{is: $token_{i}}}}},
+                    PriceAsymmetry: {{lt: 0.1}}
+                }},
+                Block: {{Date: {{before: $max_price_date}}}}
+            }}
+            limit: {{count: 1}}
+        ) {{
+            Trade {{
+                high: PriceInUSD(maximum: Trade_PriceInUSD)
+            }}
+            Block {{
+                Timefield: Time(interval: {{in: hours, count: 1}})
+            }}
+        }}
+    }}"""
+
+
+@lru_cache(maxsize=None)
+def build_stats_query(count: int) -> str:
+    """
+    One GraphQL document with the holder count and the all-time high of `count` tokens,
+    aliased per token. Everything that varies is a variable, so the text depends on the
+    batch size only and is built once per size.
+    """
+    variables = ["$holders_date: String!", "$max_price_date: String!"]
+    fields = []
+    for i in range(count):
+        variables += [f"$token_{i}: String!", f"$network_{i}: evm_network!"]
+        fields += [HOLDERS_FIELD.format(i=i), MAX_PRICE_FIELD.format(i=i)]
+    return f"query TokenStats({', '.join(variables)}) {{{''.join(fields)}\n}}"
+
+
+class TokenMarketStats(BaseModel):
+    token_address: str
+    network: str
+    holders_count: Optional[int] = None
+    max_price: Optional[float] = None
+    max_price_time: Optional[str] = None
 
 
 class BitqueryConnector:
     BASE_URL = "https://streaming.bitquery.io/graphql"
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, batch_size: int = BITQUERY_BATCH_SIZE):
         self.api_key = api_key
+        self.batch_size = batch_size
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        self._flights = SingleFlight()
 
-    def get_token_holders_count(self, token_address: str, date: str, network: str) -> int:
-        query = f"""
-        {{
-            EVM(dataset: archive, network: {network}) {{
-                TokenHolders(
-                    date: "{date}"
-                    tokenSmartContract: "{token_address}"
-                ) {{
-                    uniq(of: Holder_Address)
-                }}
-            }}
-        }}
-        """
+    async def _fetch_batch(self, tokens: List[Tuple[str, str]], holders_date: str,
+                           max_price_date: str) -> Dict[Tuple[str, str], TokenMarketStats]:
+        variables = {"holders_date": holders_date, "max_price_date": max_price_date}
+        for i, (token_address, network) in enumerate(tokens):
+            variables[f"token_{i}"] = token_address
+            variables[f"network_{i}"] = network
+        payload = {"query": build_stats_query(len(tokens)), "variables": variables}
 
-        payload = {
-            "query": query
-        }
+        response = await rate_limiter.request(
+            "bitquery", lambda: HTTPClient.get_client().post(self.BASE_URL, json=payload, headers=self.headers)
+        )
+        response.raise_for_status()
+        body = response.json()
+        data = body.get("data")
+        if not data:
+            # "data": null or no data at all, with or without an errors list
+            raise ValueError(f"Bitquery stats query failed: {body.get('errors') or body}")
+        if body.get("errors"):
+            logger.warning(f"Bitquery returned errors for {len(tokens)} tokens: {body['errors']}")
 
-        response = requests.post(self.BASE_URL, json=payload, headers=self.headers)
-        try:
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            print('Error getting token holders count')
-            return 0
-        return response.json()['data']['EVM']['TokenHolders'][0]['uniq']
-    
-    def get_token_max_price(self, token_address: str, date: str, network: str) -> int:
-        query = f"""
-        {{
-            EVM(dataset: combined, network: {network}) {{
-                DEXTradeByTokens(
-                    orderBy: {{descendingByField: "Trade_high_maximum"}}
-                    where: {{
-                        Trade: {{
-                            Side: {{Amount: {{gt: "0"}}, AmountInUSD: {{gt: "1000"}}}},
-                            Currency: {{SmartContract: {{is: "{token_address}"}}}},
-                            PriceAsymmetry: {{lt: 0.1}}
-                        }},
-                        Block: {{Date: {{before: "{date}"}}}}
-                    }}
-                    limit: {{count: 1}}
-                ) {{
-                    Trade {{
-                        high: PriceInUSD(maximum: Trade_PriceInUSD)
-                    }}
-                    Block {{
-                        Timefield: Time(interval: {{in: hours, count: 1}})
-                    }}
-                }}
-            }}
-        }}
+        results = {}
+        for i, (token_address, network) in enumerate(tokens):
+            stats = TokenMarketStats(token_address=token_address.lower(), network=network)
+            holders = (data.get(f"holders_{i}") or {}).get("TokenHolders") or []
+            if holders:
+                stats.holders_count = int(holders[0]["uniq"])
+            trades = (data.get(f"max_price_{i}") or {}).get("DEXTradeByTokens") or []
+            if trades:
+                stats.max_price = trades[0]["Trade"]["high"]
+                stats.max_price_time = trades[0]["Block"]["Timefield"]
+            results[(stats.token_address, network)] = stats
+        return results
+
+    async def get_tokens_stats(self, tokens: List[Tuple[str, str]], holders_date: str,
+                               max_price_date: str) -> Dict[Tuple[str, str], TokenMarketStats]:
         """
+        Holder counts and all-time highs of many (token_address, network) pairs, `batch_size`
+        tokens per request. Results are keyed by (lowercased address, network) and also stored
+        in the market data cache. Tokens of a batch whose request failed are left out.
+        """
+        unique = list(dict.fromkeys((token_address.lower(), network) for token_address, network in tokens))
+        batches = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+        responses = await asyncio.gather(
+            *[self._fetch_batch(batch, holders_date, max_price_date) for batch in batches], return_exceptions=True
+        )
+        results = {}
+        for batch, response in zip(batches, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Bitquery stats batch of {len(batch)} tokens failed: {response!r}")
+                continue
+            results.update(response)
+        for (token_address, network), stats in results.items():
+            if stats.holders_count is not None:
+                market_cache.set("holders", (network, token_address, holders_date), stats.holders_count)
+            market_cache.set("max_price", (network, token_address, max_price_date), (stats.max_price, stats.max_price_time))
+        return results
 
-        payload = {
-            "query": query
-        }
+    async def get_token_stats(self, token_address: str, network: str, holders_date: str,
+                              max_price_date: str) -> TokenMarketStats:
+        """
+        Holder count and all-time high of one token through the market data cache. When both
+        are missing they come from the same request; a field that could not be fetched is None.
+        """
+        token_address = token_address.lower()
+        flight = (network, token_address, holders_date, max_price_date)
+
+        async def fetch() -> TokenMarketStats:
+            results = await self._flights.do(
+                flight, lambda: self._fetch_batch([(token_address, network)], holders_date, max_price_date)
+            )
+            return results[(token_address, network)]
+
+        async def holders() -> int:
+            stats = await fetch()
+            if stats.holders_count is None:
+                raise ValueError(f"No holder count for {token_address} on {network}")
+            return stats.holders_count
+
+        async def max_price() -> Tuple[Optional[float], Optional[str]]:
+            stats = await fetch()
+            return stats.max_price, stats.max_price_time
 
-        response = requests.post(self.BASE_URL, json=payload, headers=self.headers)
-        try:
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            print('Error getting token holders count')
-            return 0
-        return response.json()['data']['EVM']['DEXTradeByTokens'][0]
-    
+        holders_count, max_price_info = await asyncio.gather(
+            market_cache.get("holders", (network, token_address, holders_date), holders),
+            market_cache.get("max_price", (network, token_address, max_price_date), max_price),
+            return_exceptions=True
+        )
+        stats = TokenMarketStats(token_address=token_address, network=network)
+        if isinstance(holders_count, Exception):
+            logger.error(f"Getting token holders count failed: {holders_count!r}")
+        else:
+            stats.holders_count = holders_count
+        if isinstance(max_price_info, Exception):
+            logger.error(f"Getting token max price failed: {max_price_info!r}")
+        else:
+            stats.max_price, stats.max_price_time = max_price_info
+        return stats
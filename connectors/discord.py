@@ -1,44 +1,50 @@
-import requests
+import httpx
 from typing import Dict, Optional
 
+from connectors.http_client import HTTPClient
+from connectors.rate_limiter import RateLimitExceeded, rate_limiter
+
 class DiscordConnector:
     def __init__(self):
         self.base_url = "http://discord.com/api/v9"
 
-    def _make_request(self, endpoint: str) -> Optional[Dict]:
+    def _make_request(self, endpoint: str, timeout: Optional[float] = None) -> Optional[Dict]:
         """
         Make HTTP request to Discord API
         
         Args:
             endpoint (str): API endpoint path
+            timeout (float): Request timeout in seconds, the shared client default if None
             
         Returns:
             dict: Response data if successful, None if failed
         """
         try:
             url = f"{self.base_url}/{endpoint}"
-            response = requests.get(
+            response = rate_limiter.request_sync("discord", lambda: HTTPClient.get_sync_client().get(
                 url,
-                params={"with_counts": "true"}
-            )
+                params={"with_counts": "true"},
+                timeout=timeout or httpx.USE_CLIENT_DEFAULT
+            ))
             response.raise_for_status()
             return response.json()
             
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, RateLimitExceeded) as e:
             print(f"Error making Discord API request: {e}")
             return None
 
-    def get_followers(self, username: str) -> Optional[int]:
+    def get_followers(self, username: str, timeout: Optional[float] = None) -> Optional[int]:
         """
         Get approximate member count for a Discord server
         
         Args:
             username (str): Discord vanity URL code/username
+            timeout (float): Request timeout in seconds, the shared client default if None
             
         Returns:
             int: Approximate member count if successful, None if failed
         """
-        response = self._make_request(f"invites/{username}")
+        response = self._make_request(f"invites/{username}", timeout)
         if response and "approximate_member_count" in response:
             return response["approximate_member_count"]
         return None
@@ -1,11 +1,62 @@
-import requests
+import httpx
 from datetime import datetime
 from typing import Dict, List, Optional
-from time import sleep
+
+from connectors.http_cache import http_cache
+from connectors.http_client import HTTPClient
+from connectors.rate_limiter import RateLimitExceeded, rate_limiter
+from settings import GITHUB_TOKEN, GITHUB_LAST_COMMIT_MODE
+
+# GraphQL page of repositories with the date of the last commit on each default branch
+REPOS_QUERY = """
+query($login: String!, $cursor: String) {
+  repositoryOwner(login: $login) {
+    repositories(first: 100, after: $cursor, orderBy: {field: PUSHED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        nameWithOwner
+        description
+        stargazerCount
+        isArchived
+        isFork
+        visibility
+        primaryLanguage { name }
+        defaultBranchRef { name target { ... on Commit { committedDate } } }
+      }
+    }
+  }
+}
+"""
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+
 
 class GitHubConnector:
-    def __init__(self):
+    """
+    Repository info for a GitHub account. The last commit date comes from one of three modes:
+
+    - "pushed_at": the repo listing's pushed_at, no extra requests (last push to any branch)
+    - "graphql": committedDate of each default branch, 100 repos per query; needs GITHUB_TOKEN
+    - "commits": one /commits request per repo, the original precise mode
+    """
+    MODES = ("pushed_at", "graphql", "commits")
+
+    def __init__(self, token: Optional[str] = GITHUB_TOKEN):
         self.base_url = "https://api.github.com"
+        self.headers = {"Accept": "application/vnd.github+json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    def _get(self, url: str, params: Optional[Dict] = None):
+        # Conditional GET: a 304 costs no rate limit and is served from http_cache
+        key, entry, headers = http_cache.prepare(url, params, self.headers)
+        response = rate_limiter.request_sync(
+            "github", lambda: HTTPClient.get_sync_client().get(url, headers=headers, params=params)
+        )
+        return http_cache.resolve(key, url, entry, response)
 
     def get_github_account_type(self, account_name: str) -> Optional[str]:
         """
@@ -18,23 +69,32 @@ class GitHubConnector:
             'user' or 'org' or None if account doesn't exist
         """
         try:
-            response = requests.get(f"{self.base_url}/users/{account_name}")
+            response = self._get(f"{self.base_url}/users/{account_name}")
             if response.status_code == 200:
                 return response.json().get("type", "").lower()
             return None
-        except requests.RequestException:
+        except (httpx.HTTPError, RateLimitExceeded):
             return None
 
-    def get_github_repos_info(self, account_name: str) -> Optional[List[Dict]]:
+    def get_github_repos_info(self, account_name: str, mode: str = GITHUB_LAST_COMMIT_MODE) -> Optional[List[Dict]]:
         """
         Fetch information about all repositories for a given GitHub user or organization.
         
         Args:
             account_name: GitHub username or organization name
+            mode: how to get each repo's last commit date, one of MODES
             
         Returns:
             List of dictionaries containing repo information or None if request fails
         """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if mode == "graphql":
+            if "Authorization" in self.headers:
+                return self._get_repos_info_graphql(account_name)
+            print("GitHub GraphQL needs GITHUB_TOKEN, falling back to pushed_at")
+            mode = "pushed_at"
+
         # Determine if account is user or organization
         account_type = self.get_github_account_type(account_name)
         if not account_type:
@@ -51,7 +111,7 @@ class GitHubConnector:
         
         try:
             while True:
-                response = requests.get(
+                response = self._get(
                     repos_url,
                     params={
                         "page": page,
@@ -70,42 +130,93 @@ class GitHubConnector:
                 for repo in repos:
                     if repo.get("archived", False):
                         continue
-                        
-                    commits_url = f"{self.base_url}/repos/{account_name}/{repo['name']}/commits"
-                    commits_response = requests.get(
-                        commits_url,
-                        params={
-                            "per_page": 1,
-                            "sha": repo.get("default_branch", "master")
-                        }
-                    )
-                    
-                    if commits_response.status_code == 200:
-                        latest_commit = commits_response.json()[0]
-                        
-                        repos_info.append({
-                            "name": repo["name"],
-                            "full_name": repo["full_name"],
-                            "stars": repo["stargazers_count"],
-                            "last_commit_date": datetime.strptime(
-                                latest_commit["commit"]["committer"]["date"],
-                                "%Y-%m-%dT%H:%M:%SZ"
-                            ),
-                            "description": repo["description"],
-                            "language": repo["language"],
-                            "is_fork": repo["fork"],
-                            "visibility": repo.get("visibility", "public"),
-                            "default_branch": repo.get("default_branch", "master")
-                        })
-                    
-                    sleep(0.1)
-                
+
+                    if mode == "commits":
+                        last_commit_date = self._get_last_commit_date(account_name, repo)
+                        if last_commit_date is None:
+                            continue
+                    elif repo.get("pushed_at"):
+                        last_commit_date = _parse_date(repo["pushed_at"])
+                    else:
+                        # Empty repositories have never been pushed to
+                        continue
+
+                    repos_info.append({
+                        "name": repo["name"],
+                        "full_name": repo["full_name"],
+                        "stars": repo["stargazers_count"],
+                        "last_commit_date": last_commit_date,
+                        "description": repo["description"],
+                        "language": repo["language"],
+                        "is_fork": repo["fork"],
+                        "visibility": repo.get("visibility", "public"),
+                        "default_branch": repo.get("default_branch", "master")
+                    })
+
+                if len(repos) < 100:
+                    break
                 page += 1
                 
             repos_info.sort(key=lambda x: x["last_commit_date"], reverse=True)
             return repos_info
             
-        except requests.RequestException as e:
+        except (httpx.HTTPError, RateLimitExceeded) as e:
+            print(f"Error fetching repos info: {e}")
+            return None
+
+    def _get_last_commit_date(self, account_name: str, repo: Dict) -> Optional[datetime]:
+        response = self._get(
+            f"{self.base_url}/repos/{account_name}/{repo['name']}/commits",
+            params={
+                "per_page": 1,
+                "sha": repo.get("default_branch", "master")
+            }
+        )
+        if response.status_code != 200:
+            return None
+        return _parse_date(response.json()[0]["commit"]["committer"]["date"])
+
+    def _get_repos_info_graphql(self, account_name: str) -> Optional[List[Dict]]:
+        repos_info = []
+        cursor = None
+        try:
+            while True:
+                response = rate_limiter.request_sync("github", lambda: HTTPClient.get_sync_client().post(
+                    f"{self.base_url}/graphql",
+                    headers=self.headers,
+                    json={"query": REPOS_QUERY, "variables": {"login": account_name, "cursor": cursor}}
+                ))
+                response.raise_for_status()
+                owner = (response.json().get("data") or {}).get("repositoryOwner")
+                if owner is None:
+                    print(f"Account {account_name} not found")
+                    return None
+
+                repositories = owner["repositories"]
+                for repo in repositories["nodes"]:
+                    branch = repo.get("defaultBranchRef")
+                    if repo["isArchived"] or not branch or not branch["target"].get("committedDate"):
+                        continue
+                    repos_info.append({
+                        "name": repo["name"],
+                        "full_name": repo["nameWithOwner"],
+                        "stars": repo["stargazerCount"],
+                        "last_commit_date": _parse_date(branch["target"]["committedDate"]),
+                        "description": repo["description"],
+                        "language": (repo.get("primaryLanguage") or {}).get("name"),
+                        "is_fork": repo["isFork"],
+                        "visibility": repo["visibility"].lower(),
+                        "default_branch": branch["name"]
+                    })
+
+                if not repositories["pageInfo"]["hasNextPage"]:
+                    break
+                cursor = repositories["pageInfo"]["endCursor"]
+
+            repos_info.sort(key=lambda x: x["last_commit_date"], reverse=True)
+            return repos_info
+
+        except (httpx.HTTPError, RateLimitExceeded) as e:
             print(f"Error fetching repos info: {e}")
             return None
 
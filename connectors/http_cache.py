@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from settings import HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES
+
+
+class CachedResponse:
+    """Stands in for the upstream response when a 304 confirmed the cached body is current"""
+    status_code = 200
+    from_cache = True
+
+    def __init__(self, body: bytes, etag: Optional[str], last_modified: Optional[str]):
+        self.content = body
+        self.headers = {key: value for key, value in (("etag", etag), ("last-modified", last_modified)) if value}
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class HTTPCache:
+    """
+    On-disk cache of GET responses revalidated with ETag / Last-Modified.
+
+    A cached entry is never served blindly: the request goes out with If-None-Match /
+    If-Modified-Since and a 304 answer is turned back into the stored body. That saves
+    the body transfer and, on GitHub, the request does not count against the rate limit.
+    Entries live in a sqlite file shared by every connector and process on the host;
+    the least recently used ones are evicted once the bodies exceed max_bytes.
+    """
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.stats = {"revalidated": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT, "
+                "body BLOB, size INTEGER, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        return self._conn
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> str:
+        # Credentials are part of the key: responses differ per token (private repos, plans)
+        auth = {name: value for name, value in (headers or {}).items() if name.lower() in ("authorization", "x-api-key")}
+        payload = json.dumps([url, sorted((params or {}).items()), sorted(auth.items())], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def prepare(self, url: str, params: Optional[Dict], headers: Dict[str, str]) -> Tuple[str, Optional[tuple], Dict[str, str]]:
+        """
+        Returns:
+            tuple: (cache key, cached entry or None, request headers with the validators added)
+        """
+        key = self.make_key(url, params, headers)
+        with self._lock:
+            entry = self._get_conn().execute(
+                "SELECT etag, last_modified, body FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if entry is None:
+            return key, None, headers
+        etag, last_modified, _ = entry
+        headers = dict(headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return key, entry, headers
+
+    def resolve(self, key: str, url: str, entry: Optional[tuple], response: Any) -> Any:
+        """Store a fresh 200, or turn a 304 into the cached body. Works on httpx and requests responses."""
+        if response.status_code == 304 and entry is not None:
+            etag, last_modified, body = entry
+            with self._lock:
+                self._get_conn().execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.stats["revalidated"] += 1
+            return CachedResponse(body, etag, last_modified)
+
+        self.stats["misses"] += 1
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if response.status_code == 200 and (etag or last_modified):
+            self._store(key, url, etag, last_modified, response.content)
+        return response
+
+    async def aprepare(self, url: str, params: Optional[Dict],
+                       headers: Dict[str, str]) -> Tuple[str, Optional[tuple], Dict[str, str]]:
+        """prepare() for async callers, the sqlite read runs in a worker thread"""
+        return await asyncio.to_thread(self.prepare, url, params, headers)
+
+    async def aresolve(self, key: str, url: str, entry: Optional[tuple], response: Any) -> Any:
+        """resolve() for async callers, the sqlite write runs in a worker thread"""
+        return await asyncio.to_thread(self.resolve, key, url, entry, response)
+
+    def _store(self, key: str, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, url, etag, last_modified, body, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, body, len(body), time.time())
+            )
+            self.stats["stores"] += 1
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+                    conn.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                    self.stats["evictions"] += 1
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["revalidated"] + self.stats["misses"]
+        stats = {**self.stats, "hit_rate": round(self.stats["revalidated"] / lookups, 4) if lookups else None}
+        if self._conn is not None:
+            with self._lock:
+                stats["entries"], stats["bytes"] = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+http_cache = HTTPCache()
@@ -0,0 +1,215 @@
+import abc
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from settings import (
+    HTTP2_ENABLED,
+    HTTP_CONNECT_RETRIES,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_MAX_KEEPALIVE_PER_HOST,
+    HTTP_TIMEOUT,
+)
+from connectors.replay import ReplayConfig
+
+try:
+    import h2  # noqa: F401 - httpx negotiates HTTP/2 only when h2 is installed
+    HTTP2 = HTTP2_ENABLED
+except ImportError:
+    HTTP2 = False
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.connect_seconds = 0.0
+        self.tls_handshakes = 0
+        self.tls_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "reuse_ratio": round(1 - self.connections_opened / self.requests, 4) if self.requests else None,
+            "avg_connect_ms": round(self.connect_seconds / self.connections_opened * 1000, 2)
+            if self.connections_opened else None,
+            "avg_tls_handshake_ms": round(self.tls_seconds / self.tls_handshakes * 1000, 2)
+            if self.tls_handshakes else None,
+        }
+
+
+class _ConnectTracer:
+    """
+    Times the TCP connect (DNS lookup included) and TLS handshake of the connections opened
+    for one request, through httpcore's public "trace" request extension
+    """
+
+    def __init__(self, stats: HostStats, forward=None):
+        self._stats = stats
+        self._forward = forward
+        self._started: Dict[str, float] = {}
+
+    def record(self, name: str) -> None:
+        step, _, event = name.rpartition(".")
+        if event == "started":
+            self._started[step] = time.perf_counter()
+        elif event == "complete" and step in self._started:
+            elapsed = time.perf_counter() - self._started.pop(step)
+            if step == "connection.connect_tcp":
+                self._stats.connections_opened += 1
+                self._stats.connect_seconds += elapsed
+            elif step == "connection.start_tls":
+                self._stats.tls_handshakes += 1
+                self._stats.tls_seconds += elapsed
+
+
+class _AsyncConnectTracer(_ConnectTracer):
+    async def __call__(self, name: str, info: Dict[str, Any]) -> None:
+        self.record(name)
+        if self._forward is not None:
+            await self._forward(name, info)
+
+
+class _SyncConnectTracer(_ConnectTracer):
+    def __call__(self, name: str, info: Dict[str, Any]) -> None:
+        self.record(name)
+        if self._forward is not None:
+            self._forward(name, info)
+
+
+class _PerHostTransport(abc.ABC):
+    """Shared bookkeeping of the async and sync per-host transports"""
+
+    def __init__(self, http2: bool, limits: httpx.Limits, retries: int):
+        self.http2 = http2
+        self.limits = limits
+        self.retries = retries
+        self._transports: Dict[Tuple[str, str, int], Any] = {}
+        self._stats: Dict[Tuple[str, str, int], HostStats] = {}
+        self._lock = threading.Lock()
+
+    tracer = _ConnectTracer
+
+    @abc.abstractmethod
+    def _make_transport(self):
+        """A new transport for one host"""
+
+    def _transport_for(self, request: httpx.Request):
+        key = (request.url.scheme, request.url.host, request.url.port)
+        with self._lock:
+            transport = self._transports.get(key)
+            if transport is None:
+                self._stats[key] = HostStats()
+                transport = self._transports[key] = self._make_transport()
+            stats = self._stats[key]
+            stats.requests += 1
+        request.extensions["trace"] = self.tracer(stats, request.extensions.get("trace"))
+        return transport
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            f"{scheme}://{host}{f':{port}' if port else ''}": stats.as_dict()
+            for (scheme, host, port), stats in list(self._stats.items())
+        }
+
+
+class AsyncPerHostTransport(_PerHostTransport, httpx.AsyncBaseTransport):
+    """
+    A keep-alive pool per host, so a burst against one provider cannot take every
+    connection from the others. Connect errors are retried by the pool.
+    """
+
+    tracer = _AsyncConnectTracer
+
+    def _make_transport(self) -> httpx.AsyncHTTPTransport:
+        return httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits, retries=self.retries)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport_for(request).handle_async_request(request)
+
+    async def aclose(self) -> None:
+        for transport in list(self._transports.values()):
+            await transport.aclose()
+        self._transports.clear()
+
+
+class SyncPerHostTransport(_PerHostTransport, httpx.BaseTransport):
+    """Blocking counterpart of AsyncPerHostTransport for the connectors that run in threads"""
+
+    tracer = _SyncConnectTracer
+
+    def _make_transport(self) -> httpx.HTTPTransport:
+        return httpx.HTTPTransport(http2=self.http2, limits=self.limits, retries=self.retries)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._transport_for(request).handle_request(request)
+
+    def close(self) -> None:
+        for transport in list(self._transports.values()):
+            transport.close()
+        self._transports.clear()
+
+
+class HTTPClient:
+    """
+    Process-wide HTTP clients shared by every connector and agent.
+
+    `get_client()` is the async client, `get_sync_client()` the blocking one used by
+    the connectors that run in threads. Both keep a keep-alive pool per host (HTTP/2
+    where the server and the installed h2 allow it), retry failed connects and apply the
+    same default timeouts. Host names are resolved by the OS resolver on every new
+    connection; with keep-alive that is once per pooled connection, not per request.
+    """
+    client: Optional[httpx.AsyncClient] = None
+    sync_client: Optional[httpx.Client] = None
+    timeout: httpx.Timeout = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    limits: httpx.Limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_PER_HOST,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        if cls.client is None or cls.client.is_closed:
+            cls.client = httpx.AsyncClient(
+                transport=ReplayConfig.wrap(AsyncPerHostTransport(HTTP2, cls.limits, HTTP_CONNECT_RETRIES)),
+                timeout=cls.timeout,
+                follow_redirects=True
+            )
+        return cls.client
+
+    @classmethod
+    def get_sync_client(cls) -> httpx.Client:
+        # Called from worker threads, so create it only once
+        with cls._lock:
+            if cls.sync_client is None or cls.sync_client.is_closed:
+                cls.sync_client = httpx.Client(
+                    transport=ReplayConfig.wrap(SyncPerHostTransport(HTTP2, cls.limits, HTTP_CONNECT_RETRIES)),
+                    timeout=cls.timeout,
+                    follow_redirects=True
+                )
+            return cls.sync_client
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        stats = {"http2": HTTP2, "replay_mode": ReplayConfig.mode}
+        for name, client in (("async", cls.client), ("sync", cls.sync_client)):
+            transport = getattr(client, "_transport", None)
+            stats[name] = transport.get_stats() if isinstance(transport, _PerHostTransport) else {}
+        return stats
+
+    @classmethod
+    async def close(cls):
+        if cls.client is not None:
+            await cls.client.aclose()
+            cls.client = None
+        if cls.sync_client is not None:
+            cls.sync_client.close()
+            cls.sync_client = None
@@ -0,0 +1,113 @@
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from settings import MARKET_CACHE_TTLS, MARKET_CACHE_MAX_STALE_SECONDS, MARKET_CACHE_MAX_ENTRIES
+from utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataCache:
+    """
+    Stale-while-revalidate cache of market data, with a TTL per kind of data.
+
+    A value younger than its kind's TTL is served as is. An older one is still served
+    immediately, for up to its kind's `max_stale` seconds past the TTL, while a background
+    task fetches a fresh one. Only a missing or too old value makes the caller wait for the
+    upstream, and concurrent misses for the same key share one fetch. Failed fetches are
+    not cached: a failed refresh keeps the stale value, a failed miss raises to the caller.
+    """
+
+    def __init__(self, ttls: Dict[str, float] = MARKET_CACHE_TTLS, max_stale: Dict[str, float] = MARKET_CACHE_MAX_STALE_SECONDS,
+                 max_entries: int = MARKET_CACHE_MAX_ENTRIES):
+        self.ttls = ttls
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._flights = SingleFlight()
+        self._refreshing: Set[Tuple[str, Hashable]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {kind: {"fresh": 0, "stale": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+                      for kind in ttls}
+
+    async def get(self, kind: str, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        cache_key = (kind, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttls[kind]:
+                self.stats[kind]["fresh"] += 1
+                self._entries.move_to_end(cache_key)
+                return copy.deepcopy(entry[1])
+            if age < self.ttls[kind] + self.max_stale[kind]:
+                self.stats[kind]["stale"] += 1
+                self._entries.move_to_end(cache_key)
+                self._refresh_in_background(cache_key, fetch)
+                return copy.deepcopy(entry[1])
+
+        self.stats[kind]["misses"] += 1
+        value = await self._flights.do(cache_key, lambda: self._load(cache_key, fetch))
+        return copy.deepcopy(value)
+
+    def age(self, kind: str, key: Hashable) -> Optional[float]:
+        """Seconds since the cached value was fetched, None when nothing is cached"""
+        entry = self._entries.get((kind, key))
+        return time.monotonic() - entry[0] if entry is not None else None
+
+    def is_stale(self, kind: str, key: Hashable) -> bool:
+        age = self.age(kind, key)
+        return age is not None and age >= self.ttls[kind]
+
+    def set(self, kind: str, key: Hashable, value: Any) -> None:
+        """Store a value fetched outside get(), e.g. by a batched request"""
+        self._store((kind, key), value)
+
+    def _store(self, cache_key: Tuple[str, Hashable], value: Any) -> None:
+        self._entries[cache_key] = (time.monotonic(), value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load(self, cache_key: Tuple[str, Hashable], fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        self._store(cache_key, value)
+        return value
+
+    def _refresh_in_background(self, cache_key: Tuple[str, Hashable], fetch: Callable[[], Awaitable[Any]]) -> None:
+        if cache_key in self._refreshing:
+            return
+        self._refreshing.add(cache_key)
+        # Keep a reference so the task is not garbage collected before it finishes
+        task = asyncio.ensure_future(self._refresh(cache_key, fetch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, cache_key: Tuple[str, Hashable], fetch: Callable[[], Awaitable[Any]]) -> None:
+        kind = cache_key[0]
+        try:
+            await self._flights.do(cache_key, lambda: self._load(cache_key, fetch))
+            self.stats[kind]["refreshes"] += 1
+        except Exception as e:
+            self.stats[kind]["refresh_errors"] += 1
+            logger.warning(f"Background refresh of {kind} {cache_key[1]} failed, keeping the stale value: {e!r}")
+        finally:
+            self._refreshing.discard(cache_key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "refreshing": len(self._refreshing),
+            "ttls": self.ttls,
+            "max_stale": self.max_stale,
+            "kinds": self.stats,
+        }
+
+
+market_cache = MarketDataCache()
@@ -1,10 +1,23 @@
+import base64
+import json
+import logging
+import time
+from collections import OrderedDict
+
 from bson import ObjectId
 
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional, List, Dict, Any
+from pymongo.errors import OperationFailure
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from pydantic import BaseModel
 
+from settings import LLM_CACHE_TTL_SECONDS, COUNT_MODE, COUNT_CACHE_TTL_SECONDS, COUNT_CACHE_MAX_ENTRIES
+from utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+
 class TokenAnalysis(BaseModel):
     token_name: str
     token_symbol: str
@@ -38,12 +51,16 @@ class TokenAIReport(BaseModel):
     token_chain: Optional[str] = None
     research_time: datetime = datetime.utcnow()
     data: Dict[str, Any]
+    stage_timings: Optional[Dict[str, Any]] = None
+    stage_fingerprints: Optional[Dict[str, str]] = None
 
 class Token(BaseModel):
     token_name: str
     token_address: Optional[str] = None
     token_chain: Optional[str] = None
     last_research_time: datetime = datetime.utcnow()
+    # Freshness target for scheduled re-research, RESEARCH_FRESHNESS_SECONDS when unset
+    research_interval_seconds: Optional[int] = None
     metadata: Optional[Dict[str, Any]] = None
     ai_reports: Optional[List[Any]] = None
     research_inputs: Optional[List[Any]] = None
@@ -60,6 +77,43 @@ class Attachment(BaseModel):
     uploaded_at: datetime = datetime.utcnow()
     metadata: Optional[Dict[str, Any]] = None
 
+def encode_cursor(doc: Dict[str, Any], sort_field: str) -> str:
+    """Opaque keyset cursor pointing just past `doc` in a (sort_field desc, _id desc) ordering"""
+    value = doc.get(sort_field)
+    payload = {"v": value.isoformat() if isinstance(value, datetime) else value, "id": str(doc["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = datetime.fromisoformat(payload["v"]) if payload["v"] is not None else None
+        return {"value": value, "_id": ObjectId(payload["id"])}
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _keyset_filter(sort_field: str, cursor: str) -> Dict[str, Any]:
+    """Filter for the rows after the cursor in (sort_field desc, _id desc) order. Nulls sort last."""
+    position = decode_cursor(cursor)
+    if position["value"] is None:
+        return {sort_field: None, "_id": {"$lt": position["_id"]}}
+    return {"$or": [
+        {sort_field: {"$lt": position["value"]}},
+        {sort_field: position["value"], "_id": {"$lt": position["_id"]}},
+        {sort_field: None}
+    ]}
+
+
+def _has_stage(plan: Any, stage: str) -> bool:
+    """Look for a plan stage anywhere in an explain() document"""
+    if isinstance(plan, dict):
+        return plan.get("stage") == stage or any(_has_stage(value, stage) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_has_stage(item, stage) for item in plan)
+    return False
+
+
 class MongoDBConnector:
     client: Optional[AsyncIOMotorClient] = None
     db_name: str = "DYOR"
@@ -78,6 +132,59 @@ class MongoDBConnector:
     async def get_collection(cls, collection_name: str):
         return cls.db[collection_name]
 
+class CountCache:
+    """
+    Document counts for paginated endpoints without a count_documents() scan on every page view.
+
+    Unfiltered totals come from collection metadata (mode "estimated") or from a counter that
+    the save_* methods keep up to date and that is re-counted every ttl seconds (mode "exact").
+    Filtered counts are cached per filter for ttl seconds and dropped on any insert into the collection;
+    at most max_entries filters are kept, least recently used first out.
+    """
+
+    def __init__(self, mode: str = COUNT_MODE, ttl_seconds: int = COUNT_CACHE_TTL_SECONDS,
+                 max_entries: int = COUNT_CACHE_MAX_ENTRIES):
+        self.mode = mode
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._totals: Dict[str, List[Any]] = {}
+        self._filtered: "OrderedDict[Tuple[str, str], Tuple[int, float]]" = OrderedDict()
+
+    async def count(self, collection_name: str, query: Optional[Dict[str, Any]] = None) -> int:
+        coll = await MongoDBConnector.get_collection(collection_name)
+        now = time.monotonic()
+        if query:
+            key = (collection_name, json.dumps(query, sort_keys=True, default=str))
+            cached = self._filtered.get(key)
+            if cached and now - cached[1] < self.ttl:
+                self._filtered.move_to_end(key)
+                return cached[0]
+            value = await coll.count_documents(query)
+            self._filtered[key] = (value, now)
+            self._filtered.move_to_end(key)
+            while len(self._filtered) > self.max_entries:
+                self._filtered.popitem(last=False)
+            return value
+
+        if self.mode == "estimated":
+            return await coll.estimated_document_count()
+        cached = self._totals.get(collection_name)
+        if cached and now - cached[1] < self.ttl:
+            return cached[0]
+        value = await coll.count_documents({})
+        self._totals[collection_name] = [value, now]
+        return value
+
+    def record_insert(self, collection_name: str, inserted: int = 1) -> None:
+        if collection_name in self._totals:
+            self._totals[collection_name][0] += inserted
+        for key in [key for key in self._filtered if key[0] == collection_name]:
+            del self._filtered[key]
+
+
+count_cache = CountCache()
+
+
 class DatabaseManager:
     def __init__(self):
         self.tokens_collection = "tokens"
@@ -86,38 +193,143 @@ class DatabaseManager:
         self.ai_report_collection = "ai_reports"
         self.attachments_collection = "attachments"
 
+    # Index spec per collection as (name, keys, options). Keys follow the real query shapes:
+    # filter fields first, then the sort fields in the direction the queries sort.
+    INDEXES = {
+        "tokens": [
+            ("last_research_time_id", [("last_research_time", -1), ("_id", -1)], {}),
+            ("token_name_chain", [("token_name", 1), ("chain", 1)], {}),
+            ("token_address_chain", [("token_address", 1), ("chain", 1)], {}),
+            ("research_interval_seconds", [("research_interval_seconds", 1)], {"sparse": True}),
+        ],
+        "analysis": [
+            ("research_time_id", [("research_time", -1), ("_id", -1)], {}),
+            ("token_address_chain_research_time",
+             [("token_address", 1), ("token_chain", 1), ("research_time", -1), ("_id", -1)], {}),
+            ("token_name_research_time", [("token_name", 1), ("research_time", -1), ("_id", -1)], {}),
+        ],
+        "research_input": [
+            ("token_id_created_at", [("token_id", 1), ("created_at", -1), ("_id", -1)], {}),
+        ],
+        "ai_reports": [
+            ("token_id_created_at", [("token_id", 1), ("created_at", -1), ("_id", -1)], {}),
+        ],
+        "llm_cache": [
+            ("created_at_ttl", [("created_at", 1)], {"expireAfterSeconds": LLM_CACHE_TTL_SECONDS}),
+        ],
+        "jobs": [
+            ("status_created_at", [("status", 1), ("created_at", 1)], {}),
+            ("status_heartbeat_at", [("status", 1), ("heartbeat_at", 1)], {}),
+            ("dedupe_key_status", [("dedupe_key", 1), ("status", 1)], {}),
+        ],
+    }
+
     async def ensure_indexes(self):
-        indexes = {
-            self.tokens_collection: [
-                ('last_research_time', -1),
-                ('address', 1),
-                ('chain', 1), 
-            ],
-            self.research_collection: [
-                ('token_name', 1),
-                ('token_address', 1),
-                ('token_chain', 1),
-                ('created_at', -1)
-            ],
-            self.research_input_collection: [
-                ('token_name', 1),
-                ('token_address', 1),
-                ('token_chain', 1),
-                ('created_at', -1)
-            ]
-        }
-        for coll_name, coll_indexes in indexes.items():
+        """
+        Create every index in INDEXES and drop the indexes of those collections that are no
+        longer listed, e.g. the tokens address/chain indexes. Safe to run on every startup.
+        """
+        for coll_name, coll_indexes in self.INDEXES.items():
             coll = await MongoDBConnector.get_collection(coll_name)
-            for idx in coll_indexes:
-                await coll.create_index([idx])
+            listed = {name for name, _, _ in coll_indexes}
+            async for index in coll.list_indexes():
+                if index["name"] != "_id_" and index["name"] not in listed:
+                    try:
+                        await coll.drop_index(index["name"])
+                        logger.info(f"Dropped index {coll_name}.{index['name']}, it is no longer in INDEXES")
+                    except OperationFailure as e:
+                        logger.error(f"Could not drop index {coll_name}.{index['name']}: {e}")
+            for name, keys, options in coll_indexes:
+                try:
+                    await coll.create_index(keys, name=name, **options)
+                except OperationFailure as e:
+                    if "expireAfterSeconds" not in options:
+                        logger.error(f"Index {coll_name}.{name} conflicts with an existing index: {e}")
+                        continue
+                    # A changed TTL can't be re-created in place, update it instead
+                    await MongoDBConnector.db.command(
+                        "collMod", coll_name,
+                        index={"keyPattern": dict(keys), "expireAfterSeconds": options["expireAfterSeconds"]}
+                    )
 
-    async def get_total_count(self, collection_name: str) -> int:
-        coll = await MongoDBConnector.get_collection(collection_name)
-        return await coll.count_documents({})
+    def _query_shapes(self) -> List[Dict[str, Any]]:
+        """One representative of every query DatabaseManager sends, for verify_indexes"""
+        latest_sort = [("created_at", -1), ("_id", -1)]
+        research_sort = [("research_time", -1), ("_id", -1)]
+        # Keyset cursors past a dated row and past a row without a date take different filter branches
+        token_cursors = [encode_cursor({"_id": ObjectId(), "last_research_time": value}, "last_research_time")
+                         for value in (datetime.utcnow(), None)]
+        research_cursors = [encode_cursor({"_id": ObjectId(), "research_time": value}, "research_time")
+                            for value in (datetime.utcnow(), None)]
+        return [
+            {"name": "get_token", "collection": self.tokens_collection,
+             "filter": {"token_address": "", "chain": ""}},
+            {"name": "get_token_by_name", "collection": self.tokens_collection,
+             "filter": {"token_name": "", "chain": None}},
+            {"name": "get_tokens", "collection": self.tokens_collection,
+             "pipeline": self._tokens_pipeline(0, 10, True, None)},
+            {"name": "get_tokens cursor page", "collection": self.tokens_collection,
+             "pipeline": self._tokens_pipeline(0, 10, True, token_cursors[0])},
+            {"name": "get_tokens cursor page after undated", "collection": self.tokens_collection,
+             "pipeline": self._tokens_pipeline(0, 10, True, token_cursors[1])},
+            {"name": "get_stale_tokens", "collection": self.tokens_collection,
+             "filter": {"$and": [
+                 {"$or": [{"last_research_time": {"$lt": datetime.utcnow()}}, {"last_research_time": None}]},
+                 {"$or": [{"research_lease_until": None}, {"research_lease_until": {"$lt": datetime.utcnow()}}]},
+             ]},
+             "sort": [("last_research_time", 1), ("_id", 1)]},
+            {"name": "get_shortest_research_interval", "collection": self.tokens_collection,
+             "filter": {"research_interval_seconds": {"$gt": 0}}, "sort": [("research_interval_seconds", 1)]},
+            {"name": "ai_reports by token", "collection": self.ai_report_collection,
+             "filter": {"token_id": ""}, "sort": latest_sort},
+            {"name": "research_input by token", "collection": self.research_input_collection,
+             "filter": {"token_id": ""}, "sort": latest_sort},
+            {"name": "get_researches", "collection": self.research_collection,
+             "filter": {}, "sort": research_sort},
+            {"name": "get_researches by token", "collection": self.research_collection,
+             "filter": {"token_address": ""}, "sort": research_sort},
+            {"name": "get_researches by token and chain", "collection": self.research_collection,
+             "filter": {"token_address": "", "token_chain": ""}, "sort": research_sort},
+            {"name": "get_researches by name", "collection": self.research_collection,
+             "filter": {"token_name": ""}, "sort": research_sort},
+            {"name": "get_researches cursor page", "collection": self.research_collection,
+             "filter": {"$and": [{}, _keyset_filter("research_time", research_cursors[0])]}, "sort": research_sort},
+            {"name": "get_researches cursor page after undated", "collection": self.research_collection,
+             "filter": {"$and": [{}, _keyset_filter("research_time", research_cursors[1])]}, "sort": research_sort},
+            {"name": "get_researches by token cursor page", "collection": self.research_collection,
+             "filter": {"$and": [{"token_address": ""}, _keyset_filter("research_time", research_cursors[0])]},
+             "sort": research_sort},
+        ]
+
+    async def verify_indexes(self) -> None:
+        """
+        Explain every query shape and raise if any of them would scan a whole collection.
+        """
+        offenders = []
+        for shape in self._query_shapes():
+            if "pipeline" in shape:
+                plan = await MongoDBConnector.db.command(
+                    "aggregate", shape["collection"], pipeline=shape["pipeline"], explain=True
+                )
+            else:
+                coll = await MongoDBConnector.get_collection(shape["collection"])
+                cursor = coll.find(shape["filter"]).limit(1)
+                if shape.get("sort"):
+                    cursor = cursor.sort(shape["sort"])
+                plan = await cursor.explain()
+            if _has_stage(plan, "COLLSCAN"):
+                offenders.append(f"{shape['name']} ({shape['collection']})")
+        if offenders:
+            raise RuntimeError(f"Queries without a matching index: {', '.join(offenders)}")
+
+    async def get_total_count(self, collection_name: str, query: Optional[Dict[str, Any]] = None) -> int:
+        return await count_cache.count(collection_name, query)
 
     async def save_token(self, token: Token) -> None:
         coll = await MongoDBConnector.get_collection(self.tokens_collection)
         result = await coll.insert_one(token.dict())
+        count_cache.record_insert(self.tokens_collection)
+        response_cache.invalidate(response_cache.token_tags(result.inserted_id, token.token_name, token.token_address))
         return result.inserted_id
 
     async def _include_token_data(self, token: dict) -> dict:
@@ -128,13 +340,14 @@ class DatabaseManager:
         ai_coll = await MongoDBConnector.get_collection(self.ai_report_collection)
         ai_pipeline = [
             {"$match": {"token_id": str(token["_id"])}},
-            {"$sort": {"created_at": -1}},
+            {"$sort": {"created_at": -1, "_id": -1}},
             {"$project": {
                 "_id": {"$toString": "$_id"},
                 "token_name": 1,
                 "token_address": 1,
                 "token_id": 1,
                 "data": 1,
+                "stage_fingerprints": 1,
                 "created_at": 1
             }}
         ]
@@ -143,7 +356,7 @@ class DatabaseManager:
         research_coll = await MongoDBConnector.get_collection(self.research_input_collection)
         research_pipeline = [
             {"$match": {"token_id": str(token["_id"])}},
-            {"$sort": {"created_at": -1}},
+            {"$sort": {"created_at": -1, "_id": -1}},
             {"$project": {
                 "_id": {"$toString": "$_id"},
                 "token_name": 1,
@@ -165,6 +378,13 @@ class DatabaseManager:
             token = await self._include_token_data(token)
         return token
 
+    async def get_token_by_id(self, token_id: ObjectId, include_research: bool = True) -> Optional[Token]:
+        coll = await MongoDBConnector.get_collection(self.tokens_collection)
+        token = await coll.find_one({"_id": token_id})
+        if include_research:
+            token = await self._include_token_data(token)
+        return token
+
     async def get_token_by_name(self, token_name: str, chain: str = None, include_research: bool = True) -> Optional[Token]:
         coll = await MongoDBConnector.get_collection(self.tokens_collection)
         token = await coll.find_one({"token_name": token_name, "chain": chain})
@@ -175,6 +395,7 @@ class DatabaseManager:
     async def save_research(self, research: TokenAnalysis) -> None:
         coll = await MongoDBConnector.get_collection(self.research_collection)
         await coll.insert_one(research.dict())
+        count_cache.record_insert(self.research_collection)
         await self._update_token_research_time(research.token_address, research.token_chain)
     
     async def _update_token_research_time(self, token_address: str, chain: str) -> None:
@@ -191,21 +412,72 @@ class DatabaseManager:
             },
             upsert=True
         )
+
+    async def get_stale_tokens(self, researched_before: datetime, now: datetime, limit: int,
+                               skip: int = 0) -> List[Dict[str, Any]]:
+        """Unleased tokens last researched before the given time or never, oldest first"""
+        coll = await MongoDBConnector.get_collection(self.tokens_collection)
+        cursor = coll.find({"$and": [
+            {"$or": [{"last_research_time": {"$lt": researched_before}}, {"last_research_time": None}]},
+            {"$or": [{"research_lease_until": None}, {"research_lease_until": {"$lt": now}}]},
+        ]}).sort([("last_research_time", 1), ("_id", 1)]).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def get_shortest_research_interval(self) -> Optional[int]:
+        """The smallest per-token research_interval_seconds, if any token sets one"""
+        coll = await MongoDBConnector.get_collection(self.tokens_collection)
+        token = await coll.find_one(
+            {"research_interval_seconds": {"$gt": 0}},
+            {"research_interval_seconds": 1},
+            sort=[("research_interval_seconds", 1)]
+        )
+        return token["research_interval_seconds"] if token else None
+
+    def _latest_lookup(self, collection_name: str, as_field: str, fields: List[str]) -> dict:
+        """$lookup stage that attaches only the newest document of a token's history as a one-element list"""
+        return {"$lookup": {
+            "from": collection_name,
+            "let": {"token_id": {"$toString": "$_id"}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$token_id", "$$token_id"]}}},
+                {"$sort": {"created_at": -1, "_id": -1}},
+                {"$limit": 1},
+                {"$project": {"_id": {"$toString": "$_id"}, **{field: 1 for field in fields}}}
+            ],
+            "as": as_field
+        }}
+
     async def get_tokens(
         self,
         skip: int = 0,
         limit: int = 100,
-        include_research: bool = False
+        include_research: bool = False,
+        cursor: Optional[str] = None
     ) -> Optional[Token]:
+        """
+        Page through tokens by last research time. With include_research, the latest AI report
+        and the latest research input of every token on the page are joined in the same aggregation.
+        Pass a cursor from encode_cursor(last_token, "last_research_time") instead of skip for keyset paging.
+        """
         coll = await MongoDBConnector.get_collection(self.tokens_collection)
-        tokens = await coll.find().sort([
-            ("last_research_time", -1),
-            ("_id", -1)
-        ]).skip(skip).limit(limit).to_list(limit)
+        pipeline = self._tokens_pipeline(skip, limit, include_research, cursor)
+        return await coll.aggregate(pipeline).to_list(limit)
+
+    def _tokens_pipeline(self, skip: int, limit: int, include_research: bool, cursor: Optional[str]) -> List[dict]:
+        pipeline = [
+            {"$match": _keyset_filter("last_research_time", cursor) if cursor else {}},
+            {"$sort": {"last_research_time": -1, "_id": -1}},
+            {"$skip": skip},
+            {"$limit": limit}
+        ]
         if include_research:
-            for token in tokens:
-                token = await self._include_token_data(token)
-        return tokens
+            pipeline += [
+                self._latest_lookup(self.ai_report_collection, "ai_reports",
+                                    ["token_name", "token_address", "token_id", "data", "created_at"]),
+                self._latest_lookup(self.research_input_collection, "research_inputs",
+                                    ["token_name", "token_address", "token_chain", "data", "token_id", "created_at"])
+            ]
+        return pipeline
         
     # DEPRECATED
     async def get_researches(
@@ -216,7 +488,8 @@ class DatabaseManager:
         skip: int = 0,
         limit: int = 100,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         coll = await MongoDBConnector.get_collection(self.research_collection)
         
@@ -233,6 +506,8 @@ class DatabaseManager:
                 query["research_time"]["$gte"] = start_date
             if end_date:
                 query["research_time"]["$lte"] = end_date
+        if cursor:
+            query = {"$and": [query, _keyset_filter("research_time", cursor)]}
 
         return await coll.find(query).sort([
             ("research_time", -1),
@@ -242,9 +517,10 @@ class DatabaseManager:
     async def save_research_input(self, research_input: TokenResearchInput) -> None:
         coll = await MongoDBConnector.get_collection(self.research_input_collection)
         await coll.insert_one(research_input.dict())
+        count_cache.record_insert(self.research_input_collection)
 
         coll = await MongoDBConnector.get_collection(self.tokens_collection)
-        await coll.update_one(
+        result = await coll.update_one(
             {"token_name": research_input.token_name},
             {
                 "$set": {
@@ -255,16 +531,26 @@ class DatabaseManager:
             },
             upsert=True
         )
+        if result.upserted_id is not None:
+            count_cache.record_insert(self.tokens_collection)
+        response_cache.invalidate(response_cache.token_tags(
+            research_input.token_id, research_input.token_name, research_input.token_address
+        ))
         return research_input
 
     async def save_ai_report(self, ai_report: TokenAIReport) -> None:
         coll = await MongoDBConnector.get_collection(self.ai_report_collection)
         await coll.insert_one(ai_report.dict())
+        count_cache.record_insert(self.ai_report_collection)
+        response_cache.invalidate(response_cache.token_tags(
+            ai_report.token_id, ai_report.token_name, ai_report.token_address
+        ))
 
     async def save_attachment(self, attachment: Attachment) -> str:
         """Save attachment metadata to MongoDB and return the ID"""
         coll = await MongoDBConnector.get_collection(self.attachments_collection)
         result = await coll.insert_one(attachment.dict())
+        count_cache.record_insert(self.attachments_collection)
         return str(result.inserted_id)
 
     async def get_attachment(self, attachment_id: str) -> Optional[Attachment]:
@@ -272,3 +558,21 @@ class DatabaseManager:
         coll = await MongoDBConnector.get_collection(self.attachments_collection)
         result = await coll.find_one({"_id": ObjectId(attachment_id)})
         return Attachment(**result) if result else None
+
+
+if __name__ == "__main__":
+    # python -m connectors.mongodb: apply the index spec and fail on any query that would COLLSCAN
+    import asyncio
+    from settings import MONGODB_URL
+
+    async def check_indexes():
+        await MongoDBConnector.connect(MONGODB_URL)
+        try:
+            db_manager = DatabaseManager()
+            await db_manager.ensure_indexes()
+            await db_manager.verify_indexes()
+            print("All queries are covered by indexes")
+        finally:
+            await MongoDBConnector.close()
+
+    asyncio.run(check_indexes())
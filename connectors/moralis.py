@@ -1,42 +1,106 @@
-import requests
+import asyncio
+import logging
+from typing import Dict, List
+
+from connectors.http_cache import http_cache
+from connectors.http_client import HTTPClient
+from connectors.market_cache import market_cache
+from connectors.rate_limiter import rate_limiter
+from settings import MORALIS_METADATA_BATCH_SIZE, MORALIS_PRICE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def _chunks(items: list, size: int) -> List[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
 
 
 class MoralisConnector:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, metadata_batch_size: int = MORALIS_METADATA_BATCH_SIZE,
+                 price_batch_size: int = MORALIS_PRICE_BATCH_SIZE):
         self.api_key = api_key
+        self.metadata_batch_size = metadata_batch_size
+        self.price_batch_size = price_batch_size
         self.headers = {
             'accept': 'application/json',
             'X-API-Key': self.api_key
         }
         self.base_url = "https://deep-index.moralis.io/api/v2.2/"
 
-    def _make_request(self, url: str, data: dict):
+    async def _make_request(self, url: str, data: dict, cache: bool = False):
         url = f'{self.base_url}/{url}'
-        return requests.get(url, headers=self.headers, params=data).json()
+        if not cache:
+            response = await rate_limiter.request(
+                "moralis", lambda: HTTPClient.get_client().get(url, headers=self.headers, params=data)
+            )
+            # Raise instead of returning the error body, so it is never cached as market data
+            response.raise_for_status()
+            return response.json()
+        key, entry, headers = await http_cache.aprepare(url, data, self.headers)
+        response = await rate_limiter.request(
+            "moralis", lambda: HTTPClient.get_client().get(url, headers=headers, params=data)
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+        return (await http_cache.aresolve(key, url, entry, response)).json()
+
+    async def _post_request(self, url: str, params: dict, body: dict):
+        url = f'{self.base_url}/{url}'
+        response = await rate_limiter.request(
+            "moralis", lambda: HTTPClient.get_client().post(url, headers=self.headers, params=params, json=body)
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def _gather_chunks(self, name: str, fetch, chunks: List[list]) -> Dict[str, dict]:
+        """Run fetch on every chunk concurrently and merge the results; a failed chunk is logged and left out"""
+        responses = await asyncio.gather(*[fetch(chunk) for chunk in chunks], return_exceptions=True)
+        results = {}
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Moralis {name} batch of {len(chunk)} tokens failed: {response!r}")
+                continue
+            results.update(response)
+        return results
     
-    def get_token_top_holders(self, token_address: str, chain: str, limit: int = 11, order: str = "DESC"):
+    async def get_token_top_holders(self, token_address: str, chain: str, limit: int = 11, order: str = "DESC"):
+        return await market_cache.get(
+            "top_holders", (chain, token_address.lower(), limit, order),
+            lambda: self._fetch_token_top_holders(token_address, chain, limit, order)
+        )
+
+    async def _fetch_token_top_holders(self, token_address: str, chain: str, limit: int, order: str):
         url = f"erc20/{token_address}/owners"
         data = {
             'chain': chain,
             'limit': limit,
             'order': order
         }
-        resp = self._make_request(url, data)
+        resp = await self._make_request(url, data)
         top_holders = []
         for item in resp['result']:
             if item['is_contract'] is False:
                 top_holders.append(item['percentage_relative_to_total_supply'])
         return top_holders
 
-    def get_token_info(self, token_address: str, chain: str):
+    async def get_token_info(self, token_address: str, chain: str):
+        return await market_cache.get(
+            "metadata", (chain, token_address.lower()), lambda: self._fetch_token_info(token_address, chain)
+        )
+
+    async def _fetch_token_info(self, token_address: str, chain: str):
         url = f'erc20/metadata'
         data = {
             'chain': chain,
             'addresses[]': token_address
         }
-        resp = self._make_request(url, data)
-        resp = resp[0]
-        links = resp.get('links', {})
+        # Token metadata rarely changes, revalidate it instead of downloading it again
+        resp = await self._make_request(url, data, cache=True)
+        return self._parse_token_info(resp[0])
+
+    @staticmethod
+    def _parse_token_info(resp: dict) -> dict:
+        links = resp.get('links') or {}
         return {
             'name': resp['name'],
             'symbol': resp['symbol'],
@@ -46,11 +110,55 @@ class MoralisConnector:
             'website': links.get('website', ''),
             'total_supply_formatted': round(float(resp['total_supply_formatted']), int(resp['decimals']))
         }
+
+    async def get_tokens_info(self, token_addresses: List[str], chain: str) -> Dict[str, dict]:
+        """
+        Metadata of many tokens on one chain, `metadata_batch_size` addresses per request with
+        the requests running concurrently. Keyed by lowercased address and stored in the market
+        data cache; tokens Moralis has no usable metadata for are left out.
+        """
+        async def fetch(chunk: List[str]) -> Dict[str, dict]:
+            resp = await self._make_request('erc20/metadata', {'chain': chain, 'addresses[]': chunk})
+            results = {}
+            for item in resp:
+                try:
+                    results[item['address'].lower()] = self._parse_token_info(item)
+                except (KeyError, TypeError, ValueError):
+                    logger.warning(f"Skipping unusable Moralis metadata for {item.get('address')}")
+            return results
+
+        addresses = list(dict.fromkeys(address.lower() for address in token_addresses))
+        results = await self._gather_chunks('metadata', fetch, _chunks(addresses, self.metadata_batch_size))
+        for address, token_info in results.items():
+            market_cache.set("metadata", (chain, address), token_info)
+        return results
     
-    def get_token_price_info(self, token_address: str, chain: str):
+    async def get_token_price_info(self, token_address: str, chain: str):
+        return await market_cache.get(
+            "price", (chain, token_address.lower()), lambda: self._fetch_token_price_info(token_address, chain)
+        )
+
+    async def _fetch_token_price_info(self, token_address: str, chain: str):
         url = f'erc20/{token_address}/price'
         data = {
             'chain': chain
         }
-        resp = self._make_request(url, data)
+        resp = await self._make_request(url, data)
         return resp
+
+    async def get_tokens_price_info(self, token_addresses: List[str], chain: str) -> Dict[str, dict]:
+        """
+        Prices of many tokens on one chain through the multiple token prices endpoint,
+        `price_batch_size` tokens per request. Same shape per token as get_token_price_info,
+        keyed by lowercased address and stored in the market data cache.
+        """
+        async def fetch(chunk: List[str]) -> Dict[str, dict]:
+            resp = await self._post_request('erc20/prices', {'chain': chain},
+                                            {'tokens': [{'token_address': address} for address in chunk]})
+            return {item['tokenAddress'].lower(): item for item in resp if item.get('tokenAddress')}
+
+        addresses = list(dict.fromkeys(address.lower() for address in token_addresses))
+        results = await self._gather_chunks('price', fetch, _chunks(addresses, self.price_batch_size))
+        for address, price_info in results.items():
+            market_cache.set("price", (chain, address), price_info)
+        return results
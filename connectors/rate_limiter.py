@@ -0,0 +1,210 @@
+import asyncio
+import re
+import threading
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from settings import RATE_LIMITS, RATE_LIMIT_MAX_WAIT_SECONDS, RATE_LIMIT_MAX_RETRIES
+
+# Header names differ per provider: GitHub uses x-ratelimit-*, OpenAI x-ratelimit-*-requests,
+# RapidAPI x-ratelimit-requests-*
+REMAINING_HEADERS = ("x-ratelimit-remaining", "x-ratelimit-remaining-requests", "x-ratelimit-requests-remaining")
+RESET_HEADERS = ("x-ratelimit-reset", "x-ratelimit-reset-requests", "x-ratelimit-requests-reset")
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# Set to a dict to count the requests made in the current context (and the tasks and threads
+# it starts) per provider; the research scheduler charges them to its budgets this way
+provider_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("provider_usage", default=None)
+
+
+def _record_usage(provider: str) -> None:
+    usage = provider_usage.get()
+    if usage is not None:
+        usage[provider] = usage.get(provider, 0) + 1
+
+
+class RateLimitExceeded(Exception):
+    """Raised instead of waiting when a provider's next free slot is further away than max_wait"""
+
+    def __init__(self, provider: str, delay: float):
+        super().__init__(f"{provider} rate limit: next slot in {delay:.1f}s")
+        self.provider = provider
+        self.delay = delay
+
+
+class TokenBucket:
+    """
+    Token bucket kept as a theoretical arrival time (GCRA).
+
+    Every caller reserves the next free slot under a lock and then sleeps until it,
+    so callers are served first come first served and the bucket works the same
+    for coroutines and for connectors running in threads.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * (max(burst, 1) - 1)
+        self._tat = 0.0
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> float:
+        """Reserve a slot and return how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            delay = max(0.0, tat - self.tolerance - now)
+            if delay > max_wait:
+                return delay
+            self._tat = tat + self.interval
+            return delay
+
+    def pause_until(self, until: float) -> None:
+        """Hand out no slot before `until` (monotonic time)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, until)
+            self._tat = max(self._tat, until + self.tolerance)
+
+    def is_paused(self) -> bool:
+        return time.monotonic() < self.paused_until
+
+
+def _parse_seconds(value: str, now: float) -> Optional[float]:
+    """Turn a Retry-After / reset header value into seconds from now"""
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        parts = DURATION_PART.findall(value)
+        if parts:
+            return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+        try:
+            return parsedate_to_datetime(value).timestamp() - now
+        except (TypeError, ValueError):
+            return None
+    # Large values are epoch timestamps (GitHub), small ones are relative seconds
+    return number - now if number > 1e9 else number
+
+
+class RateLimiter:
+    """
+    Per provider request pacing shared by every connector and agent in the process.
+
+    Requests are spaced out by a token bucket sized from the provider's quota. The
+    responses feed back into the bucket: a 429 pauses the provider for Retry-After
+    (or an exponential backoff) and is retried, and an exhausted X-RateLimit-Remaining
+    pauses it until the advertised reset, so the next callers wait instead of failing.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = RATE_LIMITS,
+                 max_wait: float = RATE_LIMIT_MAX_WAIT_SECONDS, max_retries: int = RATE_LIMIT_MAX_RETRIES):
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.buckets = {provider: TokenBucket(rate, burst) for provider, (rate, burst) in limits.items()}
+        self.stats = {
+            provider: {"requests": 0, "delayed": 0, "wait_seconds": 0.0, "rate_limited": 0, "rejected": 0}
+            for provider in limits
+        }
+        self.waiting = {provider: 0 for provider in limits}
+
+    def _reserve(self, provider: str) -> float:
+        delay = self.buckets[provider].reserve(self.max_wait)
+        stats = self.stats[provider]
+        if delay > self.max_wait:
+            stats["rejected"] += 1
+            raise RateLimitExceeded(provider, delay)
+        if delay:
+            stats["delayed"] += 1
+            stats["wait_seconds"] += delay
+        return delay
+
+    async def acquire(self, provider: str) -> None:
+        # A slot reserved before a 429 may fall inside the pause it caused, so take a new one
+        while True:
+            delay = self._reserve(provider)
+            if delay:
+                self.waiting[provider] += 1
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    self.waiting[provider] -= 1
+            if not self.buckets[provider].is_paused():
+                break
+        self.stats[provider]["requests"] += 1
+        _record_usage(provider)
+
+    def acquire_sync(self, provider: str) -> None:
+        while True:
+            delay = self._reserve(provider)
+            if delay:
+                self.waiting[provider] += 1
+                try:
+                    time.sleep(delay)
+                finally:
+                    self.waiting[provider] -= 1
+            if not self.buckets[provider].is_paused():
+                break
+        self.stats[provider]["requests"] += 1
+        _record_usage(provider)
+
+    def observe(self, provider: str, response: Any, attempt: int = 0) -> Optional[float]:
+        """
+        Apply the rate limit headers of an httpx or requests response to the provider's bucket.
+
+        Returns:
+            float: seconds to back off if the response is a 429, None otherwise
+        """
+        headers = response.headers
+        now = time.time()
+        bucket = self.buckets[provider]
+        if response.status_code != 429:
+            remaining = next((headers[name] for name in REMAINING_HEADERS if name in headers), None)
+            if remaining is not None and remaining.strip() == "0":
+                reset_in = self._reset_in(headers, now)
+                if reset_in is not None:
+                    bucket.pause_until(time.monotonic() + max(reset_in, 0.0))
+            return None
+
+        self.stats[provider]["rate_limited"] += 1
+        retry_after = headers.get("retry-after")
+        backoff = _parse_seconds(retry_after, now) if retry_after else None
+        if backoff is None:
+            backoff = self._reset_in(headers, now)
+        if backoff is None:
+            backoff = 2 ** attempt
+        backoff = max(backoff, 0.0)
+        bucket.pause_until(time.monotonic() + backoff)
+        return backoff
+
+    @staticmethod
+    def _reset_in(headers: Any, now: float) -> Optional[float]:
+        reset = next((headers[name] for name in RESET_HEADERS if name in headers), None)
+        return _parse_seconds(reset, now) if reset else None
+
+    async def request(self, provider: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        """Send an httpx request through the limiter, retrying 429s up to max_retries times"""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(provider)
+            response = await send()
+            if self.observe(provider, response, attempt) is None or attempt == self.max_retries:
+                return response
+
+    def request_sync(self, provider: str, send: Callable[[], Any]) -> Any:
+        """Blocking counterpart of request() for the connectors built on requests"""
+        for attempt in range(self.max_retries + 1):
+            self.acquire_sync(provider)
+            response = send()
+            if self.observe(provider, response, attempt) is None or attempt == self.max_retries:
+                return response
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            provider: {**stats, "wait_seconds": round(stats["wait_seconds"], 3), "waiting": self.waiting[provider]}
+            for provider, stats in self.stats.items()
+        }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,218 @@
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from settings import HTTP_REPLAY_MODE, HTTP_CASSETTE_PATH, HTTP_REPLAY_LATENCY, HTTP_REPLAY_LATENCY_SCALE
+
+# Only these response headers are kept; everything else may carry cookies or account details
+RECORDED_HEADERS = ("content-type", "etag", "last-modified")
+# Leading part of a request body kept in the cassette for matching requests that differ slightly
+BODY_PREFIX_CHARS = 4000
+
+
+def _body_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _common_prefix(a: str, b: str) -> int:
+    size = min(len(a), len(b))
+    for i in range(size):
+        if a[i] != b[i]:
+            return i
+    return size
+
+
+class Cassette:
+    """
+    Recorded upstream interactions in a JSON file.
+
+    A replayed request is answered by the recorded interaction with the same method, host
+    and path that matches best: the same query string and body hash first, then an
+    interaction whose `match_body` text occurs in the request body, then the longest
+    common body prefix. Prompts and GraphQL queries embed today's date, so exact body
+    matches are not required for a recording to stay usable.
+    """
+
+    def __init__(self, path: Optional[str] = None, interactions: Optional[List[Dict[str, Any]]] = None):
+        self.path = Path(path) if path else None
+        self.interactions: List[Dict[str, Any]] = interactions or []
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self.interactions = json.loads(self.path.read_text())["interactions"]
+
+    def record(self, request: httpx.Request, response: httpx.Response, elapsed: float) -> None:
+        body = request.content.decode("utf-8", errors="replace")
+        try:
+            content, encoding = response.content.decode("utf-8"), "text"
+        except UnicodeDecodeError:
+            content, encoding = base64.b64encode(response.content).decode("ascii"), "base64"
+        interaction = {
+            "method": request.method,
+            "host": request.url.host,
+            "path": request.url.path,
+            "query": request.url.query.decode("ascii"),
+            "body_sha256": _body_hash(request.content),
+            "body": body[:BODY_PREFIX_CHARS],
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            "content": content,
+            "encoding": encoding,
+            "elapsed": round(elapsed, 4),
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+            self.save()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"interactions": self.interactions}, indent=1, ensure_ascii=False))
+
+    def find(self, request: httpx.Request) -> Optional[Dict[str, Any]]:
+        query = request.url.query.decode("ascii")
+        body_hash = _body_hash(request.content)
+        body = request.content.decode("utf-8", errors="replace")
+
+        def score(interaction: Dict[str, Any]) -> Tuple[int, int, int, int]:
+            match_body = interaction.get("match_body")
+            return (
+                interaction.get("body_sha256") == body_hash,
+                interaction.get("query", "") == query,
+                bool(match_body) and match_body in body,
+                _common_prefix(interaction.get("body", ""), body[:BODY_PREFIX_CHARS]),
+            )
+
+        candidates = [
+            interaction for interaction in self.interactions
+            if interaction["method"] == request.method
+            and interaction["host"] == request.url.host
+            and interaction["path"] == request.url.path
+        ]
+        return max(candidates, key=score) if candidates else None
+
+
+def _to_response(interaction: Dict[str, Any]) -> httpx.Response:
+    if interaction.get("encoding") == "base64":
+        content = base64.b64decode(interaction["content"])
+    else:
+        content = interaction["content"].encode("utf-8")
+    return httpx.Response(interaction["status"], headers=interaction.get("headers", {}), content=content)
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Sends requests through the real transport and appends every exchange to the cassette"""
+
+    def __init__(self, transport, cassette: Cassette):
+        self._transport = transport
+        self.cassette = cassette
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = self._transport.handle_request(request)
+        content = response.read()
+        response.close()
+        recorded = httpx.Response(response.status_code, headers=response.headers, content=content)
+        self.cassette.record(request, recorded, time.perf_counter() - start)
+        return recorded
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        recorded = httpx.Response(response.status_code, headers=response.headers, content=content)
+        self.cassette.record(request, recorded, time.perf_counter() - start)
+        return recorded
+
+    def close(self) -> None:
+        self._transport.close()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Answers from the cassette without touching the network. Each response is delayed by
+    `latency` seconds if given, otherwise by its recorded time multiplied by `latency_scale`.
+    A request with nothing recorded for its host and path fails like a connection error.
+    """
+
+    def __init__(self, cassette: Cassette, latency: Optional[float] = None, latency_scale: float = 1.0):
+        self.cassette = cassette
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.stats = {"replayed": 0, "missing": 0}
+
+    def _lookup(self, request: httpx.Request) -> Tuple[Dict[str, Any], float]:
+        interaction = self.cassette.find(request)
+        if interaction is None:
+            self.stats["missing"] += 1
+            raise httpx.ConnectError(f"No recorded response for {request.method} {request.url}", request=request)
+        self.stats["replayed"] += 1
+        delay = self.latency if self.latency is not None else interaction.get("elapsed", 0) * self.latency_scale
+        return interaction, delay
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        interaction, delay = self._lookup(request)
+        time.sleep(delay)
+        return _to_response(interaction)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        interaction, delay = self._lookup(request)
+        await asyncio.sleep(delay)
+        return _to_response(interaction)
+
+
+class ReplayConfig:
+    """
+    How HTTPClient builds its transports: "off" (live), "record" (live, saved to the
+    cassette) or "replay" (from the cassette only). Read from settings, and changed by
+    the benchmarks through configure() before the clients are created.
+    """
+    mode: str = HTTP_REPLAY_MODE
+    cassette_path: str = HTTP_CASSETTE_PATH
+    latency: Optional[float] = HTTP_REPLAY_LATENCY
+    latency_scale: float = HTTP_REPLAY_LATENCY_SCALE
+    cassette: Optional[Cassette] = None
+    replay_transport: Optional[ReplayTransport] = None
+
+    @classmethod
+    def configure(cls, mode: str, cassette_path: Optional[str] = None, cassette: Optional[Cassette] = None,
+                  latency: Optional[float] = None, latency_scale: float = 1.0) -> None:
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        cls.mode = mode
+        cls.cassette_path = cassette_path or cls.cassette_path
+        cls.cassette = cassette
+        cls.latency = latency
+        cls.latency_scale = latency_scale
+        cls.replay_transport = None
+
+    @classmethod
+    def get_cassette(cls) -> Cassette:
+        if cls.cassette is None:
+            cls.cassette = Cassette(cls.cassette_path)
+        return cls.cassette
+
+    @classmethod
+    def wrap(cls, transport):
+        """Return the transport HTTPClient should use in place of `transport`"""
+        if cls.mode == "record":
+            return RecordingTransport(transport, cls.get_cassette())
+        if cls.mode == "replay":
+            # One replay transport serves the sync and the async client
+            if cls.replay_transport is None:
+                cls.replay_transport = ReplayTransport(cls.get_cassette(), cls.latency, cls.latency_scale)
+            return cls.replay_transport
+        return transport
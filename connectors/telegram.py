@@ -1,8 +1,11 @@
-import requests
+import httpx
 from bs4 import BeautifulSoup
 import re
 from typing import Optional
 
+from connectors.http_client import HTTPClient
+from connectors.rate_limiter import rate_limiter
+
 class TelegramConnector:
     def __init__(self):
         self.headers = {
@@ -10,38 +13,42 @@ class TelegramConnector:
         }
         self.base_url = "https://t.me"
 
-    def get_channel_followers(self, channel_name: str) -> int:
+    def get_channel_followers(self, channel_name: str, timeout: Optional[float] = None) -> Optional[int]:
         """
         Get the number of followers for a Telegram channel
         
         Args:
             channel_name (str): Channel name without @ symbol (e.g. 'HyperliquidXofficial')
+            timeout (float): Request timeout in seconds, the shared client default if None
             
         Returns:
-            int: Number of followers/members, or 0 if unable to fetch
+            int: Number of followers/members, or None if unable to fetch
         """
         url = f"{self.base_url}/{channel_name.strip('@')}"
-        return self._parse_followers_count(self._fetch_channel_page(url))
+        return self._parse_followers_count(self._fetch_channel_page(url, timeout))
 
-    def _fetch_channel_page(self, url: str) -> Optional[str]:
+    def _fetch_channel_page(self, url: str, timeout: Optional[float] = None) -> Optional[str]:
         """
         Fetch the channel page HTML content
         
         Args:
             url (str): Channel URL
+            timeout (float): Request timeout in seconds
             
         Returns:
             Optional[str]: HTML content if successful, None otherwise
         """
         try:
-            response = requests.get(url, headers=self.headers)
+            response = rate_limiter.request_sync("telegram", lambda: HTTPClient.get_sync_client().get(
+                url, headers=self.headers, timeout=timeout or httpx.USE_CLIENT_DEFAULT
+            ))
             response.raise_for_status()
             return response.text
         except Exception as e:
             print(f"Error fetching Telegram channel: {e}")
             return None
 
-    def _parse_followers_count(self, html_content: Optional[str]) -> int:
+    def _parse_followers_count(self, html_content: Optional[str]) -> Optional[int]:
         """
         Parse the HTML content to extract followers count
         
@@ -49,10 +56,10 @@ class TelegramConnector:
             html_content (Optional[str]): HTML content of the channel page
             
         Returns:
-            int: Number of followers/members, or 0 if unable to parse
+            int: Number of followers/members, or None if unable to parse
         """
         if not html_content:
-            return 0
+            return None
 
         try:
             soup = BeautifulSoup(html_content, 'html.parser')
@@ -67,8 +74,8 @@ class TelegramConnector:
                 if subscribers_count:
                     return int(subscribers_count.group(1).replace(' ', ''))
             
-            return 0
+            return None
             
         except Exception as e:
             print(f"Error parsing followers count: {e}")
-            return 0
+            return None
@@ -1,6 +1,8 @@
-import requests
+import httpx
 from typing import Dict, Optional
 
+from connectors.http_client import HTTPClient
+from connectors.rate_limiter import RateLimitExceeded, rate_limiter
 from settings import TWITTER_API_KEY
 
 
@@ -14,39 +16,52 @@ class TwitterConnector:
             "x-rapidapi-key": TWITTER_API_KEY
         }
 
-    def _make_request(self, endpoint: str, params: Dict) -> Optional[Dict]:
+    def _make_request(self, endpoint: str, params: Dict, timeout: Optional[float] = None) -> Optional[Dict]:
         """
         Make HTTP request to Twitter API
         
         Args:
             endpoint (str): API endpoint path
             params (dict): Query parameters
+            timeout (float): Request timeout in seconds, the shared client default if None
             
         Returns:
             dict: Response data if successful, None if failed
         """
         try:
             url = f"{self.base_url}/{endpoint}"
-            response = requests.get(
+            response = rate_limiter.request_sync("twitter", lambda: HTTPClient.get_sync_client().get(
                 url,
                 headers=self.headers,
-                params=params
-            )
+                params=params,
+                timeout=timeout or httpx.USE_CLIENT_DEFAULT
+            ))
             response.raise_for_status()
             return response.json()
             
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, RateLimitExceeded) as e:
             print(f"Error making Twitter API request: {e}")
             return None
 
-    def get_user_info(self, username: str) -> Optional[Dict]:
+    def get_user_info(self, username: str, timeout: Optional[float] = None) -> Optional[Dict]:
         """
         Fetch user information from Twitter via RapidAPI
         
         Args:
             username (str): Twitter username without @ symbol
+            timeout (float): Request timeout in seconds, the shared client default if None
             
         Returns:
             dict: User information if successful, None if failed
         """
-        return self._make_request("user", {"username": username})
+        return self._make_request("user", {"username": username}, timeout)
+
+    def get_followers(self, username: str, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Returns:
+            int: Followers count if successful, None if failed
+        """
+        user_info = self.get_user_info(username, timeout)
+        if not user_info:
+            return None
+        return user_info.get('result', {}).get('data', {}).get('user', {}).get('result', {}).get('legacy', {}).get('followers_count')
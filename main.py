@@ -2,13 +2,31 @@ from api.routes import router  # Import the router from api/routes.py
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from connectors.mongodb import MongoDBConnector
-from settings import MONGODB_URL, ALLOWED_ORIGINS
+from connectors.mongodb import MongoDBConnector, DatabaseManager
+from connectors.http_client import HTTPClient
+from connectors.http_cache import http_cache
+from agents.document_pool import document_pool
+from utils.jobs import job_queue
+from utils.scheduler import research_scheduler
+from settings import MONGODB_URL, ALLOWED_ORIGINS, MONGODB_VERIFY_INDEXES, RESEARCH_SCHEDULER_ENABLED
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await MongoDBConnector.connect(MONGODB_URL)
+    db_manager = DatabaseManager()
+    await db_manager.ensure_indexes()
+    if MONGODB_VERIFY_INDEXES:
+        await db_manager.verify_indexes()
+    await document_pool.start()
+    await job_queue.start()
+    if RESEARCH_SCHEDULER_ENABLED:
+        await research_scheduler.start()
     yield
+    await research_scheduler.stop()
+    await job_queue.stop()
+    await document_pool.stop()
+    await HTTPClient.close()
+    http_cache.close()
     await MongoDBConnector.close()
 
 app = FastAPI(lifespan=lifespan)
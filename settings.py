@@ -10,4 +10,117 @@ MORALIS_API_KEY = getenv("MORALIS_API_KEY")
 BITQUERY_API_KEY = getenv("BITQUERY_API_KEY")
 MONGODB_URL = getenv("MONGODB_URL")
 ALLOWED_ORIGINS = getenv("ALLOWED_ORIGINS", "").split(",")
-TWITTER_API_KEY = getenv("TWITTER_API_KEY")
\ No newline at end of file
+TWITTER_API_KEY = getenv("TWITTER_API_KEY")
+GITHUB_TOKEN = getenv("GITHUB_TOKEN")
+# "pushed_at", "graphql" (needs GITHUB_TOKEN) or "commits", see GitHubConnector
+GITHUB_LAST_COMMIT_MODE = getenv("GITHUB_LAST_COMMIT_MODE", "pushed_at")
+MONGODB_VERIFY_INDEXES = getenv("MONGODB_VERIFY_INDEXES", "false").lower() == "true"
+# "exact" keeps cached counters updated on writes, "estimated" reads collection metadata
+COUNT_MODE = getenv("COUNT_MODE", "exact")
+COUNT_CACHE_TTL_SECONDS = int(getenv("COUNT_CACHE_TTL_SECONDS", "60"))
+COUNT_CACHE_MAX_ENTRIES = int(getenv("COUNT_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_ENTRIES = int(getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+# Bounds how long a process serves a token changed by another process
+RESPONSE_CACHE_TTL_SECONDS = float(getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+# Shared HTTP transport, see connectors/http_client.py
+HTTP_TIMEOUT = float(getenv("HTTP_TIMEOUT", "60"))
+HTTP_CONNECT_TIMEOUT = float(getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_CONNECT_RETRIES = int(getenv("HTTP_CONNECT_RETRIES", "2"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "50"))
+HTTP_MAX_KEEPALIVE_PER_HOST = int(getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = getenv("HTTP2_ENABLED", "true").lower() == "true"
+# "off", "record" (save upstream responses to the cassette) or "replay" (answer from it offline)
+HTTP_REPLAY_MODE = getenv("HTTP_REPLAY_MODE", "off")
+HTTP_CASSETTE_PATH = getenv("HTTP_CASSETTE_PATH", "benchmarks/fixtures/cassette.json")
+# Fixed replay delay in seconds; unset replays each response after its recorded time
+HTTP_REPLAY_LATENCY = float(getenv("HTTP_REPLAY_LATENCY")) if getenv("HTTP_REPLAY_LATENCY") else None
+HTTP_REPLAY_LATENCY_SCALE = float(getenv("HTTP_REPLAY_LATENCY_SCALE", "1"))
+HTTP_CACHE_PATH = getenv("HTTP_CACHE_PATH", "cache/http_cache.sqlite3")
+HTTP_CACHE_MAX_BYTES = int(getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds before cached market data is refreshed, per kind; older values are still served while refreshing
+MARKET_CACHE_TTLS = {
+    kind: float(getenv(f"MARKET_CACHE_TTL_{kind.upper()}", default))
+    for kind, default in {
+        "metadata": str(24 * 60 * 60),
+        "holders": "3600",
+        "top_holders": "600",
+        "max_price": "3600",
+        "price": "30",
+    }.items()
+}
+# Seconds past the TTL a value may still be served while it refreshes, per kind; older values are refetched
+MARKET_CACHE_MAX_STALE_SECONDS = {
+    kind: float(getenv(f"MARKET_CACHE_MAX_STALE_{kind.upper()}", default))
+    for kind, default in {
+        "metadata": str(24 * 60 * 60),
+        "holders": str(3 * 3600),
+        "top_holders": "600",
+        "max_price": str(3 * 3600),
+        "price": "30",
+    }.items()
+}
+MARKET_CACHE_MAX_ENTRIES = int(getenv("MARKET_CACHE_MAX_ENTRIES", "4096"))
+# Tokens per batched Bitquery stats request
+BITQUERY_BATCH_SIZE = int(getenv("BITQUERY_BATCH_SIZE", "50"))
+# Addresses per Moralis bulk request, at most what the erc20/metadata and erc20/prices endpoints accept
+MORALIS_METADATA_BATCH_SIZE = int(getenv("MORALIS_METADATA_BATCH_SIZE", "10"))
+MORALIS_PRICE_BATCH_SIZE = int(getenv("MORALIS_PRICE_BATCH_SIZE", "25"))
+LLM_CACHE_MAX_ENTRIES = int(getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_SECONDS = int(getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+
+JOB_WORKERS = int(getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_SECONDS = float(getenv("JOB_POLL_INTERVAL_SECONDS", "5"))
+JOB_LEASE_SECONDS = int(getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Scheduled re-research of tokens whose report is older than their freshness target
+RESEARCH_SCHEDULER_ENABLED = getenv("RESEARCH_SCHEDULER_ENABLED", "false").lower() == "true"
+RESEARCH_SCAN_INTERVAL_SECONDS = float(getenv("RESEARCH_SCAN_INTERVAL_SECONDS", "300"))
+RESEARCH_SCAN_LIMIT = int(getenv("RESEARCH_SCAN_LIMIT", "200"))
+RESEARCH_FRESHNESS_SECONDS = int(getenv("RESEARCH_FRESHNESS_SECONDS", str(24 * 60 * 60)))
+RESEARCH_CONCURRENCY = int(getenv("RESEARCH_CONCURRENCY", "2"))
+RESEARCH_LEASE_SECONDS = int(getenv("RESEARCH_LEASE_SECONDS", "900"))
+RESEARCH_RETRY_SECONDS = int(getenv("RESEARCH_RETRY_SECONDS", "3600"))
+# Upstream requests the scheduler may make per provider and window; a provider left out is not limited
+RESEARCH_BUDGET_WINDOW_SECONDS = float(getenv("RESEARCH_BUDGET_WINDOW_SECONDS", "3600"))
+RESEARCH_BUDGETS = {
+    provider: int(getenv(f"RESEARCH_BUDGET_{provider.upper()}", default))
+    for provider, default in {
+        "openai": "300",
+        "moralis": "2000",
+        "bitquery": "200",
+        "github": "1000",
+        "twitter": "200",
+        "telegram": "200",
+        "discord": "200",
+    }.items()
+}
+
+# DOCX text extraction in worker processes, see agents/document_pool.py
+DOCX_PARSE_WORKERS = int(getenv("DOCX_PARSE_WORKERS", "2"))
+DOCX_PARSE_TIMEOUT_SECONDS = float(getenv("DOCX_PARSE_TIMEOUT_SECONDS", "60"))
+DOCX_MAX_BYTES = int(getenv("DOCX_MAX_BYTES", str(20 * 1024 * 1024)))
+
+CHAT_HISTORY_MAX_TURNS = int(getenv("CHAT_HISTORY_MAX_TURNS", "20"))
+CHAT_HISTORY_TOKEN_BUDGET = int(getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+CHAT_SUMMARY_MAX_CHARS = int(getenv("CHAT_SUMMARY_MAX_CHARS", "2000"))
+CHAT_SESSION_IDLE_SECONDS = int(getenv("CHAT_SESSION_IDLE_SECONDS", str(30 * 60)))
+CHAT_HISTORY_MAX_CHARS = int(getenv("CHAT_HISTORY_MAX_CHARS", str(20 * 1024 * 1024)))
+
+# Pacing per upstream provider as "requests_per_second:burst", from the providers' published quotas
+RATE_LIMITS = {
+    provider: tuple(float(value) for value in getenv(f"RATE_LIMIT_{provider.upper()}", default).split(":"))
+    for provider, default in {
+        "moralis": "25:25",
+        "bitquery": "1:5",
+        "github": "1.38:10",
+        "twitter": "5:5",
+        "telegram": "1:3",
+        "discord": "5:5",
+        "openai": "8:20",
+        "grok": "8:8",
+    }.items()
+}
+RATE_LIMIT_MAX_WAIT_SECONDS = float(getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "60"))
+RATE_LIMIT_MAX_RETRIES = int(getenv("RATE_LIMIT_MAX_RETRIES", "3"))
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from connectors.mongodb import _keyset_filter, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "research_time": datetime(2026, 1, 2, 3, 4, 5, 678000)}
+    assert decode_cursor(encode_cursor(doc, "research_time")) == {"value": doc["research_time"], "_id": doc["_id"]}
+
+
+def test_cursor_round_trip_without_value():
+    doc = {"_id": ObjectId()}
+    assert decode_cursor(encode_cursor(doc, "research_time")) == {"value": None, "_id": doc["_id"]}
+
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+
+
+def test_filter_after_null_stays_in_nulls():
+    doc = {"_id": ObjectId(), "research_time": None}
+    assert _keyset_filter("research_time", encode_cursor(doc, "research_time")) == {
+        "research_time": None, "_id": {"$lt": doc["_id"]}
+    }
+
+
+def test_filter_after_value_includes_nulls():
+    doc = {"_id": ObjectId(), "research_time": datetime(2026, 1, 2)}
+    assert {"research_time": None} in _keyset_filter("research_time", encode_cursor(doc, "research_time"))["$or"]
+
+
+def test_paging_visits_every_document_once():
+    coll = mongomock.MongoClient().db.researches
+    start = datetime(2026, 1, 1)
+    # Ties on the sort field and documents without one, which sort last
+    times = [start + timedelta(hours=i // 2) for i in range(7)] + [None] * 4
+    coll.insert_many([{"research_time": value} if value else {} for value in times])
+    sort = [("research_time", -1), ("_id", -1)]
+    expected = [doc["_id"] for doc in coll.find().sort(sort)]
+
+    seen, cursor = [], None
+    while True:
+        query = _keyset_filter("research_time", cursor) if cursor else {}
+        page = list(coll.find(query).sort(sort).limit(3))
+        if not page:
+            break
+        seen += [doc["_id"] for doc in page]
+        cursor = encode_cursor(page[-1], "research_time")
+    assert seen == expected
@@ -0,0 +1,61 @@
+import asyncio
+
+from utils.pipeline import Pipeline, Stage
+from utils.utils import _llm_succeeded
+
+
+def make_pipeline(replies):
+    calls = []
+
+    async def summarize(repos_info):
+        calls.append(repos_info)
+        return replies.pop(0)
+
+    pipeline = Pipeline([
+        Stage('development_status', summarize, inputs=['repos_info'], outputs=['updated_development_status'],
+              fingerprint=lambda repos_info: repos_info, succeeded=_llm_succeeded),
+    ])
+    return pipeline, calls
+
+
+def run(pipeline, previous=None, previous_fingerprints=None):
+    return asyncio.run(pipeline.run({'repos_info': ['repo-a', 'repo-b']}, previous=previous,
+                                    previous_fingerprints=previous_fingerprints))
+
+
+def test_failed_stage_is_not_memoized():
+    pipeline, calls = make_pipeline(["Error: Client error '429 Too Many Requests'", "Actively developed."])
+
+    failed, timings = run(pipeline)
+    assert 'development_status' not in timings['fingerprints']
+
+    # Same inputs again: the stage runs instead of replaying the error
+    results, timings = run(pipeline, previous=failed, previous_fingerprints=timings['fingerprints'])
+    assert len(calls) == 2
+    assert timings['stages']['development_status']['reused'] is False
+    assert results['updated_development_status'] == "Actively developed."
+    assert 'development_status' in timings['fingerprints']
+
+
+def test_failed_output_with_matching_fingerprint_is_not_reused():
+    # Reports saved before failures were excluded can carry a fingerprint for an error
+    pipeline, calls = make_pipeline(["Actively developed."])
+    fingerprints = {'development_status': Stage(
+        'development_status', None, inputs=['repos_info'], outputs=['updated_development_status'],
+        fingerprint=lambda repos_info: repos_info
+    ).input_fingerprint({'repos_info': ['repo-a', 'repo-b']})}
+
+    results, timings = run(pipeline, previous={'updated_development_status': "Error: timeout"},
+                           previous_fingerprints=fingerprints)
+    assert len(calls) == 1
+    assert results['updated_development_status'] == "Actively developed."
+
+
+def test_successful_stage_is_reused():
+    pipeline, calls = make_pipeline(["Actively developed."])
+
+    first, timings = run(pipeline)
+    results, timings = run(pipeline, previous=first, previous_fingerprints=timings['fingerprints'])
+    assert len(calls) == 1
+    assert timings['stages']['development_status']['reused'] is True
+    assert results['updated_development_status'] == "Actively developed."
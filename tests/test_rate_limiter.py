@@ -0,0 +1,97 @@
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from connectors import rate_limiter as rate_limiter_module
+from connectors.rate_limiter import RateLimiter, RateLimitExceeded, TokenBucket
+
+
+class FakeTime:
+    """Stands in for the time module so pacing is checked without sleeping"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.wall = 1_700_000_000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.wall
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+        self.wall += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(rate_limiter_module, "time", fake)
+    return fake
+
+
+def response(status_code=200, **headers):
+    return SimpleNamespace(status_code=status_code, headers={name.replace("_", "-"): value
+                                                             for name, value in headers.items()})
+
+
+def test_burst_then_paced(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve(max_wait=10) for _ in range(5)] == [0, 0, 0, 0.5, 1.0]
+
+    clock.now += 2.5
+    assert bucket.reserve(max_wait=10) == 0
+
+
+def test_reservation_over_max_wait_takes_no_slot(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.reserve(max_wait=10)
+    assert bucket.reserve(max_wait=0.5) == 1.0
+    assert bucket.reserve(max_wait=10) == 1.0
+
+
+def test_retry_after_seconds_pauses_provider(clock):
+    limiter = RateLimiter({"github": (10, 1)})
+    assert limiter.observe("github", response(429, retry_after="7")) == 7
+    assert limiter.buckets["github"].is_paused()
+    assert limiter.buckets["github"].reserve(max_wait=60) == 7
+    assert limiter.stats["github"]["rate_limited"] == 1
+
+
+def test_retry_after_http_date(clock):
+    limiter = RateLimiter({"github": (10, 1)})
+    backoff = limiter.observe("github", response(429, retry_after=formatdate(clock.wall + 30, usegmt=True)))
+    assert backoff == pytest.approx(30)
+
+
+def test_429_without_headers_backs_off_exponentially(clock):
+    limiter = RateLimiter({"github": (10, 1)})
+    assert limiter.observe("github", response(429), attempt=2) == 4
+
+
+def test_exhausted_remaining_pauses_until_reset(clock):
+    limiter = RateLimiter({"github": (10, 1)})
+    assert limiter.observe("github", response(200, x_ratelimit_remaining="0",
+                                              x_ratelimit_reset=str(clock.wall + 20))) is None
+    assert limiter.buckets["github"].paused_until == pytest.approx(clock.now + 20)
+
+
+def test_request_waits_out_retry_after_and_retries(clock):
+    limiter = RateLimiter({"github": (10, 1)}, max_wait=60, max_retries=2)
+    replies = [response(429, retry_after="3"), response(200)]
+
+    assert limiter.request_sync("github", lambda: replies.pop(0)).status_code == 200
+    assert clock.slept == [3]
+    assert limiter.stats["github"]["requests"] == 2
+
+
+def test_request_rejected_when_wait_exceeds_max_wait(clock):
+    limiter = RateLimiter({"github": (10, 1)}, max_wait=5)
+    limiter.observe("github", response(429, retry_after="30"))
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire_sync("github")
+    assert limiter.stats["github"]["rejected"] == 1
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+
+from connectors.mongodb import MongoDBConnector
+from utils.singleflight import singleflight
+from settings import JOB_WORKERS, JOB_POLL_INTERVAL_SECONDS, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Background jobs persisted in the `jobs` collection and run by in-process async workers.
+
+    A worker claims a job atomically and keeps a heartbeat on it while it runs. A job whose
+    heartbeat is older than the lease (its worker died or the process restarted) is claimed
+    again by the next free worker, up to JOB_MAX_ATTEMPTS times.
+    """
+    collection_name = "jobs"
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+                 lease_seconds: int = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.worker_id = uuid.uuid4().hex
+        self.handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self.failure_handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {"enqueued": 0, "deduplicated": 0}
+
+    def register(self, job_type: str, handler: Callable[..., Awaitable[Any]],
+                 on_failed: Optional[Callable[..., Awaitable[Any]]] = None) -> None:
+        """
+        Register a coroutine handler. It is called with the job params as keyword arguments
+        plus `on_stage_start`, an async callback that records the current stage on the job.
+        on_failed, if given, is awaited with the job params once the job is marked failed,
+        to release what the job would have cleaned up itself.
+        """
+        self.handlers[job_type] = handler
+        if on_failed is not None:
+            self.failure_handlers[job_type] = on_failed
+
+    async def enqueue(self, job_type: str, params: Dict[str, Any], dedupe_key: Optional[str] = None) -> str:
+        """
+        Queue a job and return its id. With a dedupe_key, an existing queued or running job
+        with the same key is returned instead of queueing a duplicate.
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if dedupe_key is None:
+            return await self._insert(job_type, params, None)
+        # Coalesce concurrent enqueues in this process so the lookup and insert don't race
+        return await singleflight.do(
+            ("enqueue", dedupe_key),
+            lambda: self._enqueue_once(job_type, params, dedupe_key)
+        )
+
+    async def _enqueue_once(self, job_type: str, params: Dict[str, Any], dedupe_key: str) -> str:
+        coll = await MongoDBConnector.get_collection(self.collection_name)
+        active = await coll.find_one(
+            {"dedupe_key": dedupe_key, "status": {"$in": ["queued", "running"]}},
+            {"_id": 1}
+        )
+        if active:
+            self.stats["deduplicated"] += 1
+            return str(active["_id"])
+        return await self._insert(job_type, params, dedupe_key)
+
+    async def _insert(self, job_type: str, params: Dict[str, Any], dedupe_key: Optional[str]) -> str:
+        now = datetime.utcnow()
+        job = {
+            "type": job_type,
+            "params": params,
+            "status": "queued",
+            "stage": None,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "worker_id": None,
+            "heartbeat_at": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        if dedupe_key is not None:
+            job["dedupe_key"] = dedupe_key
+        coll = await MongoDBConnector.get_collection(self.collection_name)
+        result = await coll.insert_one(job)
+        self.stats["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return str(result.inserted_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            object_id = ObjectId(job_id)
+        except (InvalidId, TypeError):
+            return None
+        coll = await MongoDBConnector.get_collection(self.collection_name)
+        job = await coll.find_one({"_id": object_id})
+        if job:
+            job["_id"] = str(job["_id"])
+        return job
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Hand our unfinished jobs back to the queue right away instead of waiting for the lease
+        coll = await MongoDBConnector.get_collection(self.collection_name)
+        await coll.update_many(
+            {"status": "running", "worker_id": self.worker_id},
+            {"$set": {"status": "queued", "worker_id": None, "updated_at": datetime.utcnow()}}
+        )
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        coll = await MongoDBConnector.get_collection(self.collection_name)
+        return await coll.find_one_and_update(
+            {
+                "type": {"$in": list(self.handlers)},
+                "$or": [
+                    {"status": "queued"},
+                    {"status": "running", "heartbeat_at": {"$lt": now - self.lease}}
+                ]
+            },
+            {
+                "$set": {"status": "running", "worker_id": self.worker_id, "heartbeat_at": now, "updated_at": now},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _update(self, job_id: ObjectId, fields: Dict[str, Any]) -> None:
+        coll = await MongoDBConnector.get_collection(self.collection_name)
+        await coll.update_one(
+            {"_id": job_id, "worker_id": self.worker_id},
+            {"$set": {**fields, "updated_at": datetime.utcnow()}}
+        )
+
+    async def _heartbeat(self, job_id: ObjectId) -> None:
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            await self._update(job_id, {"heartbeat_at": datetime.utcnow()})
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Failed to claim job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["_id"]
+        if job["attempts"] > self.max_attempts:
+            await self._fail(job, "Exceeded max attempts")
+            return
+
+        async def on_stage_start(stage: str):
+            await self._update(job_id, {"stage": stage})
+
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id))
+        try:
+            result = await self.handlers[job["type"]](on_stage_start=on_stage_start, **job["params"])
+            await self._update(job_id, {"status": "completed", "stage": None, "result": result})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({job['type']}) failed")
+            await self._fail(job, str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def _fail(self, job: Dict[str, Any], error: str) -> None:
+        await self._update(job["_id"], {"status": "failed", "error": error})
+        on_failed = self.failure_handlers.get(job["type"])
+        if on_failed is None:
+            return
+        try:
+            await on_failed(**job["params"])
+        except Exception:
+            logger.exception(f"Cleanup of failed job {job['_id']} ({job['type']}) failed")
+
+
+job_queue = JobQueue()
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def fingerprint(data: Any) -> str:
+    """Stable hash of JSON-like data; dict key order does not matter"""
+    payload = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable, inputs: Sequence[str], outputs: Sequence[str],
+                 fingerprint: Optional[Callable[..., Any]] = None,
+                 succeeded: Optional[Callable[..., bool]] = None):
+        """
+        A pipeline step.
+
+        Args:
+            name (str): Stage name used in timings
+            func (Callable): Called with the inputs as keyword arguments. Coroutine functions
+                are awaited, plain functions run in a worker thread
+            inputs (Sequence[str]): Context keys the stage needs
+            outputs (Sequence[str]): Context keys the stage produces. With more than one
+                output the function must return a tuple in the same order
+            fingerprint (Callable, optional): Called with the same keyword arguments, returns
+                the data the stage's result depends on. Makes the stage memoized: when the hash
+                of that data matches the previous run's, the previous outputs are reused
+            succeeded (Callable, optional): Called with the outputs as keyword arguments, tells
+                whether they are a result worth reusing. Failed outputs get no fingerprint, so
+                the next run computes them again
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.fingerprint = fingerprint
+        self.succeeded = succeeded
+
+    def input_fingerprint(self, results: Dict[str, Any]) -> Optional[str]:
+        if self.fingerprint is None:
+            return None
+        return fingerprint(self.fingerprint(**{key: results[key] for key in self.inputs}))
+
+    def outputs_succeeded(self, values: Dict[str, Any]) -> bool:
+        if any(key not in values for key in self.outputs):
+            return False
+        return self.succeeded is None or self.succeeded(**{key: values[key] for key in self.outputs})
+
+    async def run(self, results: Dict[str, Any]) -> None:
+        kwargs = {key: results[key] for key in self.inputs}
+        if asyncio.iscoroutinefunction(self.func):
+            value = await self.func(**kwargs)
+        else:
+            value = await asyncio.to_thread(self.func, **kwargs)
+        if len(self.outputs) == 1:
+            value = (value,)
+        for key, item in zip(self.outputs, value):
+            results[key] = item
+
+
+class Pipeline:
+    """
+    Runs stages as a dependency graph: every stage starts as soon as all of its
+    inputs are available, so independent branches run concurrently.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        self.stats = {stage.name: {"runs": 0, "reused": 0} for stage in stages if stage.fingerprint is not None}
+        self.producers = {}
+        for stage in stages:
+            for key in stage.outputs:
+                if key in self.producers:
+                    raise ValueError(f"Output '{key}' is produced by both '{self.producers[key]}' and '{stage.name}'")
+                self.producers[key] = stage.name
+
+    async def run(self, context: Dict[str, Any],
+                  on_stage_start: Optional[Callable[[str], Awaitable[Any]]] = None,
+                  previous: Optional[Dict[str, Any]] = None,
+                  previous_fingerprints: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Run all stages against the initial context.
+        on_stage_start, if given, is awaited with the stage name right before each stage runs.
+
+        A memoized stage whose input fingerprint equals previous_fingerprints[stage name] takes
+        its outputs from `previous` (the outputs of that earlier run) instead of running.
+
+        Returns:
+            tuple: (context extended with every stage output, timings). timings["fingerprints"]
+                holds the input fingerprint of every memoized stage that succeeded, to pass back next time
+        """
+        previous = previous or {}
+        previous_fingerprints = previous_fingerprints or {}
+        for stage in self.stages:
+            missing = [key for key in stage.inputs if key not in context and key not in self.producers]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' has unsatisfied inputs: {missing}")
+
+        results = dict(context)
+        ready = {key: asyncio.Event() for key in self.producers}
+        timings = {}
+        fingerprints = {}
+        started = time.perf_counter()
+
+        async def run_stage(stage: Stage):
+            for key in stage.inputs:
+                if key in ready:
+                    await ready[key].wait()
+            stage_start = time.perf_counter()
+            stage_fingerprint = stage.input_fingerprint(results)
+            reused = (stage_fingerprint is not None
+                      and previous_fingerprints.get(stage.name) == stage_fingerprint
+                      and stage.outputs_succeeded(previous))
+            if reused:
+                for key in stage.outputs:
+                    results[key] = previous[key]
+            else:
+                if on_stage_start is not None:
+                    await on_stage_start(stage.name)
+                await stage.run(results)
+            stage_end = time.perf_counter()
+            timings[stage.name] = {
+                "start": round(stage_start - started, 3),
+                "end": round(stage_end - started, 3),
+                "duration": round(stage_end - stage_start, 3)
+            }
+            if stage_fingerprint is not None:
+                if stage.outputs_succeeded(results):
+                    fingerprints[stage.name] = stage_fingerprint
+                timings[stage.name]["reused"] = reused
+                self.stats[stage.name]["runs"] += 1
+                self.stats[stage.name]["reused"] += reused
+            for key in stage.outputs:
+                ready[key].set()
+
+        tasks = [asyncio.ensure_future(run_stage(stage)) for stage in self.stages]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        return results, {
+            "total": round(time.perf_counter() - started, 3),
+            "stages": timings,
+            "critical_path": self.critical_path(timings),
+            "fingerprints": fingerprints
+        }
+
+    def critical_path(self, timings: Dict[str, Dict[str, float]]) -> List[str]:
+        """
+        Walk back from the last stage to finish, always through the input whose
+        producer finished last. These are the stages that bound the total time.
+        """
+        if not timings:
+            return []
+        by_name = {stage.name: stage for stage in self.stages}
+        current = max(timings, key=lambda name: timings[name]["end"])
+        path = [current]
+        while True:
+            producers = {self.producers[key] for key in by_name[current].inputs if key in self.producers}
+            if not producers:
+                break
+            current = max(producers, key=lambda name: timings[name]["end"])
+            path.append(current)
+        return list(reversed(path))
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(stats) for name, stats in self.stats.items()}
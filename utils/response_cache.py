@@ -0,0 +1,83 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from settings import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+
+
+class ResponseCache:
+    """
+    Serialized responses of the token read endpoints with strong ETags.
+
+    Every entry carries tags naming the token it was built from (id, name, address).
+    The DatabaseManager save_* methods invalidate by tag, so an entry is dropped as soon
+    as this process changes the token. The cache is per process, so an entry also expires
+    after ttl seconds: a change written by another app process or worker is served within
+    that time.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, str, frozenset, float]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "not_modified": 0, "invalidations": 0}
+
+    @staticmethod
+    def token_tags(token_id=None, token_name: Optional[str] = None, token_address: Optional[str] = None) -> list:
+        tags = []
+        if token_id:
+            tags.append(f"id:{token_id}")
+        if token_name:
+            tags.append(f"name:{token_name}")
+        if token_address:
+            tags.append(f"address:{token_address.lower()}")
+        return tags
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[3] <= time.monotonic():
+            del self._entries[key]
+            self.stats["expired"] += 1
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[0], entry[1]
+
+    def set(self, key: Hashable, body: bytes, tags: Iterable[str]) -> Tuple[bytes, str]:
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self._entries[key] = (body, etag, frozenset(tags), time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return body, etag
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = set(tags)
+        stale = [key for key, entry in self._entries.items() if entry[2] & tags]
+        for key in stale:
+            del self._entries[key]
+        self.stats["invalidations"] += len(stale)
+
+    def respond(self, request: Request, entry: Tuple[bytes, str]) -> Response:
+        """Return 304 if the client already has this version, the cached body otherwise"""
+        body, etag = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = [tag.strip() for tag in if_none_match.split(",")]
+            if "*" in candidates or etag in candidates:
+                self.stats["not_modified"] += 1
+                return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "entries": len(self._entries)}
+
+
+response_cache = ResponseCache()
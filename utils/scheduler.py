@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from connectors.mongodb import MongoDBConnector, DatabaseManager
+from connectors.rate_limiter import provider_usage
+from utils.jobs import job_queue
+from utils.utils import prefetch_market_data, update_report_by_id
+from settings import (RESEARCH_SCAN_INTERVAL_SECONDS, RESEARCH_SCAN_LIMIT, RESEARCH_FRESHNESS_SECONDS,
+                      RESEARCH_CONCURRENCY, RESEARCH_LEASE_SECONDS, RESEARCH_RETRY_SECONDS,
+                      RESEARCH_BUDGET_WINDOW_SECONDS, RESEARCH_BUDGETS)
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchScheduler:
+    """
+    Re-researches tokens in the background so read endpoints serve fresh reports.
+
+    Every scan picks the tokens whose last_research_time is older than their freshness target
+    (research_interval_seconds on the token, or the default) and refreshes the most overdue
+    first through update_report_by_id, at most `concurrency` at a time. A token is leased in
+    the tokens collection while it refreshes, so several app processes don't refresh it twice,
+    and a failed token keeps its lease for `retry_seconds` as a backoff.
+
+    The upstream requests made by refreshes are counted per provider as they are sent; once
+    a provider's budget for the current window is spent, the rest of the scan waits for the
+    next window. Refreshes already running still finish, so a window can overshoot by what
+    `concurrency` refreshes cost.
+    """
+
+    def __init__(self, interval: float = RESEARCH_SCAN_INTERVAL_SECONDS, scan_limit: int = RESEARCH_SCAN_LIMIT,
+                 freshness_seconds: int = RESEARCH_FRESHNESS_SECONDS, concurrency: int = RESEARCH_CONCURRENCY,
+                 lease_seconds: int = RESEARCH_LEASE_SECONDS, retry_seconds: int = RESEARCH_RETRY_SECONDS,
+                 budget_window: float = RESEARCH_BUDGET_WINDOW_SECONDS, budgets: Dict[str, int] = RESEARCH_BUDGETS):
+        self.interval = interval
+        self.scan_limit = scan_limit
+        self.freshness = timedelta(seconds=freshness_seconds)
+        self.concurrency = concurrency
+        self.lease = timedelta(seconds=lease_seconds)
+        self.retry = timedelta(seconds=retry_seconds)
+        self.budget_window = budget_window
+        self.budgets = budgets
+        self._task: Optional[asyncio.Task] = None
+        self._window_start = time.monotonic()
+        self._usage: Dict[str, int] = {}
+        self.in_flight = 0
+        # Seconds between a token becoming due and its refresh starting, and refresh completion times
+        self._lags: "deque[float]" = deque(maxlen=500)
+        self._completed: "deque[float]" = deque(maxlen=10000)
+        self.last_scan: Dict[str, Any] = {}
+        self.stats = {"scans": 0, "refreshed": 0, "failed": 0, "skipped_active": 0, "budget_exhausted": 0}
+
+    def _interval_of(self, token: Dict[str, Any]) -> timedelta:
+        seconds = token.get("research_interval_seconds")
+        return timedelta(seconds=seconds) if seconds else self.freshness
+
+    async def _due_tokens(self, now: datetime) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Up to scan_limit due tokens with their priority, how many of their freshness targets
+        have passed. Leased tokens are left out by the query; tokens whose own interval has
+        not passed yet are skipped page by page, so they cannot hide due tokens behind them.
+        """
+        db_manager = DatabaseManager()
+        shortest = await db_manager.get_shortest_research_interval()
+        window = min(self.freshness, timedelta(seconds=shortest)) if shortest else self.freshness
+        due = []
+        skip = 0
+        while len(due) < self.scan_limit:
+            page = await db_manager.get_stale_tokens(now - window, now, self.scan_limit, skip=skip)
+            for token in page:
+                interval = self._interval_of(token)
+                last = token.get("last_research_time")
+                if last is None:
+                    due.append((float("inf"), token))
+                elif now - last >= interval:
+                    due.append(((now - last) / interval, token))
+            if len(page) < self.scan_limit:
+                break
+            skip += len(page)
+        due.sort(key=lambda item: item[0], reverse=True)
+        return due[:self.scan_limit]
+
+    def _budget_left(self) -> bool:
+        if time.monotonic() - self._window_start >= self.budget_window:
+            self._window_start = time.monotonic()
+            self._usage = {}
+        return all(self._usage.get(provider, 0) < budget for provider, budget in self.budgets.items())
+
+    async def _claim(self, token: Dict[str, Any], now: datetime) -> bool:
+        coll = await MongoDBConnector.get_collection(DatabaseManager().tokens_collection)
+        claimed = await coll.find_one_and_update(
+            {
+                "_id": token["_id"],
+                "last_research_time": token.get("last_research_time"),
+                "$or": [{"research_lease_until": None}, {"research_lease_until": {"$lt": now}}]
+            },
+            {"$set": {"research_lease_until": now + self.lease}},
+            projection={"_id": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return claimed is not None
+
+    async def _release(self, token: Dict[str, Any], retry_at: Optional[datetime]) -> None:
+        coll = await MongoDBConnector.get_collection(DatabaseManager().tokens_collection)
+        update = {"$set": {"research_lease_until": retry_at}} if retry_at else {"$unset": {"research_lease_until": ""}}
+        await coll.update_one({"_id": token["_id"]}, update)
+
+    async def _refresh(self, token: Dict[str, Any]) -> None:
+        now = datetime.utcnow()
+        # Manual /update-report-by-name jobs for the token take precedence
+        jobs = await MongoDBConnector.get_collection(job_queue.collection_name)
+        active = await jobs.find_one(
+            {"dedupe_key": f"update_report:{token['_id']}", "status": {"$in": ["queued", "running"]}}, {"_id": 1}
+        )
+        if active or not await self._claim(token, now):
+            self.stats["skipped_active"] += 1
+            return
+
+        due_at = (token["last_research_time"] + self._interval_of(token)) if token.get("last_research_time") else now
+        self._lags.append(max((now - due_at).total_seconds(), 0.0))
+        # Requests are counted into the current window as they are sent
+        context = provider_usage.set(self._usage)
+        self.in_flight += 1
+        try:
+            await update_report_by_id(token["_id"])
+            self.stats["refreshed"] += 1
+            self._completed.append(time.monotonic())
+            await self._release(token, None)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Scheduled research of {token['token_name']} failed: {e!r}")
+            await self._release(token, datetime.utcnow() + self.retry)
+        finally:
+            self.in_flight -= 1
+            provider_usage.reset(context)
+
+    async def run_once(self) -> None:
+        now = datetime.utcnow()
+        due = await self._due_tokens(now)
+        self.stats["scans"] += 1
+        self.last_scan = {
+            "at": now,
+            "due": len(due),
+            "max_lag_seconds": max(
+                ((now - token["last_research_time"] - self._interval_of(token)).total_seconds()
+                 for _, token in due if token.get("last_research_time")), default=0.0
+            ),
+        }
+        if not due or not self._budget_left():
+            return
+
+        # Warm the market data of the whole scan with a few bulk requests
+        context = provider_usage.set(self._usage)
+        try:
+            await prefetch_market_data([token for _, token in due])
+        except Exception as e:
+            logger.error(f"Market data prefetch for {len(due)} tokens failed: {e!r}")
+        finally:
+            provider_usage.reset(context)
+
+        pending = deque(token for _, token in due)
+
+        async def worker():
+            while pending:
+                if not self._budget_left():
+                    self.stats["budget_exhausted"] += 1
+                    pending.clear()
+                    return
+                await self._refresh(pending.popleft())
+
+        await asyncio.gather(*[worker() for _ in range(self.concurrency)])
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Research scheduler scan failed")
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lags = sorted(self._lags)
+        hour_ago = time.monotonic() - 3600
+        return {
+            **self.stats,
+            "running": self._task is not None,
+            "in_flight": self.in_flight,
+            "last_scan": self.last_scan,
+            "lag_seconds_p50": round(lags[len(lags) // 2], 1) if lags else None,
+            "lag_seconds_max": round(lags[-1], 1) if lags else None,
+            "refreshed_last_hour": sum(1 for completed in self._completed if completed >= hour_ago),
+            "budget_usage": dict(self._usage),
+            "budgets": self.budgets,
+        }
+
+
+research_scheduler = ResearchScheduler()
@@ -1,4 +1,6 @@
+import asyncio
 import json
+import logging
 
 from pprint import pprint
 
@@ -8,13 +10,19 @@ from agents.dyor_parser import DYORParser
 from agents.chat import ChatAgent
 
 from connectors.moralis import MoralisConnector
-from connectors.bitquery_connector import BitqueryConnector
-from connectors.mongodb import TokenResearchInput, DatabaseManager, TokenAIReport, Token
+from connectors.bitquery_connector import BitqueryConnector, TokenMarketStats
+from connectors.market_cache import market_cache
+from connectors.mongodb import MongoDBConnector, TokenResearchInput, DatabaseManager, TokenAIReport, Token
 from connectors.twitter_connector import TwitterConnector
 from connectors.telegram import TelegramConnector
 from connectors.github import GitHubConnector
 from connectors.discord import DiscordConnector
 
+from utils.jobs import job_queue
+from utils.pipeline import Pipeline, Stage
+from utils.response_cache import response_cache
+from utils.storage import LocalStorage
+
 from settings import GROK_API_KEY, MORALIS_API_KEY, OPENAI_API_KEY, BITQUERY_API_KEY
 from datetime import datetime, timedelta
 
@@ -24,8 +32,14 @@ openai = OpenAI(OPENAI_API_KEY)
 moralis_connector = MoralisConnector(MORALIS_API_KEY)
 bitquery_connector = BitqueryConnector(BITQUERY_API_KEY)
 dyor_parser = DYORParser(OPENAI_API_KEY)
+twitter_connector = TwitterConnector()
+telegram_connector = TelegramConnector()
+discord_connector = DiscordConnector()
 chat_agent = ChatAgent(OPENAI_API_KEY)
 
+logger = logging.getLogger(__name__)
+
+
 def prepare_token_info_promt(token_info: dict):
     return f"""
     Token name: {token_info['name']}
@@ -34,36 +48,105 @@ def prepare_token_info_promt(token_info: dict):
     Token holders count: {token_info['holders_count']}
     Token top holders in format 'percentage_relative_to_total_supply of top holder1;percentage_relative_to_total_supply of top holder2; ...': {token_info['top_holders']}
     Token liquidity in USDT: {token_info['liquidity']}
-    Current price in USDT: {token_info['current_price']}
+    Current price in USDT: {token_info['current_price']}{_price_age_note(token_info)}
     Max price in USDT: {token_info['max_price']}
     Max price date: {token_info['max_price_date']}
     Total supply: {token_info['total_supply_formatted']}
     """
 
+def _price_age_note(token_info: dict):
+    # Set by get_token_info when the price came from the cache past its TTL
+    age = token_info.get('price_age_seconds')
+    return f" (cached price, {age} seconds old)" if age is not None else ""
+
 def prepare_prompt_for_grok(token_info: dict):
     return f"Analyze community of token ${token_info['symbol']}. Contract addres is {token_info['address']}."
 
 
-def get_token_info(token_address: str, chain: str):
-    token_info = moralis_connector.get_token_info(token_address=token_address, chain=chain)
-    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-    token_info['holders_count'] = bitquery_connector.get_token_holders_count(token_address=token_address, date=yesterday, network=chain)
-    token_info['top_holders'] = ';'.join([str(item) for item in moralis_connector.get_token_top_holders(token_address=token_address, chain=chain)])
-    price_info = moralis_connector.get_token_price_info(token_address=token_address, chain=chain)
+# Per-call deadlines for the market-data fan-out in get_token_info, in seconds
+TOKEN_INFO_TIMEOUTS = {
+    'metadata': 10,
+    'onchain_stats': 20,
+    'top_holders': 10,
+    'price': 10,
+}
+
+
+async def _fetch_with_fallback(name: str, coro, fallback):
+    try:
+        return await asyncio.wait_for(coro, TOKEN_INFO_TIMEOUTS[name])
+    except Exception as e:
+        logger.error(f"Token info {name} fetch failed, using fallback: {e!r}")
+        return fallback
+
+
+def _market_dates():
+    """The holder count date and the all-time high cutoff date the market data queries use"""
+    return (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d'), datetime.now().strftime('%Y-%m-%d')
+
+
+async def prefetch_market_data(tokens: list):
+    """
+    Warm the market data cache for many tokens with the bulk Moralis and Bitquery requests,
+    so refreshing their reports one by one afterwards reads metadata, prices and on-chain
+    stats from the cache.
+    """
+    by_chain = {}
+    for token in tokens:
+        if token.get('token_address') and token.get('token_chain'):
+            by_chain.setdefault(convert_token_chain(token['token_chain']), []).append(token['token_address'])
+    yesterday, today = _market_dates()
+    requests = [bitquery_connector.get_tokens_stats(
+        [(address, chain) for chain, addresses in by_chain.items() for address in addresses], yesterday, today
+    )]
+    for chain, addresses in by_chain.items():
+        requests += [moralis_connector.get_tokens_info(addresses, chain),
+                     moralis_connector.get_tokens_price_info(addresses, chain)]
+    await asyncio.gather(*requests)
+
+
+async def get_token_info(token_address: str, chain: str):
+    """
+    Fetch token metadata and market data. The upstream calls are independent, so they
+    run concurrently and each one falls back to a placeholder on error or timeout.
+    Holder count and all-time high come from one Bitquery request.
+    """
+    yesterday, today = _market_dates()
+    metadata_fallback = {
+        'name': 'NO AVAILABLE DATA',
+        'symbol': 'NO AVAILABLE DATA',
+        'address': token_address,
+        'twitter': '',
+        'telegram': '',
+        'website': '',
+        'total_supply_formatted': 'NO AVAILABLE DATA'
+    }
+    token_info, onchain_stats, top_holders, price_info = await asyncio.gather(
+        _fetch_with_fallback('metadata', moralis_connector.get_token_info(token_address=token_address, chain=chain), metadata_fallback),
+        _fetch_with_fallback('onchain_stats', bitquery_connector.get_token_stats(token_address=token_address, network=chain,
+                                                                                 holders_date=yesterday, max_price_date=today),
+                             TokenMarketStats(token_address=token_address, network=chain)),
+        _fetch_with_fallback('top_holders', moralis_connector.get_token_top_holders(token_address=token_address, chain=chain), []),
+        _fetch_with_fallback('price', moralis_connector.get_token_price_info(token_address=token_address, chain=chain), {}),
+    )
+    token_info['holders_count'] = onchain_stats.holders_count if onchain_stats.holders_count is not None else 0
+    token_info['top_holders'] = ';'.join([str(item) for item in top_holders])
     token_info['liquidity'] = price_info.get('pairTotalLiquidityUsd', 'Insufficient liquidity in pools to calculate the price')
     token_info['current_price'] = price_info.get('usdPrice', 'Insufficient liquidity in pools to calculate the price')
-    max_price_info = bitquery_connector.get_token_max_price(token_address=token_address, date=datetime.now().strftime('%Y-%m-%d'), network=chain)
-    token_info['max_price'] = max_price_info.get('Trade', {}).get('high', 'NO AVAILABLE DATA')
-    token_info['max_price_date'] = max_price_info.get('Block', {}).get('Timefield', 'NO AVAILABLE DATA')
+    token_info['max_price'] = onchain_stats.max_price if onchain_stats.max_price is not None else 'NO AVAILABLE DATA'
+    token_info['max_price_date'] = onchain_stats.max_price_time or 'NO AVAILABLE DATA'
     token_info['chain'] = chain
+    price_key = (chain, token_address.lower())
+    if price_info and market_cache.is_stale('price', price_key):
+        token_info['price_age_seconds'] = round(market_cache.age('price', price_key))
     return token_info
 
 
-def get_community_analysis(prompt: str):
-    return grok.chat(prompt)
+async def get_community_analysis(prompt: str):
+    return await grok.chat(prompt)
 
 
-def get_ticker_info_analysis(prompt: str):
+async def get_ticker_info_analysis(prompt: str):
     lore = """
     You are a professional quant trader with 10 years of experience who right now switched to memecoin trading.
     Currently you are analyzing provided token info and answering what future you see for this token leaning on 10 years of experience as quant trader.
@@ -76,14 +159,14 @@ def get_ticker_info_analysis(prompt: str):
     Response should be as text no more than 4 sentences.
     Without ```html tags
     """
-    return openai.chat(prompt, lore)
+    return await openai.chat(prompt, lore)
 
 
-def get_ticker_decision(token_address: str, chain: str):
-    token_info = get_token_info(token_address=token_address, chain=chain)
+async def get_ticker_decision(token_address: str, chain: str):
+    token_info = await get_token_info(token_address=token_address, chain=chain)
     pprint(token_info)
-    ticker_analytic = get_ticker_info_analysis(prepare_token_info_promt(token_info))
-    community_analysis = get_community_analysis(prepare_prompt_for_grok(token_info))
+    ticker_analytic = await get_ticker_info_analysis(prepare_token_info_promt(token_info))
+    community_analysis = await get_community_analysis(prepare_prompt_for_grok(token_info))
     lore = f"""
     You are a General Partner of a hedge fund.
     You got two reports about meme coin token.
@@ -112,6 +195,7 @@ def get_ticker_decision(token_address: str, chain: str):
     Token symbol: {token_info['symbol']}
     Token address: {token_info['address']}
     Token chain: {token_info['chain']}
+    Current price in USDT: {token_info['current_price']}{_price_age_note(token_info)}
     Quant trader analysis:
     {ticker_analytic}
     Psychological analysis:
@@ -120,11 +204,13 @@ def get_ticker_decision(token_address: str, chain: str):
     print('--------------------------------MESSAGE--------------------------------')
     print(message)
     print('------------------------------------------------------------------------')
-    return openai.chat(message, lore)
+    return await openai.chat(message, lore)
 
 
-async def parse_dyor_report(file_path: str):
-    parsed_dyor = dyor_parser.parse_document_with_openai(file_path)
+async def parse_dyor_report(file_path: str, on_stage_start=None):
+    if on_stage_start is not None:
+        await on_stage_start('parse_document')
+    parsed_dyor = await dyor_parser.parse_document_with_openai(file_path)
     db_manager = DatabaseManager()
     token = await db_manager.get_token_by_name(parsed_dyor['general_info']['project_name'])
     if not token:
@@ -148,31 +234,75 @@ async def parse_dyor_report(file_path: str):
     uploaded_report = await db_manager.save_research_input(input_data)
     data = await update_dyor_report(dyor_report=parsed_dyor, 
         token_address=parsed_dyor.get('general_info').get('token_info').get('token_address'), 
-        token_chain=parsed_dyor.get('general_info').get('token_info').get('token_chain')
+        token_chain=parsed_dyor.get('general_info').get('token_info').get('token_chain'),
+        on_stage_start=on_stage_start
     )
     return {"status":"success", "input_report": parsed_dyor, "updated_report": data}
 
 
-def update_socials_from_dyor_report(platforms: list):
-    updated_platforms = []
-    for platform in platforms:
-        platform_name = platform.get('name').lower()
-        if platform_name.lower() == 'twitter':
-            new_followers = TwitterConnector().get_user_info(platform.get('url').replace('https://x.com/', '').replace('https://twitter.com/', '')).get('result', {}).get('data', {}).get(
-                'user',
-            {}).get('result', {}).get('legacy', {}).get('followers_count', 0)
-        elif platform_name.lower() == 'telegram':
-            new_followers = TelegramConnector().get_channel_followers(platform.get('url').replace('https://t.me/', ''))
-        elif platform_name.lower() == 'discord':
-            new_followers = DiscordConnector().get_followers(platform.get('url').replace('https://discord.gg/', '').replace('https://discord.com/invite/', ''))
-        else:
-            new_followers = 0
-        updated_platforms.append({
-            'name': platform.get('name'),
-            'url': platform.get('url'),
-            'followers': new_followers
-        })
-    return updated_platforms
+# Per-platform deadlines for the social follower refresh, in seconds
+SOCIAL_TIMEOUTS = {
+    'twitter': 15,
+    'telegram': 10,
+    'discord': 10,
+}
+
+SOCIAL_FETCHERS = {
+    'twitter': lambda url, timeout: twitter_connector.get_followers(
+        url.replace('https://x.com/', '').replace('https://twitter.com/', ''), timeout),
+    'telegram': lambda url, timeout: telegram_connector.get_channel_followers(
+        url.replace('https://t.me/', ''), timeout),
+    'discord': lambda url, timeout: discord_connector.get_followers(
+        url.replace('https://discord.gg/', '').replace('https://discord.com/invite/', ''), timeout),
+}
+
+
+async def _refresh_platform(platform: dict, previous: dict = None) -> dict:
+    """
+    Refresh one platform's follower count within its deadline. On failure the last known
+    count is kept with status 'stale'; without one the status is 'failed'. Platforms without
+    a connector are 'unsupported'.
+    """
+    platform_name = platform.get('name', '').lower()
+    url = platform.get('url', '')
+    result = {'name': platform.get('name'), 'url': url}
+    fetch = SOCIAL_FETCHERS.get(platform_name)
+    if fetch is None:
+        return {**result, 'followers': None, 'status': 'unsupported'}
+
+    followers, error = None, None
+    timeout = SOCIAL_TIMEOUTS[platform_name]
+    try:
+        # The connectors are blocking; their request timeout ends the thread soon after the deadline
+        followers = await asyncio.wait_for(asyncio.to_thread(fetch, url, timeout), timeout)
+        if followers is None:
+            error = 'No follower count in response'
+    except Exception as e:
+        error = repr(e)
+
+    if followers is not None:
+        return {**result, 'followers': followers, 'status': 'fresh', 'updated_at': datetime.utcnow().isoformat()}
+    logger.warning(f"Social refresh of {url} failed: {error}")
+    if previous is not None:
+        return {**result, 'followers': previous['followers'], 'status': 'stale',
+                'updated_at': previous.get('updated_at'), 'error': error}
+    return {**result, 'followers': None, 'status': 'failed', 'error': error}
+
+
+async def update_socials_from_dyor_report(platforms: list, last_ai_report: dict = None):
+    """
+    Refresh the follower counts of all platforms concurrently. Each entry carries a status:
+    'fresh', 'stale' (last known count from the previous report), 'failed' or 'unsupported'.
+    """
+    # Only counts fetched by an earlier refresh; the research input has display strings like "129.7k Members"
+    known = {}
+    for platform in (last_ai_report or {}).get('updated_platforms', []):
+        followers = platform.get('followers')
+        if isinstance(followers, (int, float)) and not isinstance(followers, bool):
+            known[platform.get('url')] = platform
+    return list(await asyncio.gather(*[
+        _refresh_platform(platform, known.get(platform.get('url'))) for platform in platforms
+    ]))
 
 
 def get_github_repos_info(account_name: str):
@@ -189,37 +319,6 @@ def convert_token_chain(token_chain: str):
         return 'eth'
     return token_chain
 
-async def update_dyor_report(dyor_report: dict, token_address: str = None, token_chain: str = None, last_ai_report: dict = None):
-    if last_ai_report is None:
-        last_ai_report = {}
-    token_info = None
-    if token_address and token_chain:
-        token_info = get_token_info(token_address=token_address, chain=convert_token_chain(token_chain))
-        ticker_analytic = get_ticker_info_analysis(prepare_token_info_promt(token_info))
-    else:
-        ticker_analytic = 'No token info available.'
-    github_account = dyor_report.get('general_info', {}).get('github_url', '').replace('https://github.com/', '')
-    updated_development_status, repos_info = update_development_status(github_account)
-    platforms = dyor_report.get('social_media', {}).get('platforms', [])
-    updated_platforms = update_socials_from_dyor_report(platforms)
-    final_conclusion = make_final_conclusion(dyor_report, updated_development_status, updated_platforms, ticker_analytic, last_ai_report)
-    social_conclusion = '{"TODO": "TODO"}'
-    data = {
-        'updated_development_status': updated_development_status,
-        'updated_platforms': updated_platforms,
-        'social_conclusion': json.loads(social_conclusion),
-        'final_conclusion': final_conclusion,
-        'ticker_analytic': ticker_analytic,
-        'token_info': token_info,
-        'repos_info': repos_info
-    }
-    db_manager = DatabaseManager()
-    token = await db_manager.get_token_by_name(dyor_report.get('general_info', {}).get('project_name'))
-    ai_report = TokenAIReport(token_id=str(token['_id']), token_name=dyor_report.get('general_info', {}).get('project_name'), 
-                              data=data)
-    await db_manager.save_ai_report(ai_report)
-    return data
-
 
 # USE IF YOU NEED TO MAKE SOCIAL CONCLUSION
 CONCLUSTION_FORMAT = [
@@ -229,7 +328,7 @@ CONCLUSTION_FORMAT = [
     {".....": {"followers": {"old": 1000, "new": 1500, "change": 500}}}
 ]
 
-def make_social_conclusion(dyor_report: dict, updated_development_status: str, updated_platforms: list, ticker_analytic: str):
+async def make_social_conclusion(dyor_report: dict, updated_development_status: str, updated_platforms: list, ticker_analytic: str):
     lore = f"""
     You are a DYOR (Do Your Own Research) report expert that builds reports for crypto projects.
     You are tasked to make new Conclusion section for DYOR report.
@@ -249,10 +348,10 @@ def make_social_conclusion(dyor_report: dict, updated_development_status: str, u
     Ticker analytic:
     {ticker_analytic}
     """
-    return openai.chat(message, lore)
+    return await openai.chat(message, lore)
 
 
-def make_final_conclusion(dyor_report: dict, updated_development_status: str, updated_platforms: list, ticker_analytic: str, last_ai_report: dict):
+async def make_final_conclusion(dyor_report: dict, updated_development_status: str, updated_platforms: list, ticker_analytic: str, last_ai_report: dict):
     lore = f"""
     You are a DYOR (Do Your Own Research) report expert that builds reports for crypto projects.
     You are tasked to make new Conclusion section for DYOR report.
@@ -274,11 +373,14 @@ def make_final_conclusion(dyor_report: dict, updated_development_status: str, up
     Previous ai analysis:
     {json.dumps(last_ai_report, indent=4)}
     """
-    return openai.chat(message, lore)
+    return await openai.chat(message, lore)
+
+
+async def get_report_repos_info(github_account: str):
+    return await asyncio.to_thread(get_github_repos_info, github_account)
 
 
-def update_development_status(github_account):
-    repos_info = get_github_repos_info(github_account)
+async def update_development_status(repos_info):
     lore = f"""
     You are a DYOR (Do Your Own Research) report expert that builds reports for crypto projects.
     You are specialising on analyzing github repos of projects.
@@ -293,20 +395,165 @@ def update_development_status(github_account):
     Response should be as text no more than 5 sentences.
     Without ```html tags
     """
-    return openai.chat(repos_info, lore), repos_info
+    return await openai.chat(repos_info, lore)
 
-import logging
-logger = logging.getLogger(__name__)
 
+async def get_report_token_info(token_address: str, token_chain: str):
+    if not (token_address and token_chain):
+        return None
+    return await get_token_info(token_address=token_address, chain=convert_token_chain(token_chain))
 
-async def chat_with_agent(message: str, attachment_ids = None):
+
+async def get_report_ticker_analytic(token_info: dict):
+    if token_info is None:
+        return 'No token info available.'
+    return await get_ticker_info_analysis(prepare_token_info_promt(token_info))
+
+
+def _llm_succeeded(**outputs) -> bool:
+    # OpenAI.chat reports failures as text; an error must not be reused as the stage's result
+    return not any(isinstance(value, str) and value.startswith('Error: ') for value in outputs.values())
+
+
+def _platforms_fingerprint(platforms: list):
+    # Refresh times and error texts change every run without changing what the conclusion says
+    return [{key: platform.get(key) for key in ('name', 'url', 'followers', 'status')} for platform in platforms or []]
+
+
+def _final_conclusion_fingerprint(dyor_report: dict, updated_development_status: str, updated_platforms: list,
+                                  ticker_analytic: str, last_ai_report: dict):
+    # The previous conclusion is left out, otherwise a fresh conclusion would always invalidate the next one
+    previous = {key: value for key, value in (last_ai_report or {}).items() if key != 'final_conclusion'}
+    previous['updated_platforms'] = _platforms_fingerprint(previous.get('updated_platforms'))
+    return [dyor_report, updated_development_status, _platforms_fingerprint(updated_platforms), ticker_analytic, previous]
+
+
+# Stages of a DYOR report refresh. Token info, development status and socials are
+# independent branches; the final conclusion waits for all of them. The LLM stages are
+# memoized on their inputs and reuse the previous report's output when those are unchanged.
+DYOR_REPORT_PIPELINE = Pipeline([
+    Stage('token_info', get_report_token_info, inputs=['token_address', 'token_chain'], outputs=['token_info']),
+    Stage('ticker_analytic', get_report_ticker_analytic, inputs=['token_info'], outputs=['ticker_analytic'],
+          fingerprint=lambda token_info: token_info, succeeded=_llm_succeeded),
+    Stage('repos', get_report_repos_info, inputs=['github_account'], outputs=['repos_info']),
+    Stage('development_status', update_development_status, inputs=['repos_info'],
+          outputs=['updated_development_status'], fingerprint=lambda repos_info: repos_info,
+          succeeded=_llm_succeeded),
+    Stage('socials', update_socials_from_dyor_report, inputs=['platforms', 'last_ai_report'],
+          outputs=['updated_platforms']),
+    Stage('final_conclusion', make_final_conclusion,
+          inputs=['dyor_report', 'updated_development_status', 'updated_platforms', 'ticker_analytic', 'last_ai_report'],
+          outputs=['final_conclusion'], fingerprint=_final_conclusion_fingerprint, succeeded=_llm_succeeded),
+])
+
+
+async def update_dyor_report(dyor_report: dict, token_address: str = None, token_chain: str = None, last_ai_report: dict = None,
+                             on_stage_start=None, previous_fingerprints: dict = None, token_id=None):
+    if last_ai_report is None:
+        last_ai_report = {}
+    results, timings = await DYOR_REPORT_PIPELINE.run({
+        'dyor_report': dyor_report,
+        'token_address': token_address,
+        'token_chain': token_chain,
+        'github_account': dyor_report.get('general_info', {}).get('github_url', '').replace('https://github.com/', ''),
+        'platforms': dyor_report.get('social_media', {}).get('platforms', []),
+        'last_ai_report': last_ai_report,
+    }, on_stage_start=on_stage_start, previous=last_ai_report, previous_fingerprints=previous_fingerprints)
+    fingerprints = timings.pop('fingerprints')
+    reused = [name for name, stage in timings['stages'].items() if stage.get('reused')]
+    logger.info(f"DYOR report stages took {timings['total']}s, critical path: {' -> '.join(timings['critical_path'])}"
+                f"{', reused: ' + ', '.join(reused) if reused else ''}")
+    social_conclusion = '{"TODO": "TODO"}'
+    data = {
+        'updated_development_status': results['updated_development_status'],
+        'updated_platforms': results['updated_platforms'],
+        'social_conclusion': json.loads(social_conclusion),
+        'final_conclusion': results['final_conclusion'],
+        'ticker_analytic': results['ticker_analytic'],
+        'token_info': results['token_info'],
+        'repos_info': results['repos_info']
+    }
+    db_manager = DatabaseManager()
+    if token_id is None:
+        token_id = (await db_manager.get_token_by_name(dyor_report.get('general_info', {}).get('project_name')))['_id']
+    ai_report = TokenAIReport(token_id=str(token_id), token_name=dyor_report.get('general_info', {}).get('project_name'), 
+                              data=data, stage_timings=timings, stage_fingerprints=fingerprints)
+    await db_manager.save_ai_report(ai_report)
+    return data
+
+
+async def update_report_by_name(token_name: str, chain: str = None, on_stage_start=None):
+    token_data = await DatabaseManager().get_token_by_name(token_name=token_name, chain=chain)
+    if not token_data:
+        raise ValueError("Token not found")
+    return await _update_report(token_data, on_stage_start)
+
+
+async def update_report_by_id(token_id, on_stage_start=None):
+    token_data = await DatabaseManager().get_token_by_id(token_id)
+    if not token_data:
+        raise ValueError("Token not found")
+    return await _update_report(token_data, on_stage_start)
+
+
+async def _update_report(token_data: dict, on_stage_start=None):
+    token = Token(**token_data)
+    if not token.research_inputs or len(token.research_inputs) == 0:
+        raise ValueError("No research input data found for this token")
+
+    if token.ai_reports and len(token.ai_reports) > 0:
+        # Newest first
+        last_ai_report = token.ai_reports[0].get('data', None)
+        previous_fingerprints = token.ai_reports[0].get('stage_fingerprints', None)
+    else:
+        last_ai_report = None
+        previous_fingerprints = None
+
+    data = await update_dyor_report(dyor_report=token.research_inputs[0].get('data'),
+                                    token_address=token.token_address,
+                                    token_chain=token.token_chain,
+                                    last_ai_report=last_ai_report,
+                                    on_stage_start=on_stage_start,
+                                    previous_fingerprints=previous_fingerprints,
+                                    token_id=token_data["_id"])
+
+    tokens_coll = await MongoDBConnector.get_collection("tokens")
+    await tokens_coll.update_one(
+        {"_id": token_data["_id"]},
+        {"$set": {"last_research_time": datetime.utcnow()}}
+    )
+    response_cache.invalidate(response_cache.token_tags(token_data["_id"], token.token_name, token.token_address))
+    return {"status": "success", "data": data}
+
+
+async def run_parse_dyor_report_job(file_path: str, on_stage_start=None):
+    result = await parse_dyor_report(file_path, on_stage_start=on_stage_start)
+    LocalStorage().delete_file(file_path)
+    return result
+
+
+async def discard_dyor_upload(file_path: str):
+    # The upload is kept for retries; once the job has failed for good nothing will read it
+    LocalStorage().delete_file(file_path)
+
+
+job_queue.register('parse_dyor_report', run_parse_dyor_report_job, on_failed=discard_dyor_upload)
+job_queue.register('update_report', update_report_by_name)
+
+
+async def chat_with_agent(message: str, attachment_ids = None, session_id: str = "default"):
     logger.error(f"Chat with agent: {message} {attachment_ids}")
     if attachment_ids:
         db_manager = DatabaseManager()
         attachments = [await db_manager.get_attachment(attachment_id) for attachment_id in attachment_ids]
         return {
             "success": True,
-            "response": dyor_parser.parse_document_with_openai(attachments[0].file_path),
+            "response": await dyor_parser.parse_document_with_openai(attachments[0].file_path),
             "type": "parsed_dyor"
         }
-    return await chat_agent.chat_response(message)
+    return await chat_agent.chat_response(message, session_id=session_id)
+
+
+def stream_chat_with_agent(message: str, session_id: str = "default"):
+    logger.error(f"Stream chat with agent: {message}")
+    return chat_agent.stream_response(message, session_id=session_id)